@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Benchmark CyberScribe's transcription paths on synthetic audio
+
+Measures wall time, real-time factor (processing time / audio length), time per
+stage and peak memory for the live-recording finalize, single-file, segmented
+and batch paths. Each model size runs in its own process so peak RSS is per model.
+
+    python benchmark.py --models tiny base --lengths 10 60 300
+    python benchmark.py --stub      # pipeline overhead only, no inference
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_RATE = 16000
+STAGES = ["probe", "decode", "capture", "inference", "history"]
+PATHS = ["live", "file", "segment", "batch"]
+
+def synth_speech(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """Return float32 audio of voiced bursts separated by pauses, so silence detection has cuts to find"""
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * sample_rate), dtype=np.float32)
+    pos = 0
+    while pos < len(audio):
+        burst = int(rng.uniform(1.5, 4.0) * sample_rate)
+        pause = int(rng.uniform(0.3, 1.0) * sample_rate)
+        n = min(burst, len(audio) - pos)
+        t = np.arange(n) / sample_rate
+
+        # A few harmonics of a pitch, amplitude-modulated at a syllable rate
+        f0 = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t)
+        audio[pos:pos + n] = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(n)
+        pos += n + pause
+    return audio
+
+def write_wav(path, audio, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+
+def read_wav(path):
+    """Read a WAV written by write_wav as float32, for machines without ffmpeg"""
+    with wave.open(path, "rb") as wf:
+        data = wf.readframes(wf.getnframes())
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+def encode(wav_path, out_path):
+    """Encode a WAV to MP3, or to an MP4 with a blank video track"""
+    if out_path.endswith(".mp4"):
+        command = ["ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+                   "-f", "lavfi", "-i", "color=c=black:s=64x64:r=5", "-i", wav_path,
+                   "-shortest", "-c:v", "mpeg4", "-c:a", "aac", out_path]
+    else:
+        command = ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-i", wav_path, out_path]
+    subprocess.run(command, check=True)
+
+def generate_inputs(directory, lengths, formats, batch_files):
+    """Write the synthetic test files and return {(length, format): [paths]}"""
+    inputs = {}
+    for length in lengths:
+        for fmt in formats:
+            paths = []
+            for n in range(batch_files):
+                wav_path = os.path.join(directory, f"speech_{length:g}s_{n}.wav")
+                if not os.path.exists(wav_path):
+                    write_wav(wav_path, synth_speech(length, seed=n))
+                path = wav_path if fmt == "wav" else wav_path[:-4] + "." + fmt
+                if not os.path.exists(path):
+                    encode(wav_path, path)
+                paths.append(path)
+            inputs[(length, fmt)] = paths
+    return inputs
+
+class StageTimer:
+    """Accumulates exclusive wall time per stage by wrapping the functions that implement each stage
+
+    A stage entered while another is running on the same thread is subtracted from
+    the outer one, so inference that decodes its own input doesn't count the decode twice.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            stack = self.local.__dict__.setdefault("stack", [])
+            frame = [time.perf_counter(), 0.0]
+            stack.append(frame)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stack.pop()
+                elapsed = time.perf_counter() - frame[0]
+                if stack:
+                    stack[-1][1] += elapsed
+                with self.lock:
+                    self.totals[stage] += elapsed - frame[1]
+        return timed
+
+    def patch(self, owner, name, stage):
+        if hasattr(owner, name):
+            setattr(owner, name, self.wrap(stage, getattr(owner, name)))
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.totals)
+
+class StubModel:
+    """Stands in for a Whisper model: decodes its input like Whisper does, then answers instantly"""
+
+    def __init__(self, model_size):
+        self.model_size = model_size
+
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            audio = load_audio_like_whisper(audio)
+        duration = len(audio) / SAMPLE_RATE
+        segments = [{"start": float(start), "end": float(min(start + 5.0, duration)),
+                     "text": " lorem ipsum dolor sit amet"}
+                    for start in np.arange(0.0, max(duration, 0.1), 5.0)]
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments, "language": "en"}
+
+def load_audio_like_whisper(path):
+    if not shutil.which("ffmpeg"):
+        return read_wav(path)
+    try:
+        from whisper.audio import load_audio
+    except ImportError:
+        import transcriptor
+        return transcriptor.decode_audio(path).samples
+    return load_audio(path)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_model(args):
+    """Run every path for one model inside this process and return the result rows"""
+    # Benchmark the work, not the result cache; keep history files out of the working tree
+    os.environ["CYBERSCRIBE_CACHE"] = "0"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import transcriptor as ts
+    os.chdir(args.data)
+
+    # Without ffmpeg only the generated WAVs are used; read them directly
+    if not shutil.which("ffmpeg"):
+        if args.workers > 1:
+            sys.exit("ffmpeg not found; worker processes need it to decode, use --workers 1")
+        ts.decode_audio = lambda file_path, to_file=False: ts.DecodedAudio(read_wav(file_path))
+
+    timer = StageTimer()
+    timer.patch(ts, "probe_duration", "probe")
+    timer.patch(ts, "decode_audio", "decode")
+    timer.patch(ts.CaptureBuffer, "get_samples", "capture")
+    timer.patch(ts.BatchedInference, "transcribe", "inference")
+    timer.patch(ts, "record_transcription", "history")
+    try:
+        import whisper.audio
+        timer.patch(whisper.audio, "load_audio", "decode")
+    except ImportError:
+        pass
+
+    def load(model_size, **options):
+        model = StubModel(model_size) if args.stub else ts.load_whisper().load_model(model_size, **options)
+        model.transcribe = timer.wrap("inference", model.transcribe)
+        return model
+    ts.MODEL_REGISTRY.loader = load
+
+    model_size = "base" if args.stub else args.run_model
+    start_time = time.perf_counter()
+    transcriptor = ts.AudioTranscriptor(model_size)
+    load_time = time.perf_counter() - start_time
+    transcriptor.warm_up()
+
+    history_store = ts.HistoryStore()
+    history_index = ts.open_history_index(history_store)
+    session_id = ts.new_session_id()
+    pool = ts.TranscriptionPool(model_size, args.workers) if args.workers > 1 else None
+
+    errors = []
+
+    def record(text, label):
+        if text.startswith("[ERROR:"):
+            errors.append(text)
+        ts.record_transcription(f"[{label}]\n{text}", session_id, history_store, history_index)
+
+    def live(paths):
+        # Capture a recording through the same buffer as the audio callback, then time its transcription
+        audio = ts.resample_audio(ts.decode_audio(paths[0]).samples, SAMPLE_RATE, ts.RECORD_RATE)
+        pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+        capture = ts.CaptureBuffer(ts.RECORD_RATE)
+        for offset in range(0, len(pcm), 2048):
+            capture.write(pcm[offset:offset + 2048])
+
+        timer.reset()
+        start = time.perf_counter()
+        texts = [segment["text"] for segment in transcriptor.transcribe_audio_stream(capture.get_samples())]
+        record(" ".join(text for text in texts if text), "LIVE")
+        elapsed = time.perf_counter() - start
+        capture.close()
+        return elapsed
+
+    def single_file(paths):
+        timer.reset()
+        start = time.perf_counter()
+        record(transcriptor.transcribe_file(paths[0]), "FILE")
+        return time.perf_counter() - start
+
+    def segmented(paths):
+        timer.reset()
+        start = time.perf_counter()
+        job = ts.SegmentedTranscription(paths[0], transcriptor, get_pool=lambda size, workers: pool,
+                                        workers=args.workers)
+        record(job.run(), "SEGMENTED")
+        return time.perf_counter() - start
+
+    def batch(paths):
+        timer.reset()
+        start = time.perf_counter()
+        # The stub can't run Whisper's batched decoder, so clips go through one at a time
+        pipeline = ts.BatchPipeline(paths, transcriptor, pool=pool, batch_size=1 if args.stub else ts.BATCH_SIZE)
+        pipeline.run(lambda i, path, text, error: record(text, "BATCH"))
+        return time.perf_counter() - start
+
+    runners = {"live": live, "file": single_file, "segment": segmented, "batch": batch}
+    rows = []
+    for length in args.lengths:
+        for path_name in args.paths:
+            formats = args.formats if path_name == "file" else ["wav"]
+            for fmt in formats:
+                paths = sorted(p for p in os.listdir(args.data)
+                               if p.startswith(f"speech_{length:g}s_") and p.endswith("." + fmt))
+                paths = [os.path.join(args.data, p) for p in paths]
+                if path_name != "batch":
+                    paths = paths[:1]
+                if not paths:
+                    continue
+
+                # Keep the run with the median wall time
+                runs = []
+                errors.clear()
+                for _ in range(args.repeat):
+                    wall = runners[path_name](paths)
+                    runs.append((wall, timer.snapshot()))
+                runs.sort(key=lambda run: run[0])
+                wall, stages = runs[len(runs) // 2]
+
+                audio_seconds = length * len(paths)
+                rows.append({
+                    "model": "stub" if args.stub else model_size,
+                    "path": path_name if path_name != "file" else f"file:{fmt}",
+                    "length": length,
+                    "files": len(paths),
+                    "audio_seconds": audio_seconds,
+                    "wall": wall,
+                    "rtf": wall / audio_seconds,
+                    "stages": stages,
+                    "other": max(0.0, wall - sum(stages.values())) if args.workers <= 1 else None,
+                    "load": load_time,
+                    "peak_rss_mb": peak_rss_mb(),
+                    "error": errors[0] if errors else None,
+                })
+                print(f"  {rows[-1]['model']:<6} {rows[-1]['path']:<9} {length:>6g}s  "
+                      f"wall {wall:7.2f}s  RTF {wall / audio_seconds:.3f}", file=sys.stderr)
+
+    if pool:
+        pool.shutdown()
+    history_store.close()
+    if history_index:
+        history_index.close()
+    return rows
+
+def print_table(rows):
+    columns = ["model", "path", "length", "files", "wall", "RTF"] + STAGES + ["other", "RSS MB"]
+    widths = [6, 9, 7, 5, 8, 7] + [9] * len(STAGES) + [8, 8]
+    print(" ".join(name.rjust(width) if i > 1 else name.ljust(width)
+                   for i, (name, width) in enumerate(zip(columns, widths))))
+    for row in rows:
+        values = [row["model"], row["path"], f"{row['length']:g}s", str(row["files"])]
+        if row["error"]:
+            print(" ".join(value.rjust(width) if i > 1 else value.ljust(width)
+                           for i, (value, width) in enumerate(zip(values, widths))), row["error"])
+            continue
+        values += [f"{row['wall']:.2f}", f"{row['rtf']:.4f}"]
+        values += [f"{row['stages'][stage]:.3f}" if stage in row["stages"] else "-" for stage in STAGES]
+        values.append(f"{row['other']:.3f}" if row["other"] is not None else "-")
+        values.append(f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] else "-")
+        print(" ".join(value.rjust(width) if i > 1 else value.ljust(width)
+                       for i, (value, width) in enumerate(zip(values, widths))))
+    print("\nStage times are in seconds, summed across threads; RTF is wall time / audio length "
+          "(below 1 is faster than real time).")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"], help="model sizes to benchmark")
+    parser.add_argument("--lengths", nargs="+", type=float, default=[10, 60, 300],
+                        help="synthetic audio lengths in seconds")
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=PATHS, help="pipelines to run")
+    parser.add_argument("--formats", nargs="+", default=["wav", "mp3", "mp4"],
+                        help="input formats for the single-file path (mp3 and mp4 need ffmpeg)")
+    parser.add_argument("--batch-files", type=int, default=8, help="files per batch run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for segmented and batch runs (stage times cover this process only)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per measurement; the median is kept")
+    parser.add_argument("--stub", action="store_true", help="replace the model with an instant stub")
+    parser.add_argument("--data", help="directory for the generated audio (default: a temporary one)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--run-model", help=argparse.SUPPRESS)
+    parser.add_argument("--results", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stub and args.workers > 1:
+        parser.error("--stub runs in this process only; use --workers 1")
+
+    # Child process: benchmark one model and hand the rows back
+    if args.run_model:
+        rows = run_model(args)
+        with open(args.results, "w", encoding="utf-8") as f:
+            json.dump(rows, f)
+        return
+
+    if not shutil.which("ffmpeg"):
+        args.formats = [fmt for fmt in args.formats if fmt == "wav"]
+        print("ffmpeg not found; benchmarking WAV input only", file=sys.stderr)
+
+    data_dir = args.data or tempfile.mkdtemp(prefix="cyberscribe_bench_")
+    os.makedirs(data_dir, exist_ok=True)
+    print(f"Generating synthetic audio in {data_dir}", file=sys.stderr)
+    generate_inputs(data_dir, args.lengths, args.formats, args.batch_files)
+
+    rows = []
+    for model_size in (["stub"] if args.stub else args.models):
+        print(f"Benchmarking {model_size}", file=sys.stderr)
+        results = os.path.join(data_dir, f"results_{model_size}.json")
+        command = [sys.executable, os.path.abspath(__file__), "--run-model", model_size,
+                   "--results", results, "--data", data_dir,
+                   "--lengths", *map(str, args.lengths), "--paths", *args.paths,
+                   "--formats", *args.formats, "--batch-files", str(args.batch_files),
+                   "--workers", str(args.workers), "--repeat", str(args.repeat)]
+        if args.stub:
+            command.append("--stub")
+
+        # Model output goes to stderr so it doesn't mix with the table
+        if subprocess.run(command, stdout=sys.stderr).returncode != 0 or not os.path.exists(results):
+            print(f"Benchmark of {model_size} failed", file=sys.stderr)
+            continue
+        with open(results, encoding="utf-8") as f:
+            rows.extend(json.load(f))
+
+    if not args.data:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
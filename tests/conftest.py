@@ -0,0 +1,72 @@
+import os
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import transcriptor as ts
+
+
+def write_wav(path, samples, rate=16000):
+    """Write float samples in [-1, 1] as a 16-bit mono WAV file"""
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+    return str(path)
+
+
+def read_wav(path):
+    """Read a 16-bit mono WAV written by write_wav as 16 kHz float32 audio"""
+    with wave.open(str(path), "rb") as wf:
+        data = wf.readframes(wf.getnframes())
+    return ts.DecodedAudio(ts.pcm16_to_float32(data, ts.WHISPER_SAMPLE_RATE))
+
+
+class FakeModel:
+    """Stands in for a Whisper model, returning one segment per 2 s of audio"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.prompts = []
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.prompts.append(options.get("initial_prompt"))
+        try:
+            if self.delay:
+                import time
+                time.sleep(self.delay)
+            duration = len(audio) / ts.WHISPER_SAMPLE_RATE
+            segments = [{"start": t, "end": min(duration, t + 2.0), "text": f" w{int(t)}"}
+                        for t in np.arange(0.0, duration, 2.0)]
+            return {"text": "".join(s["text"] for s in segments), "segments": segments}
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Run each test in its own directory with no result cache and fresh caches and metrics"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ts, "TRANSCRIPTION_CACHE", None)
+    monkeypatch.setattr(ts, "MEDIA_PROBE_CACHE", ts.MediaProbeCache(str(tmp_path / "probe.jsonl")))
+    monkeypatch.setattr(ts, "METRICS", ts.Metrics())
+    return tmp_path
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Make the model registry hand out one FakeModel for every size"""
+    model = FakeModel()
+    monkeypatch.setattr(ts, "MODEL_REGISTRY", ts.ModelRegistry(loader=lambda size, **options: model))
+    return model
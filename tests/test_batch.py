@@ -0,0 +1,104 @@
+import os
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import transcriptor as ts
+from conftest import read_wav, write_wav
+
+
+def test_batched_results_are_cached_apart_from_transcribe_results(fake_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(ts, "TRANSCRIPTION_CACHE", ts.TranscriptionCache(str(tmp_path / "cache")))
+
+    def decode_audio(path, to_file=False):
+        # The first file finishes decoding last, so both are batched together
+        if path.endswith("clip0.wav"):
+            time.sleep(0.2)
+        return read_wav(path)
+
+    monkeypatch.setattr(ts, "decode_audio", decode_audio)
+    monkeypatch.setattr(ts.BatchedInference, "transcribe",
+                        lambda self, clips: [f" batched{len(clip)}" for clip in clips])
+
+    paths = [write_wav(tmp_path / f"clip{i}.wav", np.zeros(16000 * (i + 1))) for i in range(2)]
+    transcriptor = ts.AudioTranscriptor("base")
+    results = []
+    ts.BatchPipeline(paths, transcriptor, decode_threads=2).run(lambda index, path, text, error: results.append(text))
+
+    assert results == [" batched16000", " batched32000"]
+    for path, text in zip(paths, results):
+        assert ts.TRANSCRIPTION_CACHE.get(transcriptor.file_cache_key(path)) is None
+        assert ts.TRANSCRIPTION_CACHE.get(transcriptor.file_cache_key(path, batched=True)) == text
+
+    # A later batch run is served from the batched entries
+    results = []
+    ts.BatchPipeline(paths, transcriptor, decode_threads=2).run(lambda index, path, text, error: results.append(text))
+    assert results == [" batched16000", " batched32000"]
+
+
+def test_batched_windows_are_cut_at_silences_and_fit_one_window():
+    rate = ts.WHISPER_SAMPLE_RATE
+    audio = np.ones(rate * 70, dtype=np.float32)
+    audio[rate * 27:rate * 27 + rate // 10] = 0.0
+
+    windows = ts.plan_windows(audio, min_tail=0)
+    assert abs(windows[0][1] - 27.05) < 0.05
+    assert all(end - start <= ts.SEGMENT_WINDOW for start, end in windows)
+    assert windows[-1][1] == 70.0
+
+
+class RecordingPool:
+    """A worker pool that records its jobs and answers them at once"""
+
+    workers = 1
+    broken = False
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, job):
+        self.jobs.append(job)
+        if isinstance(job, tuple):
+            assert os.path.exists(job[0])
+        future = Future()
+        future.set_result(" pooled")
+        return future
+
+
+def test_long_files_reach_the_pool_as_a_mapped_file(monkeypatch, tmp_path):
+    def decode_audio(path, to_file=False):
+        audio = read_wav(path)
+        if not to_file:
+            return audio
+        raw_path = str(tmp_path / "decoded.f32")
+        audio.samples.tofile(raw_path)
+        return ts.DecodedAudio(np.memmap(raw_path, dtype=np.float32, mode="c"), raw_path)
+
+    monkeypatch.setattr(ts, "decode_audio", decode_audio)
+    path = write_wav(tmp_path / "long.wav", np.zeros(16000 * 61))
+    pool = RecordingPool()
+    results = []
+    ts.BatchPipeline([path], ts.AudioTranscriptor("base", lazy=True), pool=pool).run(
+        lambda index, path, text, error: results.append(text))
+
+    assert results == [" pooled"]
+    assert pool.jobs == [(str(tmp_path / "decoded.f32"), 0, 16000 * 61)]
+    assert not os.path.exists(tmp_path / "decoded.f32")
+
+
+def test_waiting_for_busy_inference_does_not_spin(fake_model, monkeypatch, tmp_path):
+    fake_model.delay = 0.3
+    monkeypatch.setattr(ts, "decode_audio", lambda path, to_file=False: read_wav(path))
+    calls = []
+    real_wait = ts.wait
+    monkeypatch.setattr(ts, "wait", lambda *args, **kwargs: calls.append(1) or real_wait(*args, **kwargs))
+
+    # Long files are transcribed one at a time, so decoded files queue behind the worker
+    paths = [write_wav(tmp_path / f"long{i}.wav", np.zeros(16000 * 61)) for i in range(3)]
+    results = []
+    ts.BatchPipeline(paths, ts.AudioTranscriptor("base"), decode_threads=3).run(
+        lambda index, path, text, error: results.append(error))
+
+    assert results == [None, None, None]
+    assert len(calls) < 50
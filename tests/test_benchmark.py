@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import benchmark
+
+
+def test_stage_times_exclude_nested_stages():
+    timer = benchmark.StageTimer()
+    decode = timer.wrap("decode", lambda: time.sleep(0.05))
+
+    def transcribe():
+        decode()
+        time.sleep(0.02)
+
+    timer.wrap("inference", transcribe)()
+    totals = timer.snapshot()
+    assert 0.05 <= totals["decode"] < 0.09
+    assert 0.02 <= totals["inference"] < 0.05
+
+
+def test_stub_run_reports_every_path(tmp_path):
+    output = tmp_path / "results.json"
+    script = os.path.join(os.path.dirname(benchmark.__file__), "benchmark.py")
+    subprocess.run([sys.executable, script, "--stub", "--lengths", "5", "--formats", "wav",
+                    "--batch-files", "2", "--data", str(tmp_path / "data"), "--json", str(output)],
+                   check=True, capture_output=True, timeout=120)
+
+    rows = json.loads(output.read_text(encoding="utf-8"))
+    assert [row["path"] for row in rows] == ["live", "file:wav", "segment", "batch"]
+    assert [row["files"] for row in rows] == [1, 1, 1, 2]
+    assert all(row["error"] is None and row["model"] == "stub" for row in rows)
+    assert all(row["rtf"] == row["wall"] / row["audio_seconds"] for row in rows)
+    assert "decode" in rows[1]["stages"] and "history" in rows[1]["stages"]
@@ -0,0 +1,87 @@
+import os
+
+import transcriptor as ts
+
+
+def entry_size(cache, key):
+    return os.path.getsize(cache._path(key))
+
+
+def test_get_and_put_round_trip(tmp_path):
+    cache = ts.TranscriptionCache(str(tmp_path / "cache"))
+    assert cache.get("a") is None
+    cache.put("a", "hello")
+    assert cache.get("a") == "hello"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # Errors are never cached
+    cache.put("b", "[ERROR: failed]")
+    assert cache.get("b") is None
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = ts.TranscriptionCache(directory)
+    cache.put("a", "x" * 100)
+    size = entry_size(cache, "a")
+    cache.max_bytes = size * 3 - 1  # Eviction frees space down to just over two results
+
+    cache.put("b", "x" * 100)
+    assert cache.get("a")  # a is now more recently used than b
+    cache.put("c", "x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["size"] <= cache.max_bytes * ts.CACHE_LOW_WATER
+
+
+def test_eviction_sees_results_written_by_other_processes(tmp_path):
+    directory = str(tmp_path / "cache")
+    ours = ts.TranscriptionCache(directory)
+    theirs = ts.TranscriptionCache(directory)
+    ours.put("a", "x" * 100)
+    theirs.put("b", "x" * 100)
+    size = entry_size(ours, "a")
+    ours.max_bytes = theirs.max_bytes = size * 3 - 1
+
+    # Our own results fit; once they don't, eviction also counts the other process's
+    ours.put("c", "x" * 100)
+    ours.put("d", "x" * 100)
+    assert sorted(name for name in os.listdir(directory) if name.endswith(".json")) == ["c.json", "d.json"]
+
+
+def test_puts_under_budget_do_not_rescan_the_directory(tmp_path, monkeypatch):
+    cache = ts.TranscriptionCache(str(tmp_path / "cache"))
+    scans = []
+    real_scan = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or real_scan())
+
+    for i in range(20):
+        cache.put(f"k{i}", "hello")
+    assert len(scans) == 1  # When the index was first loaded
+    assert cache.stats()["entries"] == 20
+    assert cache.stats()["size"] == sum(entry_size(cache, f"k{i}") for i in range(20))
+
+
+def test_digest_log_counts_toward_the_budget_and_is_compacted(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = ts.TranscriptionCache(directory)
+    media = tmp_path / "clip.wav"
+
+    # Each rewrite of the file leaves a stale digest record behind
+    for i in range(1500):
+        media.write_bytes(b"x" * (i + 1))
+        cache.file_digest(str(media))
+    log_size = os.path.getsize(cache.digest_log)
+    assert log_size > 64 * 1024
+    assert cache.stats()["size"] == log_size
+
+    cache.max_bytes = log_size
+    cache.put("a", "hello")
+
+    # Only the record for the file's current state survives
+    with open(cache.digest_log, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    assert cache.stats()["size"] == os.path.getsize(cache.digest_log) + entry_size(cache, "a")
+    assert cache.get("a") == "hello"
@@ -0,0 +1,145 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import transcriptor as ts
+
+
+def tone(seconds, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+
+
+def test_samples_stay_in_memory_under_the_budget():
+    capture = ts.CaptureBuffer(16000)
+    audio = tone(3)
+    capture.write(audio.tobytes())
+    samples = capture.get_samples()
+    assert samples.dtype == np.int16
+    assert np.array_equal(samples, audio)
+    capture.close()
+
+
+def test_spilled_recording_is_memory_mapped_from_disk():
+    capture = ts.CaptureBuffer(16000, memory_budget=4 * 16000)  # Two seconds in memory
+    audio = tone(7.3)
+    for offset in range(0, len(audio), 1000):
+        capture.write(audio[offset:offset + 1000].tobytes())
+    assert capture.spill_path
+
+    samples = capture.get_samples()
+    assert isinstance(samples, np.memmap)
+    assert np.array_equal(samples, audio)
+
+    spill_path = capture.spill_path
+    capture.close()
+    assert not os.path.exists(spill_path)
+
+
+def test_int16_audio_is_streamed_window_by_window(fake_model):
+    audio = tone(65)
+    segments = list(ts.AudioTranscriptor("base").transcribe_audio_stream(audio))
+    assert fake_model.calls == 2
+    assert segments[-1]["progress"] == 1.0
+    assert segments[-1]["end"] == 65.0
+
+
+def test_recordings_are_transcribed_from_memory(fake_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    transcribed = []
+    transcribe = fake_model.transcribe
+    monkeypatch.setattr(fake_model, "transcribe", lambda audio, **options: transcribed.append(audio) or transcribe(audio, **options))
+
+    capture = ts.CaptureBuffer(16000)
+    capture.write(tone(5).tobytes())
+    gui = ts.TranscriptorGUI.__new__(ts.TranscriptorGUI)
+    gui.ui = SimpleNamespace(post=lambda *args, **kwargs: None)
+    job = {"transcriptor": ts.AudioTranscriptor("base"), "capture": capture, "live": None,
+           "cancel": threading.Event()}
+
+    assert gui.transcribe_recording(job) == "w0 w2 w4"
+    # The model got the samples themselves, and nothing was written to disk
+    assert all(isinstance(audio, np.ndarray) and audio.dtype == np.float32 for audio in transcribed)
+    assert sum(len(audio) for audio in transcribed) >= 16000 * 5
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".wav")]
+
+
+class Widget:
+    """Accepts any widget call, remembering configured options and inserted text"""
+
+    def __init__(self):
+        self.options = {}
+        self.text = ""
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def __setitem__(self, name, value):
+        self.options[name] = value
+
+    def insert(self, index, text):
+        self.text = text + self.text
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def test_recordings_are_transcribed_in_order_on_a_worker(fake_model, monkeypatch):
+    gate = threading.Semaphore(0)  # One model call per release
+    transcribe = fake_model.transcribe
+    monkeypatch.setattr(fake_model, "transcribe", lambda audio, **options: gate.acquire() and transcribe(audio, **options))
+
+    posted = queue.Queue()
+    gui = ts.TranscriptorGUI.__new__(ts.TranscriptorGUI)
+    gui.ui = SimpleNamespace(post=lambda callback, *args, key=None: posted.put((callback, args)))
+    for name in ("jobs_frame", "jobs_label", "jobs_progress", "jobs_cancel_button", "output_text",
+                 "word_count_label", "copy_button", "export_button"):
+        setattr(gui, name, Widget())
+    gui.recording_jobs = queue.Queue()
+    gui.recording_worker = None
+    gui.queued_recordings = 0
+    gui.current_recording_job = None
+    logged = []
+    gui.log_transcription = logged.append
+
+    def pump(until):
+        """Apply posted UI calls on this thread, as the event bus would, until a condition holds"""
+        deadline = time.time() + 5
+        while not until():
+            callback, args = posted.get(timeout=deadline - time.time())
+            callback(*args)
+
+    transcriptor = ts.AudioTranscriptor("base")
+    jobs = []
+    for i in range(3):
+        capture = ts.CaptureBuffer(16000)
+        capture.write(tone(5).tobytes())
+        jobs.append({"transcriptor": transcriptor, "capture": capture, "live": None, "live_mark": None,
+                     "timestamp": f"2024-01-01 00:00:0{i}", "cancel": threading.Event()})
+        gui.enqueue_recording(jobs[-1])
+
+    # Recording can go on while the first is transcribed and the others wait
+    pump(lambda: gui.current_recording_job is jobs[0])
+    assert gui.jobs_label.options["text"] == "TRANSCRIBING RECORDING (+2 QUEUED)"
+
+    gate.release()
+    pump(lambda: gui.current_recording_job is jobs[1])
+    assert logged == ["w0 w2 w4"]
+    assert gui.jobs_label.options["text"] == "TRANSCRIBING RECORDING (+1 QUEUED)"
+
+    # Cancelling stops only the recording being transcribed
+    gui.cancel_recording_job()
+    gate.release()
+    gate.release()
+    pump(lambda: gui.queued_recordings == 0)
+    assert logged == ["w0 w2 w4", "w0 w2 w4"]
+    # Newest on top, each in the order it was recorded
+    output = gui.output_text.text
+    cancelled = output.index("[CANCELLED]\n[TIMESTAMP: 2024-01-01 00:00:01]\n")
+    assert output.index("[RECORDING_2024-01-01 000002]") < cancelled < output.index("[RECORDING_2024-01-01 000000]")
+    assert gui.current_recording_job is None
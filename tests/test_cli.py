@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+import transcriptor as ts
+from conftest import read_wav, write_wav
+
+
+@pytest.fixture
+def clips(fake_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(ts, "decode_audio", lambda path, to_file=False: read_wav(path))
+    folder = tmp_path / "clips"
+    folder.mkdir()
+    return [write_wav(folder / f"clip{i}.wav", np.zeros(16000 * (i + 5))) for i in range(2)]
+
+
+def run_main(argv):
+    """Run main() and return its exit code"""
+    with pytest.raises(SystemExit) as exit_info:
+        ts.main(argv)
+    return exit_info.value.code
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_transcribe_writes_one_record_per_file_and_to_the_history(clips, tmp_path):
+    output = tmp_path / "out.jsonl"
+    code = run_main(["transcribe", str(tmp_path / "clips"), "-o", str(output), "--history", "--metrics-file", ""])
+
+    assert code == 0
+    records = read_records(output)
+    assert [r["file"] for r in records] == clips
+    assert [r["text"] for r in records] == ["w0 w2 w4", "w0 w2 w4"]
+    assert all(r["error"] is None and r["model"] == "base" for r in records)
+
+    texts = [entry["text"] for entry in ts.HistoryStore().iter_entries()]
+    assert texts == ["[FILE: clip0.wav]\n w0 w2 w4", "[FILE: clip1.wav]\n w0 w2 w4"]
+
+
+def test_segment_emits_each_segment_before_the_file_result(clips, tmp_path):
+    output = tmp_path / "out.jsonl"
+    assert run_main(["segment", clips[0], "-o", str(output), "--metrics-file", ""]) == 0
+
+    records = read_records(output)
+    segments, result = records[:-1], records[-1]
+    assert segments and all(r["file"] == clips[0] and "segment" in r for r in segments)
+    assert [r["segment"] for r in segments] == list(range(len(segments)))
+    assert result["file"] == clips[0] and result["error"] is None
+    assert result["segments"] == len(segments)
+
+
+def test_batch_reports_failures_in_the_exit_code(clips, tmp_path):
+    broken = tmp_path / "clips" / "broken.wav"
+    broken.write_bytes(b"not audio")
+    output = tmp_path / "out.jsonl"
+
+    # One clip at a time, as batched decoding needs a real Whisper model
+    argv = ["batch", str(tmp_path / "clips"), "-w", "1", "--batch-size", "1", "-o", str(output), "--metrics-file", ""]
+    assert run_main(argv) == 1
+    records = {r["file"]: r for r in read_records(output)}
+    assert records[str(broken)]["error"] and records[str(broken)]["text"] is None
+    assert [records[path]["text"] for path in clips] == ["w0 w2 w4", "w0 w2 w4"]
+
+
+def test_main_dispatches_commands_and_rejects_bad_arguments(monkeypatch, tmp_path):
+    called = []
+    monkeypatch.setattr(ts, "run_service", lambda args: called.append(("serve", args.port)) or 0)
+    monkeypatch.setattr(ts, "run_client", lambda args: called.append(("client", args.health)) or 0)
+    monkeypatch.setattr(ts, "run_watch", lambda args: called.append(("watch", args.directories)) or 0)
+
+    assert run_main(["serve", "--port", "9000"]) == 0
+    assert run_main(["client", "--health"]) == 0
+    assert run_main(["watch", str(tmp_path)]) == 0
+    assert called == [("serve", 9000), ("client", True), ("watch", [str(tmp_path)])]
+
+    assert run_main(["transcribe", str(tmp_path / "missing*.wav")]) == 2  # No input files
+    assert run_main(["unknown"]) == 2  # Rejected by the argument parser
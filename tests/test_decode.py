@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+import transcriptor as ts
+
+
+def test_close_unmaps_and_deletes_the_raw_file(tmp_path):
+    raw_path = str(tmp_path / "audio.f32")
+    np.arange(32000, dtype=np.float32).tofile(raw_path)
+    samples = np.memmap(raw_path, dtype=np.float32, mode="c")
+    audio = ts.DecodedAudio(samples, raw_path)
+
+    assert audio.duration == 2.0
+    assert audio.segment_job(0.5, 1.0) == (raw_path, 8000, 16000)
+    assert audio.slice(0.5, 1.0)[0] == 8000
+
+    audio.close()
+    assert samples._mmap.closed
+    assert not os.path.exists(raw_path)
+    assert audio.raw_path is None and len(audio.samples) == 0
+
+
+def test_in_memory_audio_is_sliced_directly():
+    audio = ts.DecodedAudio(np.zeros(16000, dtype=np.float32))
+    job = audio.segment_job(0.25, 0.75)
+    assert isinstance(job, np.ndarray) and len(job) == 8000
+    audio.close()
+
+
+def test_moviepy_without_editor_module_gives_the_clean_error(tmp_path, monkeypatch):
+    # moviepy 2.x is found as a package but has no moviepy.editor
+    def timed_import(name):
+        raise ModuleNotFoundError(f"No module named '{name}'")
+
+    monkeypatch.setattr(ts, "MOVIEPY_AVAILABLE", True)
+    monkeypatch.setattr(ts, "moviepy_editor", None)
+    monkeypatch.setattr(ts, "timed_import", timed_import)
+    monkeypatch.setenv("PATH", str(tmp_path))  # No ffmpeg or ffprobe
+
+    path = tmp_path / "clip.ogg"
+    path.write_bytes(b"OggS" + bytes(100))
+    with pytest.raises(ValueError, match="Failed to decode audio"):
+        ts.decode_audio(str(path))
+    assert ts.MOVIEPY_AVAILABLE is False
+    assert ts.load_moviepy() is None
+
+    monkeypatch.setattr(ts, "MOVIEPY_AVAILABLE", True)
+    with pytest.raises(ImportError, match="install ffmpeg"):
+        ts.read_media_info(str(path), ".ogg")
@@ -0,0 +1,178 @@
+import json
+
+import pytest
+
+import transcriptor as ts
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ts.HistoryIndex(str(tmp_path / "history.db"))
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("hello world", '"hello" AND "world"'),
+    ('"exact phrase" word', '"exact phrase" AND "word"'),
+    ("trans*", '"trans"*'),
+    ("session_id:abc", 'session_id:"abc"'),
+    ('file_name:"my file"', 'file_name:"my file"'),
+    ("10:30", '"10:30"'),
+    ('note:"call back"', '"note:call back"'),
+    ('say "it"s', '"say" AND "it" AND "s"'),
+    ("*", ""),
+])
+def test_build_query(index, query, expected):
+    assert index._build_query(query) == expected
+
+
+def test_search_with_unknown_prefix_matches_the_literal_text(index, tmp_path):
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(tmp_path / "history.json"))
+    ts.record_transcription("meeting moved to 10:30 tomorrow", "s1", store, index)
+    ts.record_transcription("30 minutes late", "s1", store, index)
+    assert [entry["text"] for entry in index.search("10:30")] == ["meeting moved to 10:30 tomorrow"]
+    store.close()
+
+
+def test_entries_appended_by_another_process_are_indexed(index, tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    ours = ts.HistoryStore(path, str(tmp_path / "history.json"))
+    theirs = ts.HistoryStore(path, str(tmp_path / "history.json"))
+
+    # Another process appends without indexing, then we record an entry
+    theirs.append({"session_id": "s2", "timestamp": "", "text": "written elsewhere", "word_count": 2})
+    ts.record_transcription("written here", "s1", ours, index)
+
+    assert sorted(entry["text"] for entry in index.search("written")) == ["written elsewhere", "written here"]
+
+    # Catching up later does not index anything twice
+    index.catch_up(ours)
+    assert len(index.search("written")) == 2
+    ours.close()
+    theirs.close()
+
+
+def test_labelled_file_entries_are_searchable_by_file_name(index, tmp_path):
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(tmp_path / "history.json"))
+    for label in ("FILE", "BATCH FILE", "WATCH FILE"):
+        ts.record_transcription(f"[{label}: memo_{label.split()[0].lower()}.wav]\nhello", "s1", store, index)
+
+    assert [entry["text"] for entry in index.search("file_name:memo_watch*")] == ["[WATCH FILE: memo_watch.wav]\nhello"]
+    assert len(index.search("file_name:memo*")) == 3
+    store.close()
+
+
+def entry(text):
+    return {"session_id": "s1", "timestamp": "2024-01-01 00:00:00", "text": text, "word_count": len(text.split())}
+
+
+def test_legacy_history_is_migrated_once(tmp_path):
+    legacy = tmp_path / "history.json"
+    legacy.write_text(json.dumps([entry("first"), entry("second")]), encoding="utf-8")
+
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(legacy))
+    store.append(entry("third"))
+    store.close()
+    assert [e["text"] for e in store.iter_entries()] == ["first", "second", "third"]
+    assert not legacy.exists() and (tmp_path / "history.json.migrated").exists()
+
+    # A new legacy file doesn't overwrite the log that already exists
+    legacy.write_text(json.dumps([entry("stale")]), encoding="utf-8")
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(legacy))
+    assert [e["text"] for e in store.iter_entries()] == ["first", "second", "third"]
+
+
+def test_corrupt_legacy_history_is_kept_aside(tmp_path):
+    legacy = tmp_path / "history.json"
+    legacy.write_text("[{\"text\": ", encoding="utf-8")
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(legacy))
+    assert not store.exists()
+    assert (tmp_path / "history.json.corrupt").read_text(encoding="utf-8") == "[{\"text\": "
+
+
+def test_entries_are_read_newest_first_across_blocks_and_torn_lines(tmp_path):
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(tmp_path / "history.json"))
+    texts = [f"entry {i} " + "x" * (i * 37 % 200) for i in range(300)]
+    for text in texts:
+        store.append(entry(text))
+    store.close()
+    with open(store.path, "ab") as f:
+        f.write(b'{"text": "torn')  # A write cut short by a crash
+
+    assert [e["text"] for e in store.iter_entries(reverse=True)] == texts[::-1]
+    with open(store.path, "rb") as f:
+        lines = list(store._iter_lines_reverse(f, block_size=64))
+    assert [json.loads(line)["text"] for line in lines[1:] if line] == texts[::-1]
+
+    # The next append starts on a fresh line instead of joining the torn one
+    store.append(entry("after the crash"))
+    store.close()
+    assert [e["text"] for e in store.iter_entries()] == texts + ["after the crash"]
+
+
+class FakeText:
+    """Just enough of a Tk Text widget for the history view, kept as (text, tag) chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.inserts = 0
+        self.vbar = type("Scrollbar", (), {"set": lambda self, first, last: None})()
+
+    def insert(self, index, text, tag=None):
+        self.inserts += 1
+        self.chunks.insert(0 if index == "1.0" else len(self.chunks), (text, tag))
+
+    def delete(self, first, last=None):
+        if first == "footer.first":
+            self.chunks = [chunk for chunk in self.chunks if chunk[1] != "history_footer"]
+        else:
+            self.chunks = []
+
+    def tag_ranges(self, tag):
+        return ("footer.first", "footer.last") if any(t == tag for _, t in self.chunks) else ()
+
+    def config(self, **options):
+        pass
+
+    def yview_moveto(self, fraction):
+        pass
+
+    @property
+    def content(self):
+        return "".join(text for text, _ in self.chunks)
+
+
+def test_history_view_renders_one_page_at_a_time(monkeypatch, tmp_path):
+    monkeypatch.setattr(ts, "tk", type("tk", (), {"END": "end"}))
+    store = ts.HistoryStore(str(tmp_path / "history.jsonl"), str(tmp_path / "history.json"))
+    for i in range(120):
+        store.append(entry(f"entry {i}"))
+
+    gui = ts.TranscriptorGUI.__new__(ts.TranscriptorGUI)
+    gui.history_store = store
+    gui.history_text = FakeText()
+    gui.root = type("Root", (), {"after_idle": lambda self, callback: callback()})()
+
+    gui.load_history()
+    assert gui.history_shown == ts.HISTORY_PAGE_SIZE
+    assert gui.history_text.content.index("entry 119\n") < gui.history_text.content.index("entry 70\n")
+    assert "entry 69\n" not in gui.history_text.content
+    assert gui.history_text.content.endswith("[SCROLL FOR MORE...]\n")
+
+    # Scrolling near the end renders the next page with a single insert
+    inserts = gui.history_text.inserts
+    gui.on_history_scroll("0.5", "0.8")
+    assert gui.history_shown == ts.HISTORY_PAGE_SIZE
+    gui.on_history_scroll("0.7", "0.95")
+    assert gui.history_shown == 2 * ts.HISTORY_PAGE_SIZE
+    assert gui.history_text.inserts == inserts + 2  # The page and the footer
+    gui.on_history_scroll("0.8", "1.0")
+    assert gui.history_shown == 120
+    assert gui.history_text.content.endswith("entry 0\n" + "=" * 50 + "\n\nTOTAL ENTRIES: 120\n")
+
+    # A new transcription goes on top without rebuilding the view
+    gui.prepend_history_entry(entry("newest"))
+    assert gui.history_text.content.startswith("[SESSION: s1]\n[TIMESTAMP: 2024-01-01 00:00:00]\n[WORDS: 1]\nnewest\n")
+    assert gui.history_text.content.endswith("TOTAL ENTRIES: 121\n")
+    store.close()
@@ -0,0 +1,107 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import transcriptor as ts
+
+
+def pcm16(seconds, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16).tobytes()
+
+
+def test_finish_transcribes_remaining_audio(fake_model):
+    updates = []
+    live = ts.LiveTranscriber(ts.AudioTranscriptor("base"), 16000, lambda c, t: updates.append((c, t)))
+    live.feed(pcm16(5))
+    assert live.finish() == "w0 w2 w4"
+
+
+def test_cancel_stops_finish_without_waiting_for_the_final_pass(fake_model):
+    fake_model.delay = 1.0
+    updates = []
+    live = ts.LiveTranscriber(ts.AudioTranscriptor("base"), 16000, lambda c, t: updates.append((c, t)))
+    live.feed(pcm16(5))
+
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    start = time.time()
+    assert live.finish(cancel) is None
+    assert time.time() - start < 0.5
+
+    live.thread.join()
+    assert updates == []
+
+
+class OneSegmentModel:
+    """Returns the whole pending audio as one segment, or nothing for silence"""
+
+    def __init__(self, text=" hello"):
+        self.text = text
+
+    def transcribe(self, audio, **options):
+        duration = len(audio) / ts.WHISPER_SAMPLE_RATE
+        if not self.text:
+            return {"text": "", "segments": []}
+        return {"text": self.text, "segments": [{"start": 0.0, "end": duration, "text": self.text}]}
+
+
+def forced_commit(monkeypatch, model):
+    monkeypatch.setattr(ts, "MODEL_REGISTRY", ts.ModelRegistry(loader=lambda size, **options: model))
+    updates = []
+    live = ts.LiveTranscriber(ts.AudioTranscriptor("base"), 16000, lambda c, t: updates.append((c, t)))
+    live.finished.set()
+    live.thread.join()
+    live.pending.extend(pcm16(ts.LIVE_WINDOW + 1))
+    live._transcribe_pending(final=False)
+    return live, updates
+
+
+def test_forced_commit_with_a_single_segment_commits_it(monkeypatch):
+    live, updates = forced_commit(monkeypatch, OneSegmentModel())
+    assert live.committed == ["hello"]
+    assert len(live.pending) == 0
+    assert updates[-1] == ("hello", "")
+
+
+def test_forced_commit_of_silence_drops_all_but_the_live_edge(monkeypatch):
+    live, updates = forced_commit(monkeypatch, OneSegmentModel(text=""))
+    assert live.committed == []
+    assert len(live.pending) == int(ts.LIVE_MARGIN * 16000) * 2
+
+
+def test_live_recording_feeds_the_transcriber_without_keeping_a_capture(fake_model, monkeypatch):
+    stream = SimpleNamespace(start_stream=lambda: None, stop_stream=lambda: None, close=lambda: None)
+
+    class FakePyAudio:
+        def get_default_input_device_info(self):
+            raise OSError("no device")  # Falls back to recording at RECORD_RATE
+
+        def open(self, **options):
+            return stream
+
+    monkeypatch.setattr(ts, "pyaudio", SimpleNamespace(PyAudio=FakePyAudio, paInt16=8, paContinue=0))
+    widget = SimpleNamespace(configure=lambda **options: None)
+    gui = ts.TranscriptorGUI.__new__(ts.TranscriptorGUI)
+    gui.record_button = gui.status_label = widget
+    gui.live_var = SimpleNamespace(get=lambda: True)
+    gui.start_live_output = lambda: "live_end_0"
+    gui.ui = SimpleNamespace(post=lambda *args, **kwargs: None)
+    gui.transcriptor = ts.AudioTranscriptor("base")
+    gui.audio = None
+    jobs = []
+    gui.enqueue_recording = jobs.append
+
+    gui.start_recording()
+    assert gui.capture is None
+    fed = []
+    feed = gui.live_transcriber.feed
+    monkeypatch.setattr(gui.live_transcriber, "feed", lambda data: fed.append(len(data)) or feed(data))
+    gui.audio_callback(pcm16(5, rate=ts.RECORD_RATE), 0, None, 0)
+    assert abs(sum(fed) - 16000 * 5 * 2) <= 4  # Resampled to 16 kHz
+    gui.stop_recording()
+
+    assert jobs[0]["capture"] is None
+    assert gui.transcribe_recording(jobs[0]) == "w0 w2 w4"
@@ -0,0 +1,59 @@
+import json
+
+import transcriptor as ts
+
+
+def test_prometheus_text_format():
+    metrics = ts.Metrics(enabled=True, buckets=(0.1, 1.0))
+    metrics.count("files_total", path="file")
+    metrics.count("files_total", 2, path="batch")
+    metrics.observe("stage_seconds", 0.05, stage="decode")
+    metrics.observe("stage_seconds", 0.5, stage="decode")
+    metrics.observe("stage_seconds", 3.0, stage="decode")
+
+    assert metrics.prometheus_text() == "\n".join([
+        "# TYPE cyberscribe_files_total counter",
+        'cyberscribe_files_total{path="batch"} 2',
+        'cyberscribe_files_total{path="file"} 1',
+        "# TYPE cyberscribe_stage_seconds histogram",
+        'cyberscribe_stage_seconds_bucket{stage="decode",le="0.1"} 1',
+        'cyberscribe_stage_seconds_bucket{stage="decode",le="1.0"} 2',
+        'cyberscribe_stage_seconds_bucket{stage="decode",le="+Inf"} 3',
+        'cyberscribe_stage_seconds_sum{stage="decode"} 3.55',
+        'cyberscribe_stage_seconds_count{stage="decode"} 3',
+    ]) + "\n"
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = ts.Metrics(enabled=False)
+    metrics.count("files_total")
+    metrics.observe("stage_seconds", 1.0, stage="decode")
+    assert metrics.prometheus_text() == ""
+    assert metrics.total("files_total") == 0
+
+
+def test_export_writes_json_or_text(tmp_path):
+    metrics = ts.Metrics(enabled=True, buckets=(1.0,))
+    metrics.count("errors_total", stage="file")
+    metrics.observe("stage_seconds", 0.5, stage="inference")
+
+    metrics.export(str(tmp_path / "metrics.json"))
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    assert snapshot["counters"] == [{"name": "errors_total", "labels": {"stage": "file"}, "value": 1}]
+    assert snapshot["histograms"][0]["buckets"] == {"1.0": 1, "+Inf": 1}
+
+    metrics.export(str(tmp_path / "metrics.prom"))
+    assert (tmp_path / "metrics.prom").read_text() == metrics.prometheus_text()
+
+
+def test_timed_stage_records_each_call(monkeypatch):
+    metrics = ts.Metrics(enabled=True)
+    monkeypatch.setattr(ts, "METRICS", metrics)
+
+    @ts.timed_stage("probe")
+    def probe():
+        return 42
+
+    assert probe() == 42 and probe() == 42
+    count, seconds = metrics.stage_summary()["probe"]
+    assert count == 2 and seconds >= 0
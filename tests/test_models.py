@@ -0,0 +1,121 @@
+import threading
+import time
+
+import transcriptor as ts
+
+MB = 1024 * 1024
+
+
+class LoadedModel:
+    def __init__(self, size, options):
+        self.size = size
+        self.options = options
+
+
+def registry(budget, delay=0.0):
+    loads = []
+
+    def loader(size, **options):
+        time.sleep(delay)
+        loads.append(size)
+        return LoadedModel(size, options)
+
+    return ts.ModelRegistry(memory_budget=budget, loader=loader), loads
+
+
+def test_models_are_cached_per_size_and_options():
+    models, loads = registry(1000 * MB)
+    base = models.get("base")
+    assert models.get("base") is base
+    assert models.get("base", device="cpu") is not base
+    assert loads == ["base", "base"]
+    assert models.stats()["hits"] == 1
+    assert models.stats()["misses"] == 2
+
+
+def test_least_recently_used_model_is_evicted_over_budget():
+    # Sizes come from MODEL_MEMORY_ESTIMATES since the stand-ins have no parameters
+    models, loads = registry(ts.MODEL_MEMORY_ESTIMATES["base"] * 2)
+    tiny = models.get("tiny")
+    models.get("base")
+    assert models.get("tiny") is tiny  # tiny is now the most recently used
+
+    models.get("small")  # Needs more room than is left with both loaded
+    stats = models.stats()
+    assert stats["loaded"] == ["small"]
+    assert stats["evictions"] == 2
+
+    # The most recently used model stays even when it alone exceeds the budget
+    assert models.get("small") is not None
+    assert models.stats()["loaded"] == ["small"]
+
+
+def test_concurrent_requests_load_a_model_once():
+    models, loads = registry(1000 * MB, delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(models.get("base"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == ["base"]
+    assert all(model is results[0] for model in results)
+
+
+def test_inference_lock_is_shared_per_model():
+    models, _ = registry(1000 * MB)
+    assert models.inference_lock("base") is models.inference_lock("base")
+    assert models.inference_lock("base") is not models.inference_lock("tiny")
+
+
+class Widget:
+    def __init__(self):
+        self.options = {}
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def __setitem__(self, name, value):
+        self.options[name] = value
+
+    def pack(self, **options):
+        pass
+
+    def pack_forget(self):
+        pass
+
+
+def test_gui_loads_and_warms_up_the_model_in_the_background(fake_model, tmp_path):
+    main_thread = threading.current_thread()
+    posted = []
+    done = threading.Event()
+
+    def post(callback, *args, key=None):
+        # Applied later on this thread, like the UI event bus does
+        posted.append((threading.current_thread() is main_thread, callback, args))
+        if callback == gui.finish_model_load:
+            done.set()
+
+    gui = ts.TranscriptorGUI.__new__(ts.TranscriptorGUI)
+    gui.model_loading = False
+    gui.settings = gui.load_settings()
+    gui.model_var = type("Var", (), {"get": lambda self: "tiny"})()
+    gui.load_button = gui.status_label = gui.load_progress = Widget()
+    gui.root = type("Root", (), {"after": lambda self, ms, callback: None})()
+    gui.ui = type("Bus", (), {"post": staticmethod(post)})()
+    gui.transcriptor = None
+
+    gui.load_model(auto=True)
+    assert gui.model_loading
+    assert done.wait(5)
+    assert gui.transcriptor is None  # Installed only once the UI applies the result
+
+    assert not any(on_main for on_main, _, _ in posted)  # UI updates came from the loading thread
+    for _, callback, args in posted:
+        callback(*args)
+    assert gui.transcriptor.model_size == "tiny"
+    assert fake_model.calls == 1  # The warm-up inference
+    assert gui.status_label.options["text"] == "STATUS: TINY MODEL LOADED"
+
+    # The next launch loads the same model
+    assert ts.TranscriptorGUI.load_settings(gui)["last_model"] == "tiny"
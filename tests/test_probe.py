@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+import transcriptor as ts
+from conftest import write_wav
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.mark.parametrize("name, probe, duration, sample_rate, channels, codec", [
+    # Encoder padding makes MP3 durations run a little long
+    ("tone_cbr.mp3", ts.probe_mp3, 2.0, 16000, 1, "mp3"),
+    ("tone_vbr.mp3", ts.probe_mp3, 3.0, 22050, 2, "mp3"),
+    ("tone.mp4", ts.probe_mp4, 2.5, 16000, 1, "aac"),
+])
+def test_probe_containers(name, probe, duration, sample_rate, channels, codec):
+    info = probe(os.path.join(FIXTURES, name))
+    assert info["duration"] == pytest.approx(duration, abs=0.1)
+    assert (info["sample_rate"], info["channels"], info["codec"]) == (sample_rate, channels, codec)
+
+
+def test_probes_return_none_for_other_data(tmp_path):
+    path = tmp_path / "blank"
+    path.write_bytes(bytes(4096))
+    assert ts.probe_mp3(str(path)) is None
+    assert ts.probe_mp4(str(path)) is None
+
+
+def test_probe_results_are_cached_by_path_size_and_mtime(tmp_path, monkeypatch):
+    path = write_wav(tmp_path / "clip.wav", np.zeros(16000 * 3))
+    assert ts.probe_duration(path) == 3.0
+
+    # Unchanged files are not read again, even by a new process
+    monkeypatch.setattr(ts, "read_media_info", lambda *args: pytest.fail("probed twice"))
+    assert ts.probe_duration(path) == 3.0
+    monkeypatch.setattr(ts, "MEDIA_PROBE_CACHE", ts.MediaProbeCache(str(tmp_path / "probe.jsonl")))
+    assert ts.probe_media(path)["codec"] == "pcm_s16le"
+
+    # A changed file is probed again
+    monkeypatch.undo()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ts, "MEDIA_PROBE_CACHE", ts.MediaProbeCache(str(tmp_path / "probe.jsonl")))
+    write_wav(path, np.zeros(16000 * 5))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert ts.probe_duration(path) == 5.0
+
+
+@pytest.mark.parametrize("seconds, text", [(42.4, "42s"), (185, "3m 05s"), (3720, "1h 02m")])
+def test_format_duration(seconds, text):
+    assert ts.format_duration(seconds) == text
@@ -0,0 +1,83 @@
+import numpy as np
+
+import transcriptor as ts
+
+RATE = 1000  # A low sample rate keeps long test signals small
+
+
+def noise(seconds, quiet=()):
+    """Loud audio with silent stretches at the given (start, end) times"""
+    audio = np.ones(int(seconds * RATE), dtype=np.float32)
+    for start, end in quiet:
+        audio[int(start * RATE):int(end * RATE)] = 0.0
+    return audio
+
+
+def assert_contiguous(spans, duration):
+    assert spans[0][0] == 0.0
+    assert spans[-1][1] == duration
+    for (_, end), (start, _) in zip(spans, spans[1:]):
+        assert end == start
+
+
+def test_find_silence_cuts_in_the_quietest_frame():
+    audio = noise(60, quiet=[(42.0, 42.3)])
+    cut = ts.find_silence(audio, 40.0, 45.0, RATE)
+    assert 42.0 <= cut <= 42.3
+
+
+def test_find_silence_without_a_full_frame_returns_the_range_end():
+    audio = noise(10)
+    assert ts.find_silence(audio, 5.0, 5.01, RATE) == 5.01
+
+
+def test_short_audio_is_one_segment():
+    assert ts.plan_segments(noise(ts.SEGMENT_MIN_LENGTH), 4, RATE) == [(0.0, ts.SEGMENT_MIN_LENGTH)]
+
+
+def test_segments_are_shared_between_workers_and_cut_at_silences():
+    audio = noise(300, quiet=[(147.0, 147.3)])
+    segments = ts.plan_segments(audio, 2, RATE)
+    assert len(segments) == 2
+    assert 147.0 <= segments[0][1] <= 147.3
+    assert_contiguous(segments, 300.0)
+
+
+def test_segments_are_capped_and_a_short_tail_is_merged():
+    segments = ts.plan_segments(noise(1300), 1, RATE)
+    assert len(segments) == 3
+    assert all(end - start <= ts.SEGMENT_MAX_LENGTH for start, end in segments)
+    assert_contiguous(segments, 1300.0)
+
+    # 10 s past the second cut is shorter than SEGMENT_MIN_TAIL, so it joins the last segment
+    segments = ts.plan_segments(noise(1210), 1, RATE)
+    assert len(segments) == 2
+    assert segments[-1][1] - segments[-1][0] > ts.SEGMENT_MAX_LENGTH
+    assert_contiguous(segments, 1210.0)
+
+
+def test_windows_are_cut_at_silences_and_merge_a_short_tail():
+    audio = noise(100, quiet=[(27.0, 27.3)])
+    windows = ts.plan_windows(audio, RATE)
+    assert 27.0 <= windows[0][1] <= 27.3
+    assert all(end - start <= ts.SEGMENT_WINDOW for start, end in windows[:-1])
+    assert_contiguous(windows, 100.0)
+
+    # A tail under SEGMENT_MIN_TAIL joins the previous window
+    assert ts.plan_windows(noise(40), RATE) == [(0.0, 40.0)]
+
+
+def test_streamed_windows_carry_the_text_so_far_as_prompt(fake_model):
+    rate = ts.WHISPER_SAMPLE_RATE
+    audio = np.ones(rate * 70, dtype=np.float32)
+    audio[rate * 27:rate * 27 + rate // 4] = 0.0
+    segments = list(ts.AudioTranscriptor("base").transcribe_audio_stream(audio))
+
+    assert fake_model.calls == 2
+    assert fake_model.prompts[0] is None
+    assert fake_model.prompts[1].endswith("w24 w26")
+
+    # Segment times are relative to the file, and the first window's last segment ends at the cut
+    assert segments[13]["end"] == segments[14]["start"]
+    assert 27.0 <= segments[14]["start"] <= 27.25
+    assert segments[-1]["end"] == 70.0 and segments[-1]["progress"] == 1.0
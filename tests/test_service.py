@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import transcriptor as ts
+from conftest import read_wav, write_wav
+
+
+class BrokenPool:
+    """A worker pool whose jobs all fail, so segments fall back to the in-process model"""
+
+    def __init__(self, model_size, workers, **model_options):
+        self.model_size = model_size
+        self.workers = workers
+        self.broken = False
+
+    def submit(self, job):
+        future = Future()
+        future.set_exception(RuntimeError("worker died"))
+        return future
+
+    def shutdown(self, cancel=True):
+        pass
+
+
+def test_concurrent_short_jobs_do_not_share_the_model(fake_model, monkeypatch, tmp_path):
+    fake_model.delay = 0.05
+    monkeypatch.setattr(ts, "TranscriptionPool", BrokenPool)
+    monkeypatch.setattr(ts, "decode_audio", lambda path, to_file=False: read_wav(path))
+
+    paths = [write_wav(tmp_path / f"clip{i}.wav", np.zeros(16000 * 5)) for i in range(2)]
+    service = ts.TranscriptionService("base", concurrency=2)
+    try:
+        jobs = [service.submit(path) for path in paths]
+        for job in jobs:
+            job.wait_events(0, timeout=5)
+            with job.changed:
+                job.changed.wait_for(lambda: job.done, timeout=5)
+    finally:
+        service.shutdown()
+
+    assert [job.status for job in jobs] == ["done", "done"]
+    assert all(job.text == "w0 w2 w4" for job in jobs)
+    assert fake_model.calls == 2
+    assert fake_model.max_active == 1
+
+
+def test_broken_pool_fails_jobs_and_is_replaced(monkeypatch):
+    pool = ts.TranscriptionPool.__new__(ts.TranscriptionPool)
+    pool.broken = False
+    pool.executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        # A worker process dying breaks the executor
+        future = pool._submit(os._exit, 1)
+        assert isinstance(future.exception(timeout=30), BrokenProcessPool)
+        assert pool.broken
+
+        # Later jobs fail through their future instead of raising
+        assert isinstance(pool.submit("clip.wav").exception(timeout=5), BrokenProcessPool)
+    finally:
+        pool.executor.shutdown()
+
+    monkeypatch.setattr(ts, "TranscriptionPool", BrokenPool)
+    service = ts.TranscriptionService("base", concurrency=2)
+    try:
+        first = service.pool
+        assert service.get_pool("base", 2) is first
+        first.broken = True
+        assert service.get_pool("base", 2) is not first
+    finally:
+        service.shutdown()
+
+
+def test_gui_pool_is_created_once_and_replaced_without_cancelling_jobs(monkeypatch):
+    created, shutdowns = [], []
+
+    class SlowPool(BrokenPool):
+        def __init__(self, model_size, workers, **model_options):
+            time.sleep(0.05)  # Widen the window for a second caller to race in
+            super().__init__(model_size, workers)
+            created.append(self)
+
+        def shutdown(self, cancel=True):
+            shutdowns.append((self, cancel))
+
+    monkeypatch.setattr(ts, "TranscriptionPool", SlowPool)
+    gui = ts.TranscriptorGUI.__new__(ts.TranscriptorGUI)
+    gui.transcription_pool = None
+    gui.transcription_pool_lock = threading.Lock()
+
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(gui.get_transcription_pool("base", 2)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1 and all(pool is created[0] for pool in pools)
+
+    # A job using the old pool keeps its queued work when the settings change
+    replacement = gui.get_transcription_pool("base", 3)
+    assert replacement is not created[0]
+    assert shutdowns == [(created[0], False)]
+
+
+def post_raw(address, request):
+    """Send raw request bytes, close our side, and return the response status line"""
+    with socket.create_connection(address, timeout=5) as connection:
+        connection.sendall(request)
+        connection.shutdown(socket.SHUT_WR)
+        return connection.makefile("rb").readline().decode()
+
+
+def test_bad_content_length_and_truncated_uploads_are_rejected(fake_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    service = ts.TranscriptionService("base", concurrency=1)
+    submitted = []
+    monkeypatch.setattr(service, "submit", lambda *args, **kwargs: submitted.append(args))
+    server = ts.ServiceHTTPServer(("127.0.0.1", 0), ts.ServiceRequestHandler)
+    server.service = service
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        address = server.server_address
+        status = post_raw(address, b"POST /jobs?filename=a.wav HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+        assert " 400 " in status
+        status = post_raw(address, b"POST /jobs?filename=a.wav HTTP/1.1\r\nContent-Length: 1000\r\n\r\n" + b"x" * 10)
+        assert " 400 " in status
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+    assert submitted == []
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,77 @@
+import threading
+
+import transcriptor as ts
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+    def run_frame(self):
+        callbacks, self.scheduled = self.scheduled, []
+        for callback in callbacks:
+            callback()
+
+
+class FakeText:
+    def __init__(self):
+        self.inserts = []
+
+    def insert(self, index, text):
+        self.inserts.append((index, text))
+
+    def see(self, index):
+        pass
+
+
+def test_posts_from_workers_are_applied_at_the_next_frame():
+    root = FakeRoot()
+    bus = ts.UIEventBus(root)
+    calls = []
+
+    def worker(n):
+        for i in range(100):
+            bus.post(calls.append, ("progress", n, i), key=("progress", n))
+        bus.post(calls.append, ("done", n))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == []  # Nothing runs off the main thread
+
+    root.run_frame()
+    # Only the latest progress per key, and every unkeyed call, in posting order per worker
+    for n in range(4):
+        mine = [call for call in calls if call[1] == n]
+        assert mine == [("progress", n, 99), ("done", n)]
+    assert len(calls) == 8
+
+
+def closed_window():
+    raise RuntimeError("window closed")
+
+
+def test_text_for_the_same_place_is_inserted_at_once(monkeypatch):
+    monkeypatch.setattr(ts, "tk", type("tk", (), {"TclError": RuntimeError}))
+    root = FakeRoot()
+    bus = ts.UIEventBus(root)
+    output, other = FakeText(), FakeText()
+
+    bus.append(output, "one ")
+    bus.append(other, "elsewhere")
+    bus.append(output, "two")
+    bus.post(closed_window)  # Skipped, not fatal
+    root.run_frame()
+    assert output.inserts == [("end", "one two")]
+    assert other.inserts == [("end", "elsewhere")]
+
+    # The pump keeps running until stopped
+    assert len(root.scheduled) == 1
+    bus.stop()
+    root.run_frame()
+    assert root.scheduled == []
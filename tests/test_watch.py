@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+
+import transcriptor as ts
+from conftest import write_wav
+
+
+def test_ledger_remembers_processed_files(tmp_path):
+    ledger = ts.WatchLedger(str(tmp_path / "ledger.db"))
+    path = str(tmp_path / "notes" / "a.wav")
+    ledger.record(path, 10, 123)
+    ledger.set_directory(str(tmp_path / "notes"), 456)
+
+    assert ledger.get(path) == (10, 123)
+    assert ledger.get(str(tmp_path / "other.wav")) is None
+    assert ledger.known_files(str(tmp_path / "notes")) == {path: (10, 123)}
+    assert ledger.files() == {path: (10, 123)}
+    assert ledger.directories(str(tmp_path), recursive=True) == {str(tmp_path / "notes"): 456}
+    assert ledger.directories(str(tmp_path), recursive=False) == {}
+    ledger.close()
+
+    # The state survives a restart
+    ledger = ts.WatchLedger(str(tmp_path / "ledger.db"))
+    assert ledger.get(path) == (10, 123)
+    ledger.close()
+
+
+def test_file_overwritten_in_place_is_reported_again(tmp_path):
+    folder = tmp_path / "notes"
+    folder.mkdir()
+    path = write_wav(folder / "a.wav", np.zeros(1600))
+
+    ledger = ts.WatchLedger(str(tmp_path / "ledger.db"))
+    watcher = ts.FolderWatcher([str(folder)], ledger, settle=0, use_inotify=False, recheck_interval=0)
+    watcher.sync()
+    ready = watcher.poll(timeout=0)
+    assert [item[0] for item in ready] == [path]
+    watcher.mark(path)
+    assert watcher.poll(timeout=0) == []
+
+    # Rewrite the file without touching the directory's mtime
+    dir_mtime = os.stat(folder).st_mtime_ns
+    write_wav(path, np.ones(3200) * 0.5)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    os.utime(folder, ns=(dir_mtime, dir_mtime))
+
+    watcher.sync()
+    assert [item[0] for item in watcher.poll(timeout=0)] == [path]
+    watcher.close()
+    ledger.close()
+
+
+def test_processed_files_are_only_rechecked_when_due(tmp_path, monkeypatch):
+    folder = tmp_path / "notes"
+    folder.mkdir()
+    ledger = ts.WatchLedger(str(tmp_path / "ledger.db"))
+    watcher = ts.FolderWatcher([str(folder)], ledger, use_inotify=False, recheck_interval=60)
+
+    rechecks = []
+    real_files = ledger.files
+    monkeypatch.setattr(ledger, "files", lambda: rechecks.append(1) or real_files())
+
+    # The first sync rechecks; later ones only look at directories until the interval passes
+    for _ in range(5):
+        watcher.sync()
+    assert len(rechecks) == 1
+
+    watcher.next_recheck = 0.0
+    watcher.sync()
+    assert len(rechecks) == 2
+    watcher.close()
+    ledger.close()
@@ -1,25 +1,118 @@
-import whisper
+import time
+STARTUP_BEGIN = time.perf_counter()
+
 import os
+import sys
+import importlib
+import importlib.util
+import glob
+import argparse
 from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-import pyaudio
 import wave
 from datetime import datetime, timedelta
-import time
-import pyperclip
 import uuid
 import json
+import hashlib
 import re
 import tempfile
+import subprocess
+import shutil
 import math
+import itertools
+import functools
+import sqlite3
+import queue
+import threading
+import multiprocessing
+import signal
+import select
+import struct
+import ctypes
+import ctypes.util
+import socket
+import socketserver
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+# Heavy dependencies are imported on first use: Whisper (and torch) on first model
+# load, PyAudio on first recording, pyperclip on first copy and moviepy only as a
+# decoding fallback
+whisper = None
+pyaudio = None
+pyperclip = None
+moviepy_editor = None
+soundfile = None
+MOVIEPY_AVAILABLE = importlib.util.find_spec("moviepy") is not None
+SOUNDFILE_AVAILABLE = importlib.util.find_spec("soundfile") is not None
+
+# Tk is only needed by the GUI, so headless commands run without a display
+tk = ttk = filedialog = messagebox = scrolledtext = None
+
+# Seconds spent in each startup step and lazy import
+STARTUP_TIMES = OrderedDict()
+
+def timed_import(name):
+    """Import a module, recording how long it took"""
+    start_time = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start_time
+    STARTUP_TIMES[f"import {name}"] = elapsed
+    if elapsed > 0.1:
+        print(f"Imported {name} in {elapsed:.2f}s")
+    return module
+
+def load_whisper():
+    """Return the whisper module, importing it on first use"""
+    global whisper
+    if whisper is None:
+        whisper = timed_import("whisper")
+    return whisper
 
-# Try to import moviepy for video file handling
-try:
-    from moviepy.editor import VideoFileClip, AudioFileClip
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
+def load_pyaudio():
+    """Return the pyaudio module, importing it on first use"""
+    global pyaudio
+    if pyaudio is None:
+        pyaudio = timed_import("pyaudio")
+    return pyaudio
+
+def load_pyperclip():
+    """Return the pyperclip module, importing it on first use"""
+    global pyperclip
+    if pyperclip is None:
+        pyperclip = timed_import("pyperclip")
+    return pyperclip
+
+def load_moviepy():
+    """Return moviepy.editor, importing it on first use, or None if it can't be imported
+    
+    moviepy 2.x has no moviepy.editor, so finding the package is not enough.
+    """
+    global moviepy_editor, MOVIEPY_AVAILABLE
+    if moviepy_editor is None and MOVIEPY_AVAILABLE:
+        try:
+            moviepy_editor = timed_import("moviepy.editor")
+        except ImportError as e:
+            print(f"moviepy fallback unavailable: {str(e)}")
+            MOVIEPY_AVAILABLE = False
+    return moviepy_editor
+
+def load_soundfile():
+    """Return the soundfile module, importing it on first use"""
+    global soundfile
+    if soundfile is None:
+        soundfile = timed_import("soundfile")
+    return soundfile
+
+def import_gui_modules():
+    """Import the GUI toolkit"""
+    global tk, ttk, filedialog, messagebox, scrolledtext
+    tk = timed_import("tkinter")
+    from tkinter import ttk, filedialog, messagebox, scrolledtext
 
 ASCII_ART = """
 ╔══════════════════════════════════════════╗
@@ -31,7 +124,173 @@ ASCII_ART = """
 
 # Constants
 HISTORY_FILE = "deliberations.txt"
-HISTORY_JSON = "transcription_history.json"
+HISTORY_JSON = "transcription_history.json"  # Legacy format, migrated to HISTORY_JSONL
+HISTORY_JSONL = "transcription_history.jsonl"
+HISTORY_DB = "transcription_history.db"  # Full-text search index over HISTORY_JSONL
+SETTINGS_JSON = "cyberscribe_settings.json"
+
+# Audio settings
+RECORD_RATE = 44100
+WHISPER_SAMPLE_RATE = 16000
+
+# Live transcription settings (seconds)
+LIVE_STEP = 3.0      # How often the pending audio is re-transcribed
+LIVE_MARGIN = 1.0    # Segments ending this close to the live edge stay tentative
+LIVE_WINDOW = 30.0   # Force a commit once this much audio is pending
+LIVE_PROMPT_CHARS = 200
+
+# History log settings
+HISTORY_FSYNC_INTERVAL = 1.0  # Seconds an appended entry may wait for fsync
+HISTORY_FSYNC_BATCH = 16      # Entries that force an immediate fsync
+
+# History view settings
+HISTORY_PAGE_SIZE = 50
+HISTORY_LOAD_THRESHOLD = 0.9  # Scroll position (0-1) at which the next page is rendered
+
+# Capture buffer settings
+CAPTURE_INITIAL_SECONDS = 60
+CAPTURE_MEMORY_BUDGET = 64 * 1024 * 1024  # Bytes of audio kept in memory before spilling to disk
+
+# Model cache settings
+MODEL_CACHE_BUDGET = int(os.environ.get("CYBERSCRIBE_MODEL_BUDGET_MB", "6144")) * 1024 * 1024
+
+# Transcription result cache
+CACHE_DIR = "transcription_cache"
+CACHE_MAX_BYTES = int(os.environ.get("CYBERSCRIBE_CACHE_MB", "256")) * 1024 * 1024
+CACHE_ENABLED = os.environ.get("CYBERSCRIBE_CACHE", "1") != "0"
+CACHE_LOW_WATER = 0.9  # Eviction frees space down to this share of the budget
+
+# Worker processes for parallel segment transcription (0 = choose from cores and model budget)
+SEGMENT_WORKERS = int(os.environ.get("CYBERSCRIBE_SEGMENT_WORKERS", "0"))
+
+# Batch pipeline settings
+BATCH_DECODE_THREADS = min(4, os.cpu_count() or 1)
+BATCH_PREFETCH = 4  # Decoded files allowed to wait for an inference worker
+BATCH_SIZE = int(os.environ.get("CYBERSCRIBE_BATCH_SIZE", "8"))  # 30 s windows decoded together
+BATCH_CLIP_MAX_SECONDS = 60.0  # Longer files are transcribed on their own
+
+# Whisper's thresholds for treating a window as silence
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+# Transcription service settings
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = int(os.environ.get("CYBERSCRIBE_PORT", "8765"))
+SERVICE_JOB_LIMIT = 1000      # Finished jobs kept for status queries
+SERVICE_EVENT_TIMEOUT = 15.0  # Seconds between keep-alive lines on an idle event stream
+
+# Metrics settings
+METRICS_ENABLED = os.environ.get("CYBERSCRIBE_METRICS", "1") != "0"
+METRICS_FILE = os.environ.get("CYBERSCRIBE_METRICS_FILE")  # .json for JSON, anything else for Prometheus text
+METRICS_EXPORT_INTERVAL = 15.0  # Seconds between metrics file writes
+METRICS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)  # Stage durations (s)
+
+# Watch folder settings
+WATCH_LEDGER = "watch_ledger.db"  # Files already transcribed by watch mode
+WATCH_INTERVAL = 2.0  # Seconds between directory checks when polling
+WATCH_SETTLE = 5.0    # A file must stop changing for this long before it is transcribed
+WATCH_RECHECK_INTERVAL = 300.0  # Seconds between checks of processed files for in-place changes when polling
+
+# Inputs longer than this are decoded to a memory-mapped raw PCM file (seconds)
+DECODE_MEMMAP_SECONDS = 30 * 60
+
+# Media metadata remembered by path, size and mtime
+PROBE_CACHE = "media_probe_cache.jsonl"
+
+# Supported input formats
+AUDIO_FORMATS = ['.wav', '.mp3', '.m4a', '.ogg']
+VIDEO_FORMATS = ['.mp4', '.mpeg', '.mpg', '.avi', '.mov']
+
+# Segment planning settings (seconds)
+SEGMENT_WINDOW = 30.0        # Whisper decodes audio in windows of this length
+SEGMENT_MIN_LENGTH = 60.0    # Shorter files are transcribed as a single segment
+SEGMENT_MAX_LENGTH = 600.0   # Keeps partial results coming on very long files
+SEGMENT_MIN_TAIL = 15.0      # A shorter final segment is merged into the previous one
+SEGMENT_SNAP_RANGE = 5.0     # How far back from the ideal cut to look for silence
+SEGMENT_FRAME = 0.03         # Energy frame length for silence detection
+STREAM_PROMPT_CHARS = 200    # Text carried over as the prompt when streaming a file
+
+# Approximate in-memory size of each model, used before a model has been loaded
+MODEL_MEMORY_ESTIMATES = {
+    "tiny": 150 * 1024 * 1024,
+    "base": 300 * 1024 * 1024,
+    "small": 1000 * 1024 * 1024,
+    "medium": 3000 * 1024 * 1024,
+    "large": 6000 * 1024 * 1024,
+}
+
+# How often worker updates are applied to the window (milliseconds, 20 frames per second)
+UI_FRAME_INTERVAL = 50
+
+class UIEventBus:
+    """Hand widget updates from worker threads to the Tk main thread
+    
+    Workers post calls and never touch widgets or wait on the GUI; a
+    root.after pump applies everything posted since the last frame.
+    Calls posted with a key replace a pending call with the same key,
+    so only the latest progress per widget is drawn, and text appended
+    to the same widget and index is inserted in one go.
+    """
+    
+    def __init__(self, root, interval=UI_FRAME_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.events = []   # Keys in posting order
+        self.pending = {}  # Key -> (callback, args, kwargs)
+        self.sequence = itertools.count()  # Keys for calls that must all run
+        self.running = True
+        self.root.after(self.interval, self._pump)
+    
+    def post(self, callback, *args, key=None, **kwargs):
+        """Run callback(*args, **kwargs) on the main thread at the next frame"""
+        with self.lock:
+            if key is None:
+                key = ("call", next(self.sequence))
+            if key not in self.pending:
+                self.events.append(key)
+            self.pending[key] = (callback, args, kwargs)
+    
+    def append(self, widget, text, index="end", see=False):
+        """Insert text into a Text widget at the next frame, merged with other text for the same place
+        
+        Only for indexes that move along with inserted text ("end" or a
+        right-gravity mark), where joining the text keeps its order.
+        """
+        key = ("append", str(widget), index)
+        with self.lock:
+            if key in self.pending:
+                text = self.pending[key][1][2] + text
+            else:
+                self.events.append(key)
+            self.pending[key] = (self._insert, (widget, index, text, see), {})
+    
+    @staticmethod
+    def _insert(widget, index, text, see):
+        widget.insert(index, text)
+        if see:
+            widget.see("end")
+    
+    def _pump(self):
+        """Apply the calls posted since the last frame"""
+        with self.lock:
+            events, self.events = self.events, []
+            pending, self.pending = self.pending, {}
+        
+        for key in events:
+            callback, args, kwargs = pending[key]
+            try:
+                callback(*args, **kwargs)
+            except tk.TclError:
+                pass  # The widget's window has been closed
+            except Exception as e:
+                print(f"UI update failed: {str(e)}")
+        
+        if self.running:
+            self.root.after(self.interval, self._pump)
+    
+    def stop(self):
+        self.running = False
 
 class TranscriptorGUI:
     def __init__(self, root):
@@ -43,7 +302,22 @@ class TranscriptorGUI:
         # Initialize transcriptor
         self.transcriptor = None
         self.recording = False
-        self.audio = pyaudio.PyAudio()
+        self.audio = None  # PyAudio instance, created on first recording
+        self.model_loading = False
+        self.settings = self.load_settings()
+        self.capture = None
+        self.resampler = None
+        self.live_transcriber = None
+        self.live_mark = None
+        self.live_outputs = itertools.count()
+        self.transcription_pool = None
+        self.transcription_pool_lock = threading.Lock()
+        
+        # Finished recordings waiting to be transcribed, handled in order by one worker
+        self.recording_jobs = queue.Queue()
+        self.recording_worker = None
+        self.queued_recordings = 0
+        self.current_recording_job = None
         self.latest_transcription = ""
         
         # Session tracking
@@ -51,6 +325,15 @@ class TranscriptorGUI:
         self.session_start_time = datetime.now()
         self.session_transcriptions = []
         
+        # Append-only history log
+        self.history_store = HistoryStore()
+        
+        # Full-text search index, kept in step with the history log
+        self.history_index = open_history_index(self.history_store)
+        
+        # Worker threads post their widget updates here
+        self.ui = UIEventBus(self.root)
+        
         # Configure style
         self.configure_style()
         self.create_widgets()
@@ -58,9 +341,47 @@ class TranscriptorGUI:
         # Create history directory if it doesn't exist
         os.makedirs("history", exist_ok=True)
         
+        # Flush the history log on exit
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Load the last used model in the background once the window is up
+        if self.settings.get("auto_load") and self.settings.get("last_model"):
+            self.model_var.set(self.settings["last_model"])
+            self.root.after(100, lambda: self.load_model(auto=True))
+        
+    def on_close(self):
+        """Flush pending history writes and close the window"""
+        self.ui.stop()
+        METRICS.stop_export()
+        self.history_store.close()
+        if self.history_index:
+            self.history_index.close()
+        if self.transcription_pool:
+            self.transcription_pool.shutdown()
+        self.root.destroy()
+        
+    def load_settings(self):
+        """Load persisted settings, falling back to defaults"""
+        settings = {"last_model": None, "auto_load": False, "warm_up": True}
+        if os.path.exists(SETTINGS_JSON):
+            try:
+                with open(SETTINGS_JSON, "r", encoding="utf-8") as f:
+                    settings.update(json.load(f))
+            except (json.JSONDecodeError, OSError):
+                pass
+        return settings
+    
+    def save_settings(self):
+        """Persist settings to disk"""
+        try:
+            with open(SETTINGS_JSON, "w", encoding="utf-8") as f:
+                json.dump(self.settings, f, indent=2)
+        except OSError as e:
+            print(f"Failed to save settings: {str(e)}")
+        
     def generate_session_id(self):
         """Generate a unique session ID"""
-        return f"SESSION_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"
+        return new_session_id()
         
     def configure_style(self):
         style = ttk.Style()
@@ -74,6 +395,10 @@ class TranscriptorGUI:
                        background="black",
                        foreground="#00ff00",
                        font=("Courier", 10))
+        style.configure("Cyberpunk.TCheckbutton",
+                       background="black",
+                       foreground="#00ff00",
+                       font=("Courier", 10))
         style.configure("Copy.TButton",
                        background="#444444",
                        foreground="#00ff00",
@@ -105,12 +430,19 @@ class TranscriptorGUI:
         self.history_tab = ttk.Frame(self.notebook, style="Cyberpunk.TFrame")
         self.notebook.add(self.history_tab, text="HISTORY")
         
+        # Stats tab
+        self.stats_tab = ttk.Frame(self.notebook, style="Cyberpunk.TFrame")
+        self.notebook.add(self.stats_tab, text="STATS")
+        
         # Create main tab widgets
         self.create_main_tab_widgets()
         
         # Create history tab widgets
         self.create_history_tab_widgets()
         
+        # Create stats tab widgets
+        self.create_stats_tab_widgets()
+        
         # Session info label
         self.session_label = ttk.Label(self.root, 
                                      text=f"SESSION ID: {self.session_id}",
@@ -140,6 +472,15 @@ class TranscriptorGUI:
                                     style="Cyberpunk.TButton")
         self.load_button.pack(side="left", padx=5)
         
+        # Auto-load the last used model at startup
+        self.auto_load_var = tk.BooleanVar(value=self.settings.get("auto_load", False))
+        auto_load_check = ttk.Checkbutton(model_frame,
+                                        text="[AUTO]",
+                                        variable=self.auto_load_var,
+                                        command=self.toggle_auto_load,
+                                        style="Cyberpunk.TCheckbutton")
+        auto_load_check.pack(side="left", padx=5)
+        
         # File transcription button
         self.file_button = ttk.Button(model_frame,
                                     text="[LOAD AUDIO FILE]",
@@ -164,11 +505,36 @@ class TranscriptorGUI:
                                       style="Cyberpunk.TButton")
         self.record_button.pack(side="left", padx=5)
         
+        # Live transcription toggle
+        self.live_var = tk.BooleanVar(value=False)
+        live_check = ttk.Checkbutton(record_frame,
+                                   text="[LIVE]",
+                                   variable=self.live_var,
+                                   style="Cyberpunk.TCheckbutton")
+        live_check.pack(side="left", padx=5)
+        
         self.status_label = ttk.Label(record_frame,
                                     text="STATUS: IDLE",
                                     style="Cyberpunk.TLabel")
         self.status_label.pack(side="left", padx=5)
         
+        # Model loading progress (only shown while a model loads)
+        self.load_progress = ttk.Progressbar(record_frame, length=150, maximum=100)
+        
+        # Progress of recordings being transcribed (only shown while there are any)
+        self.jobs_frame = ttk.Frame(record_frame, style="Cyberpunk.TFrame")
+        self.jobs_label = ttk.Label(self.jobs_frame,
+                                  text="",
+                                  style="Cyberpunk.TLabel")
+        self.jobs_label.pack(side="left", padx=5)
+        self.jobs_progress = ttk.Progressbar(self.jobs_frame, length=120, maximum=100)
+        self.jobs_progress.pack(side="left", padx=5)
+        self.jobs_cancel_button = ttk.Button(self.jobs_frame,
+                                           text="[CANCEL]",
+                                           command=self.cancel_recording_job,
+                                           style="Cyberpunk.TButton")
+        self.jobs_cancel_button.pack(side="left", padx=5)
+        
         # Control Frame
         control_frame = ttk.Frame(self.main_tab, style="Cyberpunk.TFrame")
         control_frame.pack(fill="x", pady=5, padx=20)
@@ -213,6 +579,9 @@ class TranscriptorGUI:
         self.output_text.pack(fill="both", expand=True)
         scrollbar.config(command=self.output_text.yview)
         
+        # Tentative live text is shown dimmed until it firms up
+        self.output_text.tag_configure("live_tentative", foreground="#007700")
+        
         # Add some cyberpunk flair
         self.output_text.insert("1.0", "SYSTEM READY...\n" + "="*50 + "\n")
         
@@ -269,9 +638,118 @@ class TranscriptorGUI:
                                                    font=("Courier", 10))
         self.history_text.pack(fill="both", expand=True)
         
+        # Render further pages as the view is scrolled towards the end
+        self.history_text.configure(yscrollcommand=self.on_history_scroll)
+        self.history_text.tag_configure("history_footer", foreground="#007700")
+        
+        # Paginated view state
+        self.history_source = iter(())
+        self.history_shown = 0
+        self.history_exhausted = True
+        self.history_loading_more = False
+        self.history_live = False
+        self.history_total_format = ""
+        self.history_empty_message = ""
+        
         # Load history on startup
         self.load_history()
         
+    def create_stats_tab_widgets(self):
+        # Stats controls
+        stats_control_frame = ttk.Frame(self.stats_tab, style="Cyberpunk.TFrame")
+        stats_control_frame.pack(fill="x", pady=5, padx=20)
+        
+        reset_button = ttk.Button(stats_control_frame,
+                                text="[RESET]",
+                                command=self.reset_stats,
+                                style="Cyberpunk.TButton")
+        reset_button.pack(side="left", padx=5)
+        
+        export_button = ttk.Button(stats_control_frame,
+                                 text="[EXPORT]",
+                                 command=self.export_stats,
+                                 style="Cyberpunk.TButton")
+        export_button.pack(side="left", padx=5)
+        
+        self.stats_text = scrolledtext.ScrolledText(self.stats_tab,
+                                                 wrap="none",
+                                                 height=20,
+                                                 bg="black",
+                                                 fg="#00ff00",
+                                                 font=("Courier", 10))
+        self.stats_text.pack(fill="both", expand=True, padx=20, pady=10)
+        
+        # Write the metrics file in the background if one is configured
+        if METRICS_FILE:
+            METRICS.start_export(METRICS_FILE)
+        
+        self.refresh_stats()
+    
+    def refresh_stats(self):
+        """Redraw the stats panel while it is visible, once a second"""
+        if self.notebook.select() == str(self.stats_tab):
+            position = self.stats_text.yview()[0]
+            self.stats_text.delete("1.0", "end")
+            self.stats_text.insert("1.0", self.format_stats())
+            self.stats_text.yview_moveto(position)
+        self.root.after(1000, self.refresh_stats)
+    
+    def format_stats(self):
+        """Format the metrics and cache statistics for the stats panel"""
+        if not METRICS.enabled:
+            return "Metrics are disabled (CYBERSCRIBE_METRICS=0)\n"
+        
+        lines = ["== PIPELINE STAGES ==",
+                 f"{'STAGE':<12}{'CALLS':>8}{'TOTAL s':>12}{'MEAN s':>10}"]
+        stages = METRICS.stage_summary()
+        for stage, (count, total) in sorted(stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{stage:<12}{count:>8}{total:>12.2f}{total / count:>10.3f}")
+        if not stages:
+            lines.append("Nothing transcribed yet")
+        
+        audio_seconds = METRICS.value("audio_seconds_total")
+        inference = stages.get("inference", (0, 0.0))[1]
+        lines += ["", "== COUNTERS ==",
+                  f"{'Files':<24}{METRICS.total('files_total')}",
+                  f"{'Audio transcribed':<24}{audio_seconds:.1f} s",
+                  f"{'Real-time factor':<24}{inference / audio_seconds:.3f}" if audio_seconds else
+                  f"{'Real-time factor':<24}-",
+                  f"{'Result cache hits':<24}{METRICS.value('cache_hits_total')} / "
+                  f"{METRICS.value('cache_hits_total') + METRICS.value('cache_misses_total')}",
+                  f"{'Errors':<24}{METRICS.total('errors_total')}"]
+        
+        lines += ["", "== STARTUP =="]
+        lines += [f"{name:<24}{seconds:.2f} s" for name, seconds in STARTUP_TIMES.items()]
+        
+        registry = MODEL_REGISTRY.stats()
+        lines += ["", "== MODEL CACHE ==",
+                  f"{'Loaded':<24}{', '.join(registry['loaded']) or '-'}",
+                  f"{'Memory':<24}{registry['memory_used'] / (1024 * 1024):.0f} / "
+                  f"{registry['memory_budget'] / (1024 * 1024):.0f} MB",
+                  f"{'Hits / misses':<24}{registry['hits']} / {registry['misses']}"]
+        return "\n".join(lines) + "\n"
+    
+    def reset_stats(self):
+        METRICS.reset()
+        self.stats_text.delete("1.0", "end")
+        self.stats_text.insert("1.0", self.format_stats())
+    
+    def export_stats(self):
+        """Save the current metrics as JSON or Prometheus text"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("Prometheus text", "*.prom"), ("All files", "*.*")],
+            title="Export Metrics",
+            initialfile=f"cyberscribe_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        if not file_path:
+            return
+        try:
+            METRICS.export(file_path)
+            messagebox.showinfo("Export Successful", f"Metrics exported to {file_path}")
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Failed to export metrics: {str(e)}")
+    
     def toggle_recording(self):
         if not self.transcriptor:
             messagebox.showerror("Error", "Please load the model first!")
@@ -287,37 +765,201 @@ class TranscriptorGUI:
         self.record_button.configure(text="[STOP RECORDING]")
         self.status_label.configure(text="STATUS: RECORDING")
         
+        # Start live transcription if enabled
+        self.live_transcriber = None
+        if self.live_var.get():
+            mark = self.live_mark = self.start_live_output()
+            self.live_transcriber = LiveTranscriber(
+                self.transcriptor,
+                WHISPER_SAMPLE_RATE,
+                lambda committed, tentative: self.ui.post(self.update_live_output, committed, tentative, mark))
+        
+        # Record at 16 kHz when the device allows it, otherwise resample as we go
+        if self.audio is None:
+            self.audio = load_pyaudio().PyAudio()
+        rate = self.choose_record_rate()
+        if self.live_transcriber:
+            # Live recordings are transcribed from the transcriber's own window, so keep no copy
+            self.capture = None
+            self.resampler = StreamResampler(rate)
+        else:
+            self.capture = CaptureBuffer(rate)
+        
         # Start recording in chunks
-        self.frames = []
         self.stream = self.audio.open(format=pyaudio.paInt16,
                                     channels=1,
-                                    rate=44100,
+                                    rate=rate,
                                     input=True,
                                     frames_per_buffer=1024,
                                     stream_callback=self.audio_callback)
         self.stream.start_stream()
         
+    def choose_record_rate(self):
+        """Return Whisper's sample rate if the input device supports it"""
+        try:
+            device = self.audio.get_default_input_device_info()
+            if self.audio.is_format_supported(WHISPER_SAMPLE_RATE,
+                                              input_device=device["index"],
+                                              input_channels=1,
+                                              input_format=pyaudio.paInt16):
+                return WHISPER_SAMPLE_RATE
+        except (ValueError, IOError, OSError):
+            pass
+        return RECORD_RATE
+        
     def audio_callback(self, in_data, frame_count, time_info, status):
-        self.frames.append(in_data)
+        if self.live_transcriber:
+            chunk = self.resampler.process(np.frombuffer(in_data, dtype=np.int16))
+            self.live_transcriber.feed(chunk.tobytes())
+        else:
+            self.capture.write(in_data)
         return (in_data, pyaudio.paContinue)
         
+    def start_live_output(self):
+        """Insert the header for a live recording and return the mark where its text goes"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.output_text.insert("1.0", f"\n{'='*50}\n")
+        self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
+        self.output_text.insert("1.0", f"[LIVE_RECORDING_{timestamp.replace(':', '')}]\n")
+        
+        # Text is inserted at this mark, which moves along with it; each recording
+        # has its own, as one may still be finishing while the next is live
+        mark = f"live_end_{next(self.live_outputs)}"
+        self.output_text.mark_set(mark, "3.0")
+        self.output_text.mark_gravity(mark, "right")
+        return mark
+        
+    def update_live_output(self, committed, tentative, mark):
+        """Append newly committed live text and replace the tentative tail"""
+        tentative_tag = f"{mark}_tentative"
+        ranges = self.output_text.tag_ranges(tentative_tag)
+        if ranges:
+            self.output_text.delete(ranges[0], ranges[-1])
+        
+        if committed:
+            self.output_text.insert(mark, committed)
+        if tentative:
+            self.output_text.insert(mark, tentative, (tentative_tag, "live_tentative"))
+        
     def stop_recording(self):
         self.recording = False
         self.stream.stop_stream()
         self.stream.close()
         
-        # Save the recording
-        temp_file = "temp_recording.wav"
-        wf = wave.open(temp_file, 'wb')
-        wf.setnchannels(1)
-        wf.setsampwidth(self.audio.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(44100)
-        wf.writeframes(b''.join(self.frames))
-        wf.close()
+        # Finish and transcribe in the background so a new recording can start right away
+        job = {
+            "transcriptor": self.transcriptor,
+            "capture": self.capture,
+            "live": self.live_transcriber,
+            "live_mark": self.live_mark,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "cancel": threading.Event(),
+        }
+        self.capture = None
+        self.resampler = None
+        self.live_transcriber = None
+        self.live_mark = None
+        
+        self.record_button.configure(text="[START RECORDING]")
+        self.status_label.configure(text="STATUS: IDLE")
+        self.enqueue_recording(job)
+        
+    def enqueue_recording(self, job):
+        """Queue a finished recording for transcription, starting the worker if needed"""
+        self.queued_recordings += 1
+        self.recording_jobs.put(job)
+        self.show_recording_jobs()
+        
+        if self.recording_worker is None:
+            self.recording_worker = threading.Thread(target=self.recording_worker_loop, daemon=True)
+            self.recording_worker.start()
+        
+    def recording_worker_loop(self):
+        """Transcribe finished recordings one at a time, in the order they were made"""
+        while True:
+            job = self.recording_jobs.get()
+            self.ui.post(self.start_recording_job, job)
+            
+            result = error = None
+            try:
+                result = self.transcribe_recording(job)
+            except Exception as e:
+                METRICS.count("errors_total", stage="audio")
+                error = str(e)
+            
+            self.ui.post(self.finish_recording_job, job, result, error)
+        
+    def transcribe_recording(self, job):
+        """Return a recording's text, or None if it was cancelled"""
+        # Live recordings only have their last few seconds left to transcribe
+        if job["live"]:
+            return job["live"].finish(job["cancel"])
+        
+        # Transcribe window by window straight from the int16 capture, so
+        # progress can be shown and the job cancelled in between
+        # (recordings are unique, so skip the result cache)
+        texts = []
+        try:
+            for segment in job["transcriptor"].transcribe_audio_stream(job["capture"].get_samples()):
+                if job["cancel"].is_set():
+                    return None
+                if segment["text"]:
+                    texts.append(segment["text"])
+                self.ui.post(self.show_recording_progress, segment["progress"], key="recording_progress")
+        finally:
+            job["capture"].close()
+        return " ".join(texts)
+        
+    def start_recording_job(self, job):
+        self.current_recording_job = job
+        self.jobs_progress.configure(mode="indeterminate" if job["live"] else "determinate", value=0)
+        if job["live"]:
+            self.jobs_progress.start(15)
+        self.jobs_cancel_button.configure(state="normal")
+        self.show_recording_jobs()
+        
+    def show_recording_progress(self, progress):
+        self.jobs_progress["value"] = progress * 100
+        
+    def show_recording_jobs(self):
+        """Show how many recordings are waiting, or hide the indicator when none are"""
+        if self.queued_recordings == 0:
+            self.jobs_frame.pack_forget()
+            return
         
-        # Transcribe the recording
-        self.status_label.configure(text="STATUS: TRANSCRIBING")
-        result = self.transcriptor.transcribe_file(temp_file)
+        waiting = self.queued_recordings - (1 if self.current_recording_job else 0)
+        text = "TRANSCRIBING RECORDING"
+        if waiting:
+            text += f" (+{waiting} QUEUED)"
+        self.jobs_label.configure(text=text)
+        self.jobs_frame.pack(side="left", padx=5)
+        
+    def cancel_recording_job(self):
+        """Cancel the recording currently being transcribed"""
+        job = self.current_recording_job
+        if job:
+            job["cancel"].set()
+            self.jobs_cancel_button.configure(state="disabled")
+        
+    def finish_recording_job(self, job, result, error):
+        """Show and log a transcribed recording"""
+        self.queued_recordings -= 1
+        self.current_recording_job = None
+        self.jobs_progress.stop()
+        self.show_recording_jobs()
+        
+        if job["live_mark"]:
+            self.output_text.mark_unset(job["live_mark"])
+            self.output_text.tag_delete(f"{job['live_mark']}_tentative")
+        
+        if error or result is None:
+            # Handle error or cancellation
+            message = f"Error transcribing recording: {error}" if error else "Recording transcription cancelled"
+            self.output_text.insert("1.0", f"\n{'='*50}\n")
+            self.output_text.insert("1.0", f"{message}\n")
+            self.output_text.insert("1.0", f"[TIMESTAMP: {job['timestamp']}]\n")
+            self.output_text.insert("1.0", "[ERROR]\n" if error else "[CANCELLED]\n")
+            return
         
         # Log the transcription
         self.log_transcription(result)
@@ -333,101 +975,135 @@ class TranscriptorGUI:
         self.copy_button.configure(state="normal")
         self.export_button.configure(state="normal")
         
-        # Display the result with cyberpunk formatting
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.output_text.insert("1.0", f"\n{'='*50}\n")
-        self.output_text.insert("1.0", f"{result}\n")
-        self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
-        self.output_text.insert("1.0", f"[RECORDING_{timestamp.replace(':', '')}]\n")
-        
-        self.record_button.configure(text="[START RECORDING]")
-        self.status_label.configure(text="STATUS: IDLE")
-        
-        # Clean up
-        os.remove(temp_file)
+        # Live recordings are already on screen; display the others with cyberpunk formatting
+        if not job["live"]:
+            timestamp = job["timestamp"]
+            self.output_text.insert("1.0", f"\n{'='*50}\n")
+            self.output_text.insert("1.0", f"{result}\n")
+            self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
+            self.output_text.insert("1.0", f"[RECORDING_{timestamp.replace(':', '')}]\n")
         
     def log_transcription(self, text):
         """Enhanced logging with session tracking and JSON format"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Log to text file (for backward compatibility)
-        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
-            f.write(f"\n{'='*50}\n")
-            f.write(f"SESSION: {self.session_id}\n")
-            f.write(f"TIMESTAMP: {timestamp}\n")
-            f.write(f"{text}\n")
-            f.write(f"{'='*50}\n")
-        
-        # Create transcription entry
-        transcription_entry = {
-            "session_id": self.session_id,
-            "timestamp": timestamp,
-            "text": text,
-            "word_count": len(text.split())
-        }
+        transcription_entry = record_transcription(text, self.session_id,
+                                                   self.history_store, self.history_index)
         
         # Add to session transcriptions
         self.session_transcriptions.append(transcription_entry)
         
-        # Save to JSON history file
-        self.save_json_history(transcription_entry)
+        # Add the entry to the top of the history view
+        self.ui.post(self.prepend_history_entry, transcription_entry)
+    
+    def format_history_entry(self, entry):
+        """Format a single history entry for the history widget"""
+        session_id = entry.get("session_id", "UNKNOWN_SESSION")
+        timestamp = entry.get("timestamp", "UNKNOWN_TIME")
+        text = entry.get("text", "")
+        word_count = entry.get("word_count", 0)
+        
+        return (f"[SESSION: {session_id}]\n"
+                f"[TIMESTAMP: {timestamp}]\n"
+                f"[WORDS: {word_count}]\n"
+                f"{text}\n"
+                f"{'='*50}\n\n")
+    
+    def show_history_view(self, source, total_format, empty_message, live=False):
+        """Start a paginated history view over an iterator of entries"""
+        self.history_source = source
+        self.history_shown = 0
+        self.history_exhausted = False
+        self.history_loading_more = False
+        self.history_live = live  # New transcriptions are prepended to live views
+        self.history_total_format = total_format
+        self.history_empty_message = empty_message
+        
+        self.history_text.config(state="normal")
+        self.history_text.delete(1.0, tk.END)
+        self.history_text.config(state="disabled")
         
-        # Update history tab if it's visible
-        if self.notebook.index("current") == 1:  # History tab is selected
-            self.load_history()
+        self.load_more_history()
+        self.history_text.yview_moveto(0)
     
-    def save_json_history(self, entry):
-        """Save transcription to JSON history file"""
-        # Load existing history if available
-        history = []
-        if os.path.exists(HISTORY_JSON):
-            try:
-                with open(HISTORY_JSON, "r", encoding="utf-8") as f:
-                    history = json.load(f)
-            except json.JSONDecodeError:
-                # If file is corrupted, start fresh
-                history = []
+    def load_more_history(self):
+        """Render the next page of the current history view"""
+        self.history_loading_more = False
+        if self.history_exhausted:
+            return
+        
+        self.history_text.config(state="normal")
+        self.clear_history_footer()
         
-        # Add new entry
-        history.append(entry)
+        try:
+            page = list(itertools.islice(self.history_source, HISTORY_PAGE_SIZE))
+        except Exception as e:
+            page = []
+            self.history_empty_message = f"Error reading history: {str(e)}\n"
+        
+        if page:
+            self.history_text.insert(tk.END, "".join(self.format_history_entry(entry) for entry in page))
+            self.history_shown += len(page)
+        
+        if len(page) < HISTORY_PAGE_SIZE:
+            self.history_exhausted = True
+        
+        self.render_history_footer()
+        self.history_text.config(state="disabled")
+    
+    def clear_history_footer(self):
+        ranges = self.history_text.tag_ranges("history_footer")
+        if ranges:
+            self.history_text.delete(ranges[0], ranges[-1])
+    
+    def render_history_footer(self):
+        """Show the entry count, or a hint that more entries will load"""
+        if not self.history_exhausted:
+            footer = "[SCROLL FOR MORE...]\n"
+        elif self.history_shown:
+            footer = self.history_total_format.format(self.history_shown) + "\n"
+        else:
+            footer = self.history_empty_message
+        self.history_text.insert(tk.END, footer, "history_footer")
+    
+    def on_history_scroll(self, first, last):
+        """Update the scrollbar and load the next page near the end of the view"""
+        self.history_text.vbar.set(first, last)
+        
+        if (float(last) >= HISTORY_LOAD_THRESHOLD and not self.history_exhausted
+                and not self.history_loading_more):
+            self.history_loading_more = True
+            self.root.after_idle(self.load_more_history)
+    
+    def prepend_history_entry(self, entry):
+        """Insert a new entry at the top of the history view without rebuilding it"""
+        if not self.history_live:
+            return
         
-        # Save updated history
-        with open(HISTORY_JSON, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=2)
+        self.history_text.config(state="normal")
+        self.history_text.insert("1.0", self.format_history_entry(entry))
+        self.history_shown += 1
+        
+        # Keep the total count current
+        if self.history_exhausted:
+            self.clear_history_footer()
+            self.render_history_footer()
+        self.history_text.config(state="disabled")
     
     def load_history(self):
         """Load and display transcription history"""
+        # First try to load from the history log, newest first
+        if self.history_store.exists():
+            self.show_history_view(self.history_store.iter_entries(reverse=True),
+                                   "TOTAL ENTRIES: {}",
+                                   "No history found.\n",
+                                   live=True)
+            return
+        
+        # Fallback to text file if the log doesn't exist
+        self.history_live = False
+        self.history_exhausted = True
         self.history_text.config(state="normal")
         self.history_text.delete(1.0, tk.END)
-        
-        # First try to load from JSON file
-        if os.path.exists(HISTORY_JSON):
-            try:
-                with open(HISTORY_JSON, "r", encoding="utf-8") as f:
-                    history = json.load(f)
-                
-                # Display history in reverse chronological order
-                for entry in reversed(history):
-                    session_id = entry.get("session_id", "UNKNOWN_SESSION")
-                    timestamp = entry.get("timestamp", "UNKNOWN_TIME")
-                    text = entry.get("text", "")
-                    word_count = entry.get("word_count", 0)
-                    
-                    self.history_text.insert(tk.END, f"[SESSION: {session_id}]\n")
-                    self.history_text.insert(tk.END, f"[TIMESTAMP: {timestamp}]\n")
-                    self.history_text.insert(tk.END, f"[WORDS: {word_count}]\n")
-                    self.history_text.insert(tk.END, f"{text}\n")
-                    self.history_text.insert(tk.END, f"{'='*50}\n\n")
-                
-                self.history_text.insert(tk.END, f"TOTAL ENTRIES: {len(history)}\n")
-                
-            except Exception as e:
-                # Fallback to text file if JSON fails
-                self.load_text_history()
-        else:
-            # Fallback to text file if JSON doesn't exist
-            self.load_text_history()
-        
+        self.load_text_history()
         self.history_text.config(state="disabled")
     
     def load_text_history(self):
@@ -441,45 +1117,23 @@ class TranscriptorGUI:
     
     def search_history(self):
         """Search through transcription history"""
-        query = self.search_var.get().strip().lower()
+        query = self.search_var.get().strip()
         if not query:
             messagebox.showinfo("Search", "Please enter a search term")
             return
         
-        self.history_text.config(state="normal")
-        self.history_text.delete(1.0, tk.END)
-        
-        # Search in JSON history
-        if os.path.exists(HISTORY_JSON):
-            try:
-                with open(HISTORY_JSON, "r", encoding="utf-8") as f:
-                    history = json.load(f)
-                
-                # Filter entries containing the search query
-                matches = [entry for entry in history if query in entry.get("text", "").lower()]
-                
-                if matches:
-                    for entry in reversed(matches):
-                        session_id = entry.get("session_id", "UNKNOWN_SESSION")
-                        timestamp = entry.get("timestamp", "UNKNOWN_TIME")
-                        text = entry.get("text", "")
-                        word_count = entry.get("word_count", 0)
-                        
-                        self.history_text.insert(tk.END, f"[SESSION: {session_id}]\n")
-                        self.history_text.insert(tk.END, f"[TIMESTAMP: {timestamp}]\n")
-                        self.history_text.insert(tk.END, f"[WORDS: {word_count}]\n")
-                        self.history_text.insert(tk.END, f"{text}\n")
-                        self.history_text.insert(tk.END, f"{'='*50}\n\n")
-                    
-                    self.history_text.insert(tk.END, f"FOUND {len(matches)} MATCHES\n")
-                else:
-                    self.history_text.insert(tk.END, f"No matches found for '{query}'\n")
-            except Exception as e:
-                self.history_text.insert(tk.END, f"Error searching history: {str(e)}\n")
+        if self.history_index:
+            # Use the full-text index when available
+            matches = self.history_index.iter_search(query, HISTORY_PAGE_SIZE)
         else:
-            self.history_text.insert(tk.END, "No history database found.\n")
-        
-        self.history_text.config(state="disabled")
+            # Otherwise stream entries containing the search query, newest first
+            lowered = query.lower()
+            matches = (entry for entry in self.history_store.iter_entries(reverse=True)
+                       if lowered in entry.get("text", "").lower())
+        
+        self.show_history_view(matches,
+                               "FOUND {} MATCHES",
+                               f"No matches found for '{query}'\n")
     
     def export_history(self):
         """Export history to a file"""
@@ -493,17 +1147,14 @@ class TranscriptorGUI:
             return
         
         try:
-            # If JSON history exists, use that for export
-            if os.path.exists(HISTORY_JSON):
-                with open(HISTORY_JSON, "r", encoding="utf-8") as f:
-                    history = json.load(f)
-                
+            # If the history log exists, use that for export
+            if self.history_store.exists():
                 with open(file_path, "w", encoding="utf-8") as f:
                     f.write(f"CYBERSCRIBE TRANSCRIPTION HISTORY\n")
                     f.write(f"EXPORTED: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                     f.write(f"{'='*50}\n\n")
                     
-                    for entry in reversed(history):
+                    for entry in self.history_store.iter_entries(reverse=True):
                         session_id = entry.get("session_id", "UNKNOWN_SESSION")
                         timestamp = entry.get("timestamp", "UNKNOWN_TIME")
                         text = entry.get("text", "")
@@ -524,44 +1175,89 @@ class TranscriptorGUI:
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export history: {str(e)}")
     
-    def load_model(self):
-        """Load the selected Whisper model"""
+    def toggle_auto_load(self):
+        """Remember whether the last used model should load at startup"""
+        self.settings["auto_load"] = self.auto_load_var.get()
+        self.save_settings()
+    
+    def load_model(self, auto=False):
+        """Load the selected Whisper model in the background"""
+        if self.model_loading:
+            return
+        
         model_size = self.model_var.get()
         
-        # Check if moviepy is available and warn if not
-        if not MOVIEPY_AVAILABLE:
+        # Files are decoded with ffmpeg; moviepy can only stand in for it
+        if not shutil.which("ffmpeg") and not auto and load_moviepy() is None:
             messagebox.showwarning(
-                "Missing Library", 
-                "The moviepy library is not installed. Video files (.mp4, .avi, etc.) will not be supported.\n\n"
-                "To enable video file support, install moviepy with:\n"
-                "pip install moviepy"
+                "Missing Decoder", 
+                "FFmpeg was not found on your PATH. Audio and video files (.mp3, .mp4, etc.) will not be supported.\n\n"
+                "Install FFmpeg from https://ffmpeg.org/download.html"
             )
         
         # Update status
+        self.model_loading = True
+        self.load_button.configure(state="disabled")
         self.status_label.configure(text=f"STATUS: LOADING {model_size.upper()} MODEL")
-        self.root.update()
+        self.load_progress["value"] = 0
+        self.load_progress.pack(side="left", padx=5)
         
-        try:
-            # Load the model
-            self.transcriptor = AudioTranscriptor(model_size)
-            
-            # Update status
-            self.status_label.configure(text=f"STATUS: {model_size.upper()} MODEL LOADED")
+        def report(percent, text):
+            self.ui.post(self.update_model_progress, percent, text, key="model_progress")
+        
+        # Function to load the model in a separate thread
+        def load_thread():
+            transcriptor = None
+            error = None
             
-            # Reset after 2 seconds
-            self.root.after(2000, lambda: self.status_label.configure(text="STATUS: IDLE"))
+            try:
+                # Load the model
+                report(10, f"STATUS: LOADING {model_size.upper()} MODEL")
+                transcriptor = AudioTranscriptor(model_size)
+                
+                # Run a short dummy inference so the first real one is fast
+                if self.settings.get("warm_up", True):
+                    report(70, f"STATUS: WARMING UP {model_size.upper()} MODEL")
+                    transcriptor.warm_up()
+                
+                report(100, f"STATUS: {model_size.upper()} MODEL LOADED")
+            except Exception as e:
+                error = str(e)
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load model: {str(e)}")
+            # Schedule UI updates on the main thread
+            self.ui.post(self.finish_model_load, model_size, transcriptor, error)
+        
+        threading.Thread(target=load_thread, daemon=True).start()
+    
+    def update_model_progress(self, percent, text):
+        """Show model loading progress"""
+        self.load_progress["value"] = percent
+        self.status_label.configure(text=text)
+    
+    def finish_model_load(self, model_size, transcriptor, error):
+        """Install the loaded model once the loading thread finishes"""
+        self.model_loading = False
+        self.load_button.configure(state="normal")
+        self.load_progress.pack_forget()
+        
+        if error:
+            messagebox.showerror("Error", f"Failed to load model: {error}")
             self.status_label.configure(text="STATUS: ERROR LOADING MODEL")
+        else:
+            self.transcriptor = transcriptor
+            self.status_label.configure(text=f"STATUS: {model_size.upper()} MODEL LOADED")
             
-            # Reset after 2 seconds
-            self.root.after(2000, lambda: self.status_label.configure(text="STATUS: IDLE"))
+            # Remember the model for the next launch
+            self.settings["last_model"] = model_size
+            self.save_settings()
+        
+        # Reset after 2 seconds
+        self.root.after(2000, lambda: self.status_label.configure(text="STATUS: IDLE"))
     
     def copy_latest(self):
         """Copy the latest transcription to clipboard"""
         if self.latest_transcription:
-            pyperclip.copy(self.latest_transcription)
+            load_pyperclip().copy(self.latest_transcription)
             self.status_label.configure(text="STATUS: COPIED TO CLIPBOARD")
             self.root.after(2000, lambda: self.status_label.configure(text="STATUS: IDLE"))
 
@@ -586,10 +1282,15 @@ class TranscriptorGUI:
         if not file_path:
             return  # User cancelled
             
-        # Ask if user wants to process in segments
-        use_segments = messagebox.askyesno(
+        # Short files are a single segment anyway, so only ask for longer ones
+        try:
+            duration = probe_duration(file_path)
+        except Exception:
+            duration = None
+        use_segments = (duration is None or duration >= SEGMENT_MIN_LENGTH) and messagebox.askyesno(
             "Segmented Processing", 
-            "Would you like to divide the audio into 4 segments for faster access to partial results?\n\n"
+            (f"This file is {format_duration(duration)} long.\n\n" if duration else "") +
+            "Would you like to divide the audio into segments for faster access to partial results?\n\n"
             "This will allow you to start reading the first part while the others are being processed."
         )
         
@@ -599,7 +1300,7 @@ class TranscriptorGUI:
             # Create progress window
             progress_window = tk.Toplevel(self.root)
             progress_window.title("Transcribing Audio")
-            progress_window.geometry("400x150")
+            progress_window.geometry("400x200")
             progress_window.configure(bg="black")
             progress_window.transient(self.root)
             progress_window.grab_set()
@@ -618,60 +1319,111 @@ class TranscriptorGUI:
                                     style="Cyberpunk.TLabel")
             status_label.pack(pady=10)
             
-            # Indeterminate progress bar
-            progress_bar = ttk.Progressbar(progress_window, mode="indeterminate", length=350)
+            # Progress bar following the position in the audio
+            progress_var = tk.DoubleVar()
+            progress_bar = ttk.Progressbar(progress_window, variable=progress_var, maximum=100, length=350)
             progress_bar.pack(pady=10)
-            progress_bar.start(15)  # Start animation
+            
+            # Cancel button
+            cancel_event = threading.Event()
+            cancel_button = ttk.Button(progress_window,
+                                     text="[CANCEL]",
+                                     command=cancel_event.set,
+                                     style="Cyberpunk.TButton")
+            cancel_button.pack(pady=10)
             
             # Update status
             self.status_label.configure(text="STATUS: TRANSCRIBING FILE")
             self.root.update()
             
+            # Ask before starting so the worker never waits on a dialog
+            use_larger_model = self.model_var.get() in ["tiny", "base"] and messagebox.askyesno(
+                "Model Selection", 
+                "Would you like to use a larger model (medium) for better accuracy?\n"
+                "Note: This may take longer to process."
+            )
+            
+            output_started = False
+            
+            def show_progress(progress, position):
+                percent = progress * 100
+                progress_var.set(percent)
+                status_label.config(text=f"Transcribing audio... {percent:.0f}% "
+                                         f"({format_duration(position)} transcribed)")
+            
+            def show_text(text):
+                nonlocal output_started
+                if not output_started:
+                    self.start_streamed_output(file_name)
+                    output_started = True
+                self.output_text.insert("stream_text", text)
+            
             # Function to run transcription in a separate thread
             def transcribe_thread():
-                result = ""
+                texts = []
                 error = None
                 
                 try:
-                    # Use a larger model for file transcription if available
-                    current_model = self.model_var.get()
+                    transcriptor = self.transcriptor
+                    if use_larger_model:
+                        # Use the larger model (reused from the model cache when already loaded)
+                        self.ui.post(status_label.config, text="Loading medium model...", key=status_label)
+                        transcriptor = AudioTranscriptor("medium")
                     
-                    # Update status
-                    status_label.config(text="Loading model...")
-                    progress_window.update()
+                    self.ui.post(status_label.config, text="Decoding audio...", key=status_label)
                     
-                    if current_model in ["tiny", "base"] and messagebox.askyesno(
-                        "Model Selection", 
-                        "Would you like to use a larger model (medium) for better accuracy?\n"
-                        "Note: This may take longer to process."
-                    ):
-                        # Temporarily load a larger model
-                        status_label.config(text="Loading medium model...")
-                        progress_window.update()
-                        temp_transcriptor = AudioTranscriptor("medium")
-                        
-                        status_label.config(text="Transcribing audio (this may take a while)...")
-                        progress_window.update()
-                        result = temp_transcriptor.transcribe_file(file_path)
-                        del temp_transcriptor
-                    else:
-                        # Use current model
-                        status_label.config(text="Transcribing audio (this may take a while)...")
-                        progress_window.update()
-                        result = self.transcriptor.transcribe_file(file_path)
+                    # Render each window's text as soon as it is decoded
+                    for segment in transcriptor.transcribe_stream(file_path):
+                        if segment["text"]:
+                            texts.append(segment["text"])
+                            self.ui.post(show_text, segment["text"] + " ")
+                        self.ui.post(show_progress, segment["progress"], segment["end"], key=status_label)
+                        if cancel_event.is_set():
+                            error = "Transcription cancelled"
+                            break
                         
                 except Exception as e:
                     error = str(e)
                 
                 # Schedule UI updates on the main thread
-                self.root.after(0, lambda: self.finish_transcription(result, file_name, error, progress_window))
+                self.ui.post(self.finish_transcription, " ".join(texts), file_name, error, progress_window,
+                             streamed=True)
             
             # Start transcription in a separate thread
-            import threading
             threading.Thread(target=transcribe_thread, daemon=True).start()
     
+    def start_streamed_output(self, file_name):
+        """Add a transcription header to the output and mark where streamed text goes"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.output_text.insert("1.0", f"\n\n{'='*50}\n")
+        self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
+        self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
+        self.output_text.insert("1.0", f"[FILE_TRANSCRIPTION_{timestamp.replace(':', '')}]\n")
+        
+        # The mark moves along with text inserted at it
+        self.output_text.mark_set("stream_text", "4.0")
+        self.output_text.mark_gravity("stream_text", "right")
+    
+    def get_transcription_pool(self, model_size, workers):
+        """Return a worker pool for the model, reusing the running one when it matches"""
+        with self.transcription_pool_lock:
+            pool = self.transcription_pool
+            if pool and pool.broken:
+                print("Transcription worker pool failed (a worker process died); starting a new one")
+                pool.shutdown()
+                pool = None
+            if pool and (pool.model_size != model_size or pool.workers != workers):
+                # Another job may still be using the old pool, so let its queued work finish
+                pool.shutdown(cancel=False)
+                pool = None
+            
+            if pool is None:
+                pool = TranscriptionPool(model_size, workers)
+                self.transcription_pool = pool
+            return pool
+    
     def process_audio_in_segments(self, file_path):
-        """Process an audio file in 4 segments for faster partial results"""
+        """Process an audio file in silence-aligned segments for faster partial results"""
         # Get file name for reference
         file_name = os.path.basename(file_path)
         
@@ -694,11 +1446,11 @@ class TranscriptorGUI:
         
         # Overall progress
         overall_label = ttk.Label(status_frame, 
-                                text="Overall Progress: 0/4 segments",
+                                text="Overall Progress: Planning segments...",
                                 style="Cyberpunk.TLabel")
         overall_label.pack(pady=5)
         
-        overall_progress = ttk.Progressbar(status_frame, length=550, maximum=4)
+        overall_progress = ttk.Progressbar(status_frame, length=550, maximum=1)
         overall_progress.pack(pady=5)
         
         # Current segment progress
@@ -739,333 +1491,133 @@ class TranscriptorGUI:
         # Initial message
         results_text.insert("1.0", "Preparing to process audio in segments...\n")
         
+        def show_plan(num_segments):
+            overall_progress["maximum"] = num_segments
+            overall_label.config(text=f"Overall Progress: 0/{num_segments} segments")
+        
+        def show_segment_done(done, num_segments):
+            overall_progress["value"] = done
+            overall_label.config(text=f"Overall Progress: {done}/{num_segments} segments")
+        
+        def show_result(combined_result, elapsed):
+            """Show the combined transcription once every segment is done"""
+            # Store the latest transcription
+            self.latest_transcription = combined_result
+            
+            # Update word count
+            word_count = len(combined_result.split())
+            self.word_count_label.configure(text=f"WORDS: {word_count}")
+            
+            # Enable copy and export buttons
+            self.copy_button.configure(state="normal")
+            self.export_button.configure(state="normal")
+            
+            # Display the result in the main window
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.output_text.insert("1.0", f"\n{'='*50}\n")
+            self.output_text.insert("1.0", f"{combined_result}\n")
+            self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
+            self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
+            self.output_text.insert("1.0", f"[FILE_TRANSCRIPTION_{timestamp.replace(':', '')}]\n")
+            
+            # Update final status
+            current_label.config(text="Processing complete!")
+            time_label.config(text=f"Total processing time: {elapsed:.1f} seconds")
+            segment_progress.stop()
+            segment_progress["mode"] = "determinate"
+            segment_progress["value"] = 100
+            
+            # Add completion message
+            results_text.insert("end", "\n==== PROCESSING COMPLETE ====\n")
+            results_text.insert("end", f"Total processing time: {elapsed:.1f} seconds\n")
+            results_text.insert("end", f"Total words: {word_count}\n")
+            results_text.see("end")
+            self.status_label.configure(text="STATUS: IDLE")
+        
+        def show_error(error):
+            results_text.insert("end", f"\nERROR: {error}\n")
+            
+            # Display error in main window
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.output_text.insert("1.0", f"\n{'='*50}\n")
+            self.output_text.insert("1.0", f"Error processing file: {error}\n")
+            self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
+            self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
+            self.output_text.insert("1.0", f"[ERROR]\n")
+            self.status_label.configure(text="STATUS: IDLE")
+        
         # Function to process segments in a separate thread
         def process_segments_thread():
             start_time = time.time()
-            all_results = []
-            error = None
+            
+            def on_status(message):
+                self.ui.append(results_text, f"{message}\n")
+            
+            def on_plan(duration, plan, workers):
+                num_segments = len(plan)
+                
+                # Update UI
+                self.ui.append(results_text, f"Audio duration: {duration:.2f} seconds\n")
+                self.ui.append(results_text, f"Dividing into {num_segments} segments of about "
+                                             f"{duration / num_segments:.2f} seconds each\n\n")
+                if workers > 1:
+                    self.ui.append(results_text, f"Transcribing on {workers} worker processes\n\n")
+                self.ui.post(show_plan, num_segments, key=overall_label)
+            
+            def on_segment_start(i, segment_start, segment_end):
+                num_segments = len(job.plan)
+                
+                # Update progress
+                self.ui.post(current_label.config, key=current_label,
+                             text=f"Current Segment: {i+1}/{num_segments} (Time: {segment_start:.2f}s - {segment_end:.2f}s)")
+                self.ui.append(results_text, f"[SEGMENT {i+1}/{num_segments}] Transcribing...\n")
+                
+                # Estimate the remaining time from the audio transcribed so far
+                if i > 0 and segment_start > 0:
+                    elapsed_time = time.time() - start_time
+                    estimated_time = elapsed_time / segment_start * (job.duration - segment_start)
+                    
+                    # Update time estimation
+                    self.ui.post(time_label.config, key=time_label,
+                                 text=f"Estimated time remaining: {estimated_time:.1f} seconds")
+            
+            def on_segment(i, segment_start, segment_end, segment_result):
+                num_segments = len(job.plan)
+                
+                # Display segment result
+                self.ui.append(results_text, f"[SEGMENT {i+1}/{num_segments}] Result:\n{segment_result}\n\n", see=True)
+                
+                # Update progress
+                self.ui.post(show_segment_done, i + 1, num_segments, key=overall_label)
             
             try:
                 # Prepare the audio file
-                results_text.insert("end", "Analyzing audio file...\n")
-                segment_window.update()
-                
-                # Get audio duration and create segments
-                audio_path, duration = self.prepare_audio_file(file_path)
+                self.ui.append(results_text, "Analyzing audio file...\n")
                 
-                # Calculate segment duration
-                segment_duration = duration / 4
+                job = SegmentedTranscription(file_path, self.transcriptor,
+                                             get_pool=self.get_transcription_pool)
+                combined_result = job.run(on_status, on_plan, on_segment_start, on_segment)
                 
-                # Update UI
-                results_text.insert("end", f"Audio duration: {duration:.2f} seconds\n")
-                results_text.insert("end", f"Dividing into 4 segments of {segment_duration:.2f} seconds each\n\n")
-                segment_window.update()
-                
-                # Process each segment
-                for i in range(4):
-                    # Update progress
-                    segment_start = i * segment_duration
-                    segment_end = (i + 1) * segment_duration if i < 3 else duration
-                    
-                    current_label.config(text=f"Current Segment: {i+1}/4 (Time: {segment_start:.2f}s - {segment_end:.2f}s)")
-                    segment_window.update()
-                    
-                    # Extract segment
-                    segment_file = self.extract_audio_segment(audio_path, segment_start, segment_end)
-                    
-                    # Transcribe segment
-                    results_text.insert("end", f"[SEGMENT {i+1}/4] Transcribing...\n")
-                    segment_window.update()
-                    
-                    # Calculate time estimation for remaining segments
-                    if i > 0:
-                        elapsed_time = time.time() - start_time
-                        time_per_segment = elapsed_time / i
-                        remaining_segments = 4 - i
-                        estimated_time = time_per_segment * remaining_segments
-                        
-                        # Update time estimation
-                        time_label.config(text=f"Estimated time remaining: {estimated_time:.1f} seconds")
-                    
-                    # Transcribe the segment
-                    segment_result = self.transcriptor.transcribe_file(segment_file)
-                    
-                    # Add to results
-                    all_results.append(segment_result)
-                    
-                    # Display segment result
-                    results_text.insert("end", f"[SEGMENT {i+1}/4] Result:\n{segment_result}\n\n")
-                    results_text.see("end")
-                    
-                    # Update progress
-                    overall_progress["value"] = i + 1
-                    segment_window.update()
-                    
-                    # Clean up segment file
-                    try:
-                        os.remove(segment_file)
-                    except:
-                        pass
-                
-                # Combine all results
-                combined_result = " ".join(all_results)
-                
-                # Log the combined transcription
-                self.log_transcription(f"[FILE: {file_name}]\n{combined_result}")
-                
-                # Store the latest transcription
-                self.latest_transcription = combined_result
-                
-                # Update word count
-                word_count = len(combined_result.split())
-                self.word_count_label.configure(text=f"WORDS: {word_count}")
-                
-                # Enable copy and export buttons
-                self.copy_button.configure(state="normal")
-                self.export_button.configure(state="normal")
-                
-                # Display the result in the main window
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.output_text.insert("1.0", f"\n{'='*50}\n")
-                self.output_text.insert("1.0", f"{combined_result}\n")
-                self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
-                self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
-                self.output_text.insert("1.0", f"[FILE_TRANSCRIPTION_{timestamp.replace(':', '')}]\n")
-                
-                # Update final status
-                current_label.config(text="Processing complete!")
-                time_label.config(text=f"Total processing time: {time.time() - start_time:.1f} seconds")
-                segment_progress.stop()
-                segment_progress["mode"] = "determinate"
-                segment_progress["value"] = 100
-                
-                # Add completion message
-                results_text.insert("end", "\n==== PROCESSING COMPLETE ====\n")
-                results_text.insert("end", f"Total processing time: {time.time() - start_time:.1f} seconds\n")
-                results_text.insert("end", f"Total words: {word_count}\n")
-                results_text.see("end")
+                # Log the combined transcription
+                self.log_transcription(f"[FILE: {file_name}]\n{combined_result}")
+                self.ui.post(show_result, combined_result, time.time() - start_time)
                 
             except Exception as e:
-                error = str(e)
-                results_text.insert("end", f"\nERROR: {error}\n")
-                
-                # Display error in main window
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.output_text.insert("1.0", f"\n{'='*50}\n")
-                self.output_text.insert("1.0", f"Error processing file: {error}\n")
-                self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
-                self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
-                self.output_text.insert("1.0", f"[ERROR]\n")
-            
-            # Reset status
-            self.status_label.configure(text="STATUS: IDLE")
+                self.ui.post(show_error, str(e))
         
         # Start processing in a separate thread
-        import threading
         threading.Thread(target=process_segments_thread, daemon=True).start()
     
-    def prepare_audio_file(self, file_path):
-        """Prepare audio file for segmented processing and return path and duration"""
-        # Get file extension
-        _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
-        
-        # Process based on file type
-        audio_formats = ['.wav', '.mp3', '.m4a', '.ogg']
-        video_formats = ['.mp4', '.mpeg', '.mpg', '.avi', '.mov']
-        
-        if ext in video_formats:
-            if not MOVIEPY_AVAILABLE:
-                raise ImportError("The moviepy library is required to process video files.")
-            
-            try:
-                # Try using ffmpeg directly first (more reliable for some video formats)
-                import subprocess
-                
-                # Create a temporary file for the audio
-                temp_audio = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-                temp_audio.close()
-                
-                # Get duration using ffprobe
-                duration_cmd = [
-                    "ffprobe", 
-                    "-v", "error", 
-                    "-show_entries", "format=duration", 
-                    "-of", "default=noprint_wrappers=1:nokey=1", 
-                    file_path
-                ]
-                
-                try:
-                    duration = float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
-                except:
-                    # Default duration if ffprobe fails
-                    duration = 0
-                
-                # Extract audio using ffmpeg
-                extract_cmd = [
-                    "ffmpeg",
-                    "-i", file_path,
-                    "-q:a", "0",
-                    "-map", "a",
-                    "-y",  # Overwrite output file if it exists
-                    temp_audio.name
-                ]
-                
-                subprocess.run(extract_cmd, check=True, capture_output=True)
-                
-                # If we couldn't get duration from ffprobe, try to get it from the extracted audio
-                if duration == 0:
-                    audio = AudioFileClip(temp_audio.name)
-                    duration = audio.duration
-                    audio.close()
-                
-                return temp_audio.name, duration
-                
-            except Exception as e:
-                print(f"FFmpeg extraction failed: {str(e)}")
-                print("Falling back to moviepy...")
-                
-                # Fallback to moviepy
-                try:
-                    # Extract audio from video
-                    video = VideoFileClip(file_path)
-                    
-                    # Check if audio is available
-                    if video.audio is None:
-                        video.close()
-                        raise ValueError("No audio track found in the video file")
-                    
-                    # Get duration
-                    duration = video.duration
-                    
-                    # Create a temporary file for the audio
-                    temp_audio = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-                    temp_audio.close()
-                    
-                    # Extract audio
-                    video.audio.write_audiofile(temp_audio.name, verbose=False, logger=None)
-                    video.close()
-                    
-                    return temp_audio.name, duration
-                except Exception as e:
-                    raise ValueError(f"Failed to extract audio from video: {str(e)}")
-            
-        elif ext in audio_formats:
-            # Load audio file to get duration
-            if ext == '.wav':
-                with wave.open(file_path, 'rb') as wf:
-                    frames = wf.getnframes()
-                    rate = wf.getframerate()
-                    duration = frames / float(rate)
-                return file_path, duration
-            else:
-                try:
-                    # Try using ffprobe first
-                    import subprocess
-                    
-                    duration_cmd = [
-                        "ffprobe", 
-                        "-v", "error", 
-                        "-show_entries", "format=duration", 
-                        "-of", "default=noprint_wrappers=1:nokey=1", 
-                        file_path
-                    ]
-                    
-                    duration = float(subprocess.check_output(duration_cmd).decode('utf-8').strip())
-                    return file_path, duration
-                    
-                except Exception:
-                    # Fallback to moviepy
-                    if not MOVIEPY_AVAILABLE:
-                        raise ImportError("The moviepy library is required to process this audio format.")
-                    
-                    audio = AudioFileClip(file_path)
-                    duration = audio.duration
-                    audio.close()
-                    return file_path, duration
-        else:
-            raise ValueError(f"Unsupported file format: {ext}")
-    
-    def extract_audio_segment(self, audio_path, start_time, end_time):
-        """Extract a segment of audio from the given file"""
-        # Get file extension
-        _, ext = os.path.splitext(audio_path)
-        ext = ext.lower()
+    def finish_transcription(self, result, file_name, error, progress_window, streamed=False):
+        """Complete the transcription process after the thread finishes
         
-        # Create a temporary file for the segment
-        temp_segment = tempfile.NamedTemporaryFile(suffix=ext, delete=False)
-        temp_segment.close()
-        
-        try:
-            # Try using ffmpeg first (more reliable)
-            import subprocess
-            
-            extract_cmd = [
-                "ffmpeg",
-                "-i", audio_path,
-                "-ss", str(start_time),
-                "-to", str(end_time),
-                "-q:a", "0",
-                "-y",  # Overwrite output file if it exists
-                temp_segment.name
-            ]
-            
-            subprocess.run(extract_cmd, check=True, capture_output=True)
-            return temp_segment.name
-            
-        except Exception as e:
-            print(f"FFmpeg segment extraction failed: {str(e)}")
-            print("Falling back to native methods...")
-            
-            # Fallback to native methods
-            if ext == '.wav':
-                # Use wave module for WAV files
-                try:
-                    with wave.open(audio_path, 'rb') as wf:
-                        # Get file parameters
-                        channels = wf.getnchannels()
-                        sample_width = wf.getsampwidth()
-                        framerate = wf.getframerate()
-                        
-                        # Calculate frame positions
-                        start_frame = int(start_time * framerate)
-                        end_frame = int(end_time * framerate)
-                        
-                        # Set position to start frame
-                        wf.setpos(start_frame)
-                        
-                        # Read frames
-                        frames = wf.readframes(end_frame - start_frame)
-                        
-                        # Write segment to new file
-                        with wave.open(temp_segment.name, 'wb') as segment_file:
-                            segment_file.setnchannels(channels)
-                            segment_file.setsampwidth(sample_width)
-                            segment_file.setframerate(framerate)
-                            segment_file.writeframes(frames)
-                    
-                    return temp_segment.name
-                except Exception as wave_error:
-                    print(f"Wave extraction failed: {str(wave_error)}")
-            
-            # Last resort: try moviepy
-            if MOVIEPY_AVAILABLE:
-                try:
-                    audio = AudioFileClip(audio_path)
-                    segment = audio.subclip(start_time, end_time)
-                    segment.write_audiofile(temp_segment.name, verbose=False, logger=None)
-                    audio.close()
-                    segment.close()
-                    return temp_segment.name
-                except Exception as moviepy_error:
-                    raise ValueError(f"Failed to extract audio segment: {str(moviepy_error)}")
-            else:
-                raise ImportError("The moviepy library is required to process this audio format.")
-
-    def finish_transcription(self, result, file_name, error, progress_window):
-        """Complete the transcription process after the thread finishes"""
+        With streamed the text is already in the output, so only the
+        history, buttons and word count are updated.
+        """
         # Close progress window
         progress_window.destroy()
+        if streamed and "stream_text" in self.output_text.mark_names():
+            self.output_text.mark_unset("stream_text")
         
         if error:
             # Handle error
@@ -1089,13 +1641,14 @@ class TranscriptorGUI:
             self.copy_button.configure(state="normal")
             self.export_button.configure(state="normal")
             
-            # Display the result with cyberpunk formatting
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.output_text.insert("1.0", f"\n{'='*50}\n")
-            self.output_text.insert("1.0", f"{result}\n")
-            self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
-            self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
-            self.output_text.insert("1.0", f"[FILE_TRANSCRIPTION_{timestamp.replace(':', '')}]\n")
+            # Display the result with cyberpunk formatting, unless it was streamed in already
+            if not streamed or not result:
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.output_text.insert("1.0", f"\n{'='*50}\n")
+                self.output_text.insert("1.0", f"{result}\n")
+                self.output_text.insert("1.0", f"[FILE: {file_name}]\n")
+                self.output_text.insert("1.0", f"[TIMESTAMP: {timestamp}]\n")
+                self.output_text.insert("1.0", f"[FILE_TRANSCRIPTION_{timestamp.replace(':', '')}]\n")
         
         # Reset status
         self.status_label.configure(text="STATUS: IDLE")
@@ -1134,7 +1687,7 @@ class TranscriptorGUI:
         # Create progress window
         progress_window = tk.Toplevel(self.root)
         progress_window.title("Batch Processing")
-        progress_window.geometry("400x200")
+        progress_window.geometry("400x240")
         progress_window.configure(bg="black")
         progress_window.transient(self.root)
         progress_window.grab_set()
@@ -1165,11 +1718,17 @@ class TranscriptorGUI:
                                      style="Cyberpunk.TLabel")
         current_file_label.pack(pady=10)
         
+        # Time estimate from the probed durations
+        eta_label = ttk.Label(progress_window, 
+                            text="Estimated time remaining: Calculating...",
+                            style="Cyberpunk.TLabel")
+        eta_label.pack(pady=5)
+        
         # Cancel button
-        cancel_var = tk.BooleanVar(value=False)
+        cancel_event = threading.Event()
         cancel_button = ttk.Button(progress_window,
                                  text="[CANCEL]",
-                                 command=lambda: cancel_var.set(True),
+                                 command=cancel_event.set,
                                  style="Cyberpunk.TButton")
         cancel_button.pack(pady=10)
         
@@ -1179,66 +1738,76 @@ class TranscriptorGUI:
         # Function to run batch processing in a separate thread
         def batch_thread():
             batch_results = []
-            temp_transcriptor = None
             
             try:
                 # Initialize the larger model if needed
+                transcriptor = self.transcriptor
                 if use_larger_model:
-                    progress_label.config(text="Loading medium model...")
-                    progress_window.update()
-                    temp_transcriptor = AudioTranscriptor("medium")
+                    self.ui.post(progress_label.config, text="Loading medium model...", key=progress_label)
+                    transcriptor = AudioTranscriptor("medium")
                 
-                # Process each file
-                for i, file_path in enumerate(file_paths):
-                    # Check if cancelled
-                    if cancel_var.get():
-                        break
-                        
+                # Use worker processes for inference when the machine has room for them
+                model_size = transcriptor.model_size
+                workers = default_worker_count(model_size, len(file_paths))
+                pool = self.get_transcription_pool(model_size, workers) if workers > 1 else None
+                
+                # Probed durations are cached, so sizing the batch stays cheap on reruns
+                self.ui.post(progress_label.config, text="Reading file durations...", key=progress_label)
+                durations = {}
+                for file_path in file_paths:
+                    try:
+                        durations[file_path] = probe_duration(file_path)
+                    except Exception:
+                        durations[file_path] = 0.0
+                total_duration = sum(durations.values())
+                done_duration = 0.0
+                start_time = time.time()
+                self.ui.post(progress_label.config, key=progress_label,
+                             text=f"Processing files ({format_duration(total_duration)} of audio)...")
+                
+                def on_start(i, file_path):
+                    self.ui.post(current_file_label.config, key=current_file_label,
+                                 text=f"Processing: {os.path.basename(file_path)}")
+                
+                def on_result(i, file_path, result, error):
+                    nonlocal done_duration
+                    
                     # Update progress
                     file_name = os.path.basename(file_path)
-                    progress_var.set(i)
-                    counter_label.config(text=f"File {i+1}/{len(file_paths)}")
-                    current_file_label.config(text=f"Processing: {file_name}")
-                    progress_window.update()
+                    self.ui.post(progress_var.set, i + 1, key=progress_var)
+                    self.ui.post(counter_label.config, text=f"File {i+1}/{len(file_paths)}", key=counter_label)
                     
-                    try:
-                        # Transcribe the file
-                        if use_larger_model:
-                            result = temp_transcriptor.transcribe_file(file_path)
-                        else:
-                            result = self.transcriptor.transcribe_file(file_path)
-                        
-                        # Add to results
-                        batch_results.append({
-                            "file": file_name,
-                            "path": file_path,
-                            "text": result
-                        })
-                        
+                    # Estimate the remaining time from the audio transcribed so far
+                    done_duration += durations.get(file_path, 0.0)
+                    if done_duration > 0:
+                        remaining = (time.time() - start_time) / done_duration * (total_duration - done_duration)
+                        self.ui.post(eta_label.config, key=eta_label,
+                                     text=f"Estimated time remaining: {format_duration(remaining)}")
+                    
+                    # Add to results
+                    batch_results.append({
+                        "file": file_name,
+                        "path": file_path,
+                        "text": result
+                    })
+                    
+                    if error:
+                        # Show error but continue with next file
+                        error_msg = f"Error processing {file_name}: {error}"
+                        self.ui.post(messagebox.showerror, "Batch Processing Error", error_msg)
+                    else:
                         # Log the transcription
                         self.log_transcription(f"[BATCH FILE: {file_name}]\n{result}")
-                        
-                    except Exception as e:
-                        error_msg = f"Error processing {file_name}: {str(e)}"
-                        batch_results.append({
-                            "file": file_name,
-                            "path": file_path,
-                            "text": f"[ERROR: {str(e)}]"
-                        })
-                        
-                        # Show error but continue with next file
-                        self.root.after(0, lambda err=error_msg: messagebox.showerror("Batch Processing Error", err))
+                
+                # Decode upcoming files while earlier ones are transcribed
+                pipeline = BatchPipeline(file_paths, transcriptor, pool=pool, cancel_event=cancel_event)
+                pipeline.run(on_result, on_start)
             
             finally:
-                # Clean up temporary transcriptor if used
-                if temp_transcriptor:
-                    del temp_transcriptor
-                
                 # Schedule UI updates on the main thread
-                self.root.after(0, lambda: self.finish_batch_processing(batch_results, progress_window, cancel_var.get()))
+                self.ui.post(self.finish_batch_processing, batch_results, progress_window, cancel_event.is_set())
         
         # Start batch processing in a separate thread
-        import threading
         threading.Thread(target=batch_thread, daemon=True).start()
     
     def finish_batch_processing(self, batch_results, progress_window, was_cancelled):
@@ -1431,111 +2000,3370 @@ class TranscriptorGUI:
         except Exception as e:
             messagebox.showerror("Export Error", f"Error saving file: {str(e)}")
 
-class AudioTranscriptor:
-    def __init__(self, model_size="base"):
-        self.model = whisper.load_model(model_size)
-        self.model_size = model_size
-        self.temp_files = []
+class Metrics:
+    """Process-wide counters and stage-duration histograms, exported as Prometheus text or JSON
+    
+    Series are keyed by name and labels. When disabled every call returns
+    immediately, so instrumented code pays one attribute check.
+    """
+    
+    def __init__(self, enabled=METRICS_ENABLED, buckets=METRICS_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., sum, count]
+        self.exporter = None
+        self.export_stop = threading.Event()
+    
+    def count(self, name, value=1, **labels):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def observe(self, name, value, **labels):
+        """Record a value in a histogram"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += value
+            histogram[-1] += 1
+    
+    def value(self, name, **labels):
+        with self.lock:
+            return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+    
+    def total(self, name):
+        """Return a counter summed over all its labels"""
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+    
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+    
+    def snapshot(self):
+        """Return all series as a JSON-serialisable dict"""
+        with self.lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = []
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                total, count = histogram[-2], histogram[-1]
+                histograms.append({
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": count,
+                    "sum": total,
+                    "mean": total / count if count else 0.0,
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"],
+                                        list(itertools.accumulate(histogram[:-2])) + [count]))
+                })
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+    
+    def stage_summary(self):
+        """Return {stage: (count, total seconds)} for the stage timers"""
+        with self.lock:
+            return {dict(labels).get("stage"): (histogram[-1], histogram[-2])
+                    for (name, labels), histogram in self.histograms.items() if name == "stage_seconds"}
+    
+    def prometheus_text(self, prefix="cyberscribe_"):
+        """Return all series in the Prometheus text exposition format"""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+        
+        lines = []
+        with self.lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {prefix}{name} counter")
+                lines.append(f"{prefix}{name}{label_text(labels)} {value}")
+            
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {prefix}{name} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, histogram):
+                    cumulative += bucket_count
+                    lines.append(f"{prefix}{name}_bucket{label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{prefix}{name}_bucket{label_text(labels, [('le', '+Inf')])} {histogram[-1]}")
+                lines.append(f"{prefix}{name}_sum{label_text(labels)} {histogram[-2]}")
+                lines.append(f"{prefix}{name}_count{label_text(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n" if lines else ""
+    
+    def export(self, path):
+        """Write the metrics to a file, as JSON if it ends in .json and Prometheus text otherwise"""
+        if path.endswith(".json"):
+            content = json.dumps(self.snapshot(), indent=2)
+        else:
+            content = self.prometheus_text()
+        
+        # Replace atomically so scrapers never read a half-written file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    
+    def start_export(self, path, interval=METRICS_EXPORT_INTERVAL):
+        """Write the metrics file periodically until stop_export()"""
+        if not self.enabled or self.exporter:
+            return
+        
+        def export_loop():
+            while not self.export_stop.wait(interval):
+                try:
+                    self.export(path)
+                except OSError as e:
+                    print(f"Failed to write metrics: {str(e)}")
+        
+        self.export_path = path
+        self.exporter = threading.Thread(target=export_loop, daemon=True)
+        self.exporter.start()
+    
+    def stop_export(self):
+        """Stop the periodic export and write the final values"""
+        if not self.exporter:
+            return
+        self.export_stop.set()
+        self.exporter.join()
+        self.exporter = None
+        try:
+            self.export(self.export_path)
+        except OSError as e:
+            print(f"Failed to write metrics: {str(e)}")
 
-    def __del__(self):
-        """Clean up any temporary files when the object is destroyed"""
-        for temp_file in self.temp_files:
+# Metrics of this process
+METRICS = Metrics()
+
+def timed_stage(stage):
+    """Decorator recording each call's duration in the stage_seconds histogram"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            start_time = time.perf_counter()
             try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            except Exception:
-                pass
+                return func(*args, **kwargs)
+            finally:
+                METRICS.observe("stage_seconds", time.perf_counter() - start_time, stage=stage)
+        return wrapper
+    return decorate
 
-    def transcribe_file(self, audio_path):
+def new_session_id():
+    """Generate a unique session ID"""
+    return f"SESSION_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8]}"
+
+def open_history_index(store):
+    """Open the search index and bring it up to date, or return None if SQLite fails"""
+    try:
+        index = HistoryIndex()
+        index.catch_up(store)
+        return index
+    except sqlite3.Error as e:
+        print(f"History search index unavailable: {str(e)}")
+        return None
+
+@timed_stage("history")
+def record_transcription(text, session_id, store, index=None):
+    """Write a transcription to the text log, the history log and the search index"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    # Log to text file (for backward compatibility)
+    with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+        f.write(f"\n{'='*50}\n")
+        f.write(f"SESSION: {session_id}\n")
+        f.write(f"TIMESTAMP: {timestamp}\n")
+        f.write(f"{text}\n")
+        f.write(f"{'='*50}\n")
+    
+    # Create transcription entry
+    entry = {
+        "session_id": session_id,
+        "timestamp": timestamp,
+        "text": text,
+        "word_count": len(text.split())
+    }
+    
+    # Append to the history log and index it for search
+    store.append(entry)
+    if index:
         try:
-            # Check if file exists
-            if not os.path.exists(audio_path):
-                raise FileNotFoundError(f"Audio file not found: {audio_path}")
-                
-            # Get file extension
-            _, ext = os.path.splitext(audio_path)
-            ext = ext.lower()
-            
-            # Process based on file type
-            audio_formats = ['.wav', '.mp3', '.m4a', '.ogg']
-            video_formats = ['.mp4', '.mpeg', '.mpg', '.avi', '.mov']
-            supported_formats = audio_formats + video_formats
-            
-            if ext not in supported_formats:
-                raise ValueError(f"Unsupported audio format: {ext}. Supported formats: {', '.join(supported_formats)}")
-            
-            # If it's a video file, extract the audio first
-            processed_audio_path = audio_path
-            if ext in video_formats:
-                if not MOVIEPY_AVAILABLE:
-                    raise ImportError("The moviepy library is required to process video files. "
-                                     "Please install it with 'pip install moviepy'.")
-                
-                # Extract audio from video
-                processed_audio_path = self._extract_audio_from_video(audio_path)
-            
-            # Transcribe with appropriate options based on model size
-            options = {}
-            
-            # For larger models, use more features
-            if self.model_size in ["medium", "large"]:
-                options = {
-                    "language": "en",  # Auto-detect language
-                    "task": "transcribe",
-                    "fp16": False  # Use FP16 for faster processing if available
-                }
+            index.add(store)
+        except sqlite3.Error as e:
+            print(f"Failed to index transcription: {str(e)}")
+    return entry
+
+class HistoryStore:
+    """Append-only JSON Lines transcription history with group-commit fsync"""
+    
+    def __init__(self, path=HISTORY_JSONL, legacy_path=HISTORY_JSON):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.file = None
+        self.lock = threading.Lock()
+        self.unsynced = 0
+        self.last_sync = time.time()
+        self.sync_timer = None
+        
+        self._migrate()
+    
+    def _migrate(self):
+        """Convert the legacy JSON array history to JSON Lines once"""
+        if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return
+        
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            # Keep the damaged file aside instead of silently discarding it
+            print(f"Could not migrate {self.legacy_path}: {str(e)}")
+            os.replace(self.legacy_path, self.legacy_path + ".corrupt")
+            return
+        
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            for entry in history:
+                f.write(self._encode(entry))
+            f.flush()
+            os.fsync(f.fileno())
+        
+        os.replace(temp_path, self.path)
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        print(f"Migrated {len(history)} history entries to {self.path}")
+    
+    def _encode(self, entry):
+        return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    
+    def _open(self):
+        """Open the log for appending, terminating a torn last line if needed"""
+        self.file = open(self.path, "ab")
+        if self.file.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write(b"\n")
+    
+    def exists(self):
+        return os.path.exists(self.path)
+    
+    def append(self, entry):
+        """Append an entry and return the log offset just past it
+        
+        fsync is batched across entries arriving close together.
+        """
+        with self.lock:
+            if self.file is None:
+                self._open()
             
-            # Perform transcription
-            result = self.model.transcribe(processed_audio_path, **options)
-            return result["text"]
-        except Exception as e:
-            print(f"Transcription error: {str(e)}")
-            return f"[ERROR: {str(e)}]"
+            self.file.write(self._encode(entry))
+            self.file.flush()
+            offset = self.file.tell()
+            self.unsynced += 1
+            
+            if (self.unsynced >= HISTORY_FSYNC_BATCH or
+                    time.time() - self.last_sync >= HISTORY_FSYNC_INTERVAL):
+                self._sync()
+            elif self.sync_timer is None:
+                self.sync_timer = threading.Timer(HISTORY_FSYNC_INTERVAL, self.sync)
+                self.sync_timer.daemon = True
+                self.sync_timer.start()
+            
+            return offset
+    
+    def sync(self):
+        """Flush appended entries to stable storage"""
+        with self.lock:
+            self._sync()
+    
+    def _sync(self):
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.time()
     
-    def _extract_audio_from_video(self, video_path):
-        """Extract audio from a video file and return the path to the audio file"""
-        # Create a temporary file for the audio
-        temp_audio = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-        temp_audio.close()
+    def close(self):
+        with self.lock:
+            self._sync()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+    
+    def iter_entries(self, reverse=False):
+        """Stream entries from the log, optionally newest first"""
+        if not self.exists():
+            return
         
-        # Add to list of temp files to clean up later
-        self.temp_files.append(temp_audio.name)
+        with open(self.path, "rb") as f:
+            lines = self._iter_lines_reverse(f) if reverse else f
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Skip a torn write instead of discarding the whole history
+                    continue
+    
+    def iter_entries_from(self, offset):
+        """Stream (entry, end offset) pairs for complete lines after the given offset"""
+        if not self.exists():
+            return
         
-        try:
-            # Extract audio using moviepy
-            video = VideoFileClip(video_path)
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    return  # End of file or a line still being written
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line), f.tell()
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+    
+    def size(self):
+        return os.path.getsize(self.path) if self.exists() else 0
+    
+    def _iter_lines_reverse(self, f, block_size=64 * 1024):
+        """Yield the lines of a binary file from last to first"""
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
             
-            # Check if audio is available
-            if video.audio is None:
-                video.close()
-                raise ValueError("No audio track found in the video file")
-                
-            # Write audio to file with verbose=False to suppress output
-            video.audio.write_audiofile(temp_audio.name, verbose=False, logger=None)
-            video.close()
+            # The first piece may be the tail of a line in the previous block
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                yield line
+        
+        yield remainder
+
+class HistoryIndex:
+    """SQLite FTS5 index over the history log for ranked, prefix and phrase search
+    
+    Query syntax: words must all match, "quoted phrases" match exactly,
+    word* matches a prefix and field:word restricts a word to the
+    session_id, file_name or timestamp column.
+    """
+    
+    SEARCH_FIELDS = ("text", "session_id", "file_name", "timestamp")
+    
+    def __init__(self, path=HISTORY_DB):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    session_id TEXT,
+                    timestamp TEXT,
+                    file_name TEXT,
+                    text TEXT,
+                    word_count INTEGER
+                )""")
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    text, session_id, file_name, timestamp,
+                    content='entries', content_rowid='id'
+                )""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+    
+    def _get_offset(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'log_offset'").fetchone()
+        return int(row[0]) if row else 0
+    
+    def _set_offset(self, offset):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('log_offset', ?)", (offset,))
+    
+    def _insert(self, entry):
+        text = entry.get("text", "")
+        match = re.match(r"\[(?:\w+ )?FILE: (.+?)\]", text)
+        file_name = match.group(1) if match else ""
+        
+        cursor = self.conn.execute(
+            "INSERT INTO entries (session_id, timestamp, file_name, text, word_count) VALUES (?, ?, ?, ?, ?)",
+            (entry.get("session_id", ""), entry.get("timestamp", ""), file_name, text,
+             entry.get("word_count", 0)))
+        self.conn.execute(
+            "INSERT INTO entries_fts (rowid, text, session_id, file_name, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid, text, entry.get("session_id", ""), file_name, entry.get("timestamp", "")))
+    
+    def catch_up(self, store):
+        """Index entries appended to the log since the last run"""
+        count = self._index_new_entries(store)
+        if count:
+            print(f"Indexed {count} history entries")
+    
+    def add(self, store):
+        """Index a newly appended entry, with any that other processes appended before it"""
+        self._index_new_entries(store)
+    
+    def _index_new_entries(self, store):
+        """Index the log from the last indexed offset to its end and return the entry count"""
+        with self.lock, self.conn:
+            # Take the write lock before reading the offset so processes sharing
+            # the index never insert the same entry twice
+            self.conn.execute("BEGIN IMMEDIATE")
+            offset = self._get_offset()
             
-            return temp_audio.name
-        except Exception as e:
-            # If there's an error with moviepy, try using ffmpeg directly
-            print(f"Error using moviepy: {str(e)}")
-            print("Trying alternative method with ffmpeg...")
+            # The log was replaced or truncated, so rebuild from scratch
+            if offset > store.size():
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('delete-all')")
+                offset = 0
+            
+            count = 0
+            for entry, offset in store.iter_entries_from(offset):
+                self._insert(entry)
+                count += 1
+            self._set_offset(offset)
+        return count
+    
+    def _build_query(self, query):
+        """Translate the user query into an FTS5 MATCH expression"""
+        terms = []
+        for field, phrase, word in re.findall(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))', query):
+            # An unknown prefix is part of the text, as in 10:30
+            literal = field and field not in self.SEARCH_FIELDS
+            if phrase:
+                if literal:
+                    phrase = f"{field}:{phrase}"
+                term = '"' + phrase.replace('"', '""') + '"'
+            else:
+                prefix = word.endswith("*")
+                word = word.rstrip("*")
+                if literal:
+                    word = f"{field}:{word}"
+                if not word:
+                    continue
+                term = '"' + word.replace('"', '""') + '"' + ("*" if prefix else "")
             
-            import subprocess
+            if field in self.SEARCH_FIELDS:
+                term = f"{field}:{term}"
+            terms.append(term)
+        return " AND ".join(terms)
+    
+    def search(self, query, limit=None, offset=0):
+        """Return matching entries, best match first"""
+        match = self._build_query(query)
+        if not match:
+            return []
+        
+        sql = """
+            SELECT e.session_id, e.timestamp, e.text, e.word_count
+            FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+            WHERE entries_fts MATCH ?
+            ORDER BY bm25(entries_fts), e.id DESC
+            LIMIT ? OFFSET ?"""
+        with self.lock:
+            rows = self.conn.execute(sql, (match, -1 if limit is None else limit, offset)).fetchall()
+        
+        return [{"session_id": session_id, "timestamp": timestamp, "text": text, "word_count": word_count}
+                for session_id, timestamp, text, word_count in rows]
+    
+    def iter_search(self, query, page_size):
+        """Yield matching entries, fetching one page at a time"""
+        offset = 0
+        while True:
+            page = self.search(query, limit=page_size, offset=offset)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class TranscriptionCache:
+    """On-disk transcription results keyed by audio content, model and options
+    
+    Each result is a small JSON file; the least recently used files are
+    deleted once the directory exceeds its size budget. File content
+    digests are remembered by path, size and mtime in an append-only log
+    so unchanged files are not re-read on later runs; the log counts
+    toward the budget and is compacted when results are evicted.
+    """
+    
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.digest_log = os.path.join(directory, "file_digests.jsonl")
+        
+        # Nothing is read here; the directory is indexed on first use
+        self.entries = None
+        self.total_size = 0  # Results plus the digest log
+        self.file_digests = {}
+        self.digest_log_size = 0
+        self.digest_log_compacted = 0  # Log size after the last compaction
+    
+    def _load(self):
+        """Index existing results and remembered digests; called with the lock held"""
+        if self.entries is not None:
+            return
+        self._read_digests()
+        self.digest_log_compacted = self.digest_log_size
+        self._scan()
+    
+    def _scan(self):
+        """Index the results on disk, least recently used first; called with the lock held
+        
+        Other processes share the directory, so this is repeated before evicting.
+        """
+        results = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # Evicted meanwhile
+                    results.append((stat.st_mtime_ns, entry.name[:-5], stat.st_size))
+        results.sort()
+        self.entries = OrderedDict((key, size) for _, key, size in results)
+        
+        try:
+            self.digest_log_size = os.path.getsize(self.digest_log)
+        except OSError:
+            self.digest_log_size = 0
+        self.total_size = sum(self.entries.values()) + self.digest_log_size
+    
+    def _read_digests(self):
+        """Load the remembered file digests from the log; called with the lock held"""
+        self.file_digests = {}
+        self.digest_log_size = 0
+        if not os.path.exists(self.digest_log):
+            return
+        with open(self.digest_log, "r", encoding="utf-8") as f:
+            for line in f:
+                self.digest_log_size += len(line.encode("utf-8"))
+                try:
+                    record = json.loads(line)
+                    self.file_digests[(record["path"], record["size"], record["mtime_ns"])] = record["digest"]
+                except (json.JSONDecodeError, KeyError):
+                    continue
+    
+    def _compact_digests(self):
+        """Rewrite the digest log with only the records of unchanged files; called with the lock held"""
+        # Amortized: only once the log has doubled since it was last compacted
+        if self.digest_log_size <= max(2 * self.digest_log_compacted, 64 * 1024):
+            return
+        
+        # Re-read first so records appended by other processes are kept
+        self._read_digests()
+        lines = []
+        for (path, size, mtime_ns), digest in list(self.file_digests.items()):
             try:
-                # Use ffmpeg directly
-                subprocess.run([
-                    "ffmpeg", "-i", video_path, 
-                    "-q:a", "0", "-map", "a", temp_audio.name
-                ], check=True, capture_output=True)
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if stat is None or (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                del self.file_digests[(path, size, mtime_ns)]
+                continue
+            lines.append(json.dumps({"path": path, "size": size, "mtime_ns": mtime_ns, "digest": digest}) + "\n")
+        
+        temp_path = f"{self.digest_log}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(temp_path, self.digest_log)
+        
+        size = sum(len(line.encode("utf-8")) for line in lines)
+        self.total_size += size - self.digest_log_size
+        self.digest_log_size = self.digest_log_compacted = size
+    
+    def file_digest(self, path):
+        """Return the content digest of a file, hashing it only if it changed"""
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            self._load()
+            digest = self.file_digests.get(memo_key)
+        if digest:
+            return digest
+        
+        hasher = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        
+        line = json.dumps({"path": memo_key[0], "size": memo_key[1],
+                           "mtime_ns": memo_key[2], "digest": digest}) + "\n"
+        with self.lock:
+            self.file_digests[memo_key] = digest
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.digest_log, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.digest_log_size += len(line.encode("utf-8"))
+            self.total_size += len(line.encode("utf-8"))
+        return digest
+    
+    def audio_digest(self, samples):
+        """Return the content digest of an audio array"""
+        return hashlib.blake2b(np.ascontiguousarray(samples).data, digest_size=20).hexdigest()
+    
+    def key(self, digest, model_size, options, variant=None):
+        """Combine the content digest with everything else that affects the result"""
+        material = json.dumps([digest, model_size, options, variant or {}], sort_keys=True, default=str)
+        return hashlib.blake2b(material.encode("utf-8"), digest_size=20).hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+    
+    def get(self, key):
+        """Return the cached text for a key, or None"""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                text = json.load(f)["text"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            with self.lock:
+                self.misses += 1
+            METRICS.count("cache_misses_total")
+            return None
+        
+        # Touch the file so the LRU order survives restarts and is shared
+        # between processes (with a fine-grained time, as the order comes from it)
+        try:
+            now = time.time_ns()
+            os.utime(self._path(key), ns=(now, now))
+        except OSError:
+            pass
+        
+        METRICS.count("cache_hits_total")
+        with self.lock:
+            self._load()
+            self.hits += 1
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        return text
+    
+    def put(self, key, text):
+        """Store a result and evict the least recently used ones over budget"""
+        if text.startswith("[ERROR:"):
+            return
+        
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f, ensure_ascii=False)
+        now = time.time_ns()
+        os.utime(temp_path, ns=(now, now))
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        
+        with self.lock:
+            self._load()
+            self.total_size += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            if self.total_size <= self.max_bytes:
+                return
+            
+            # Other processes (such as pool workers) write here too, so evict by
+            # the directory's current contents rather than this process's view,
+            # and free a margin so the next rescan is a while away
+            self._scan()
+            self._compact_digests()
+            while self.total_size > self.max_bytes * CACHE_LOW_WATER and len(self.entries) > 1:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.total_size -= old_size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+    
+    def stats(self):
+        with self.lock:
+            self._load()
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self.entries), "size": self.total_size}
+
+# Constructed at import, which only records its paths; the directory and the
+# digest log are first read when a result is looked up or stored
+TRANSCRIPTION_CACHE = TranscriptionCache() if CACHE_ENABLED else None
+
+class ModelRegistry:
+    """Process-wide cache of loaded Whisper models with LRU eviction under a memory budget"""
+    
+    def __init__(self, memory_budget=MODEL_CACHE_BUDGET, loader=None):
+        self.memory_budget = memory_budget
+        self.loader = loader
+        self.models = OrderedDict()  # key -> (model, size in bytes), least recently used first
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.inference_locks = {}
+        
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_times = {}
+    
+    def get(self, model_size, **options):
+        """Return a loaded model, loading it on a cache miss"""
+        key = (model_size, tuple(sorted(options.items())))
+        
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        
+        # Only one thread loads a given model; others wait and then hit the cache
+        with key_lock:
+            with self.lock:
+                if key in self.models:
+                    self.models.move_to_end(key)
+                    self.hits += 1
+                    return self.models[key][0]
+                self.misses += 1
                 
-                return temp_audio.name
-            except Exception as ffmpeg_error:
-                print(f"Error using ffmpeg: {str(ffmpeg_error)}")
-                raise ValueError(f"Failed to extract audio from video: {str(e)}")
+                # Make room before loading
+                self._evict(MODEL_MEMORY_ESTIMATES.get(model_size, 0))
+            
+            start_time = time.time()
+            loader = self.loader or load_whisper().load_model
+            model = loader(model_size, **options)
+            load_time = time.time() - start_time
+            METRICS.observe("stage_seconds", load_time, stage="model_load")
+            
+            with self.lock:
+                size = self._model_memory(model, model_size)
+                self.models[key] = (model, size)
+                self.load_times[key] = load_time
+                self._evict(0)
+            
+            print(f"Model cache: loaded {model_size} in {load_time:.1f}s "
+                  f"({size / (1024 * 1024):.0f} MB)")
+            return model
+    
+    def inference_lock(self, model_size, **options):
+        """Return the lock that serializes inference on a model
+        
+        Whisper installs kv-cache hooks on the model's modules while
+        decoding, so one model must not run two transcriptions at once.
+        """
+        key = (model_size, tuple(sorted(options.items())))
+        with self.lock:
+            return self.inference_locks.setdefault(key, threading.Lock())
+    
+    def _evict(self, incoming):
+        """Drop least recently used models until the incoming model fits the budget"""
+        # The most recently used model is never evicted
+        while len(self.models) > 1 and self.memory_used() + incoming > self.memory_budget:
+            key, (model, size) = self.models.popitem(last=False)
+            self.evictions += 1
+            print(f"Model cache: evicted {key[0]} ({size / (1024 * 1024):.0f} MB)")
+    
+    def _model_memory(self, model, model_size):
+        """Return the size of the model's parameters in bytes"""
+        try:
+            return sum(p.numel() * p.element_size() for p in model.parameters())
+        except Exception:
+            return MODEL_MEMORY_ESTIMATES.get(model_size, 0)
+    
+    def memory_used(self):
+        return sum(size for _, size in self.models.values())
+    
+    def clear(self):
+        """Drop every cached model"""
+        with self.lock:
+            self.models.clear()
+    
+    def stats(self):
+        """Return cache statistics as a dictionary"""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loaded": [key[0] for key in self.models],
+                "memory_used": self.memory_used(),
+                "memory_budget": self.memory_budget,
+                "load_times": {key[0]: round(t, 3) for key, t in self.load_times.items()},
+            }
+
+MODEL_REGISTRY = ModelRegistry()
 
-def main():
+class AudioTranscriptor:
+    def __init__(self, model_size="base", lazy=False, **model_options):
+        self.model_size = model_size
+        self.model_options = model_options
+        self.inference_lock = MODEL_REGISTRY.inference_lock(model_size, **model_options)
+        self._model = None
+        if not lazy:
+            self._model = MODEL_REGISTRY.get(model_size, **model_options)
+    
+    @property
+    def model(self):
+        """The Whisper model; with lazy=True it is loaded on first use"""
+        if self._model is None:
+            self._model = MODEL_REGISTRY.get(self.model_size, **self.model_options)
+        return self._model
+
+    def transcribe_file(self, audio_path):
+        METRICS.count("files_total", path="file")
+        try:
+            # Check the file exists and is a supported format
+            ext = check_media_file(audio_path)
+            
+            # Return the cached result if this content was transcribed before
+            cache_key = self.file_cache_key(audio_path)
+            cached = TRANSCRIPTION_CACHE.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached
+            
+            # Decode audio or a video's audio track to 16 kHz samples, then transcribe
+            audio = decode_audio(audio_path)
+            try:
+                result = self.transcribe_result(audio.samples)
+            finally:
+                audio.close()
+            if cache_key:
+                TRANSCRIPTION_CACHE.put(cache_key, result["text"])
+            return result["text"]
+        except Exception as e:
+            METRICS.count("errors_total", stage="file")
+            print(f"Transcription error: {str(e)}")
+            return f"[ERROR: {str(e)}]"
+    
+    def transcribe_stream(self, audio_path):
+        """Yield {"text", "start", "end", "progress"} segments of a file as they are decoded
+        
+        The audio is cut at silences into windows of up to 30 s, each
+        transcribed with the text so far as its prompt, so the first words
+        arrive after one window rather than the whole file. A window without
+        speech yields an empty text so progress still advances. Errors are
+        raised rather than returned as text.
+        """
+        METRICS.count("files_total", path="stream")
+        try:
+            check_media_file(audio_path)
+            cache_key = self.file_cache_key(audio_path, streamed=True)
+            cached = TRANSCRIPTION_CACHE.get(cache_key) if cache_key else None
+            if cached is not None:
+                yield {"text": cached, "start": 0.0, "end": probe_duration(audio_path), "progress": 1.0}
+                return
+            
+            audio = decode_audio(audio_path)
+            texts = []
+            try:
+                for segment in self.transcribe_audio_stream(audio.samples):
+                    if segment["text"]:
+                        texts.append(segment["text"])
+                    yield segment
+            finally:
+                audio.close()
+            
+            if cache_key:
+                TRANSCRIPTION_CACHE.put(cache_key, " ".join(texts))
+        except Exception:
+            METRICS.count("errors_total", stage="file")
+            raise
+    
+    def transcribe_audio_stream(self, audio):
+        """Yield the segments of a 16 kHz array window by window, like transcribe_stream
+        
+        int16 audio (such as a memory-mapped recording) is converted to
+        float32 one window at a time.
+        """
+        if audio.dtype != np.int16:
+            audio = audio.astype(np.float32, copy=False)
+        duration = len(audio) / WHISPER_SAMPLE_RATE
+        texts = []
+        for window_start, window_end in plan_windows(audio):
+            prompt = " ".join(texts)[-STREAM_PROMPT_CHARS:] or None
+            window = audio[int(window_start * WHISPER_SAMPLE_RATE):int(window_end * WHISPER_SAMPLE_RATE)]
+            if window.dtype == np.int16:
+                window = window.astype(np.float32) / 32768.0
+            result = self.transcribe_result(window, initial_prompt=prompt)
+            progress = window_end / duration if duration else 1.0
+            
+            segments = [seg for seg in result.get("segments", []) if seg["text"].strip()]
+            if not segments:
+                yield {"text": "", "start": window_start, "end": window_end, "progress": progress}
+            for seg in segments:
+                texts.append(seg["text"].strip())
+                yield {"text": texts[-1],
+                       "start": window_start + seg["start"],
+                       "end": min(window_start + seg["end"], window_end),
+                       "progress": progress}
+    
+    def file_cache_key(self, audio_path, **variant):
+        """Return the result cache key for a file, or None when caching is disabled"""
+        if not TRANSCRIPTION_CACHE:
+            return None
+        digest = TRANSCRIPTION_CACHE.file_digest(audio_path)
+        return TRANSCRIPTION_CACHE.key(digest, self.model_size, self._transcribe_options(), variant)
+    
+    def warm_up(self):
+        """Run a short inference on silence to initialize lazy allocations"""
+        # Called on the model directly so the warm-up stays out of the metrics
+        with self.inference_lock:
+            self.model.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), **self._transcribe_options())
+    
+    def transcribe_audio(self, audio, use_cache=True):
+        """Transcribe a 16 kHz mono float32 array without touching the disk"""
+        try:
+            audio = audio.astype(np.float32, copy=False)
+            
+            cache_key = None
+            if use_cache and TRANSCRIPTION_CACHE:
+                digest = TRANSCRIPTION_CACHE.audio_digest(audio)
+                cache_key = TRANSCRIPTION_CACHE.key(digest, self.model_size, self._transcribe_options())
+                cached = TRANSCRIPTION_CACHE.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            result = self.transcribe_result(audio)
+            if cache_key:
+                TRANSCRIPTION_CACHE.put(cache_key, result["text"])
+            return result["text"]
+        except Exception as e:
+            METRICS.count("errors_total", stage="audio")
+            print(f"Transcription error: {str(e)}")
+            return f"[ERROR: {str(e)}]"
+    
+    @timed_stage("inference")
+    def transcribe_result(self, audio, **extra_options):
+        """Run the model on a file path or 16 kHz float32 array and return the full result"""
+        options = self._transcribe_options()
+        options.update(extra_options)
+        if not isinstance(audio, str):
+            METRICS.count("audio_seconds_total", len(audio) / WHISPER_SAMPLE_RATE)
+        with self.inference_lock:
+            return self.model.transcribe(audio, **options)
+    
+    def _transcribe_options(self):
+        """Return decoding options appropriate for the model size"""
+        # Transcribe with appropriate options based on model size
+        options = {}
+        
+        # For larger models, use more features
+        if self.model_size in ["medium", "large"]:
+            options = {
+                "language": "en",  # Auto-detect language
+                "task": "transcribe",
+                "fp16": False  # Use FP16 for faster processing if available
+            }
+        return options
+
+class BatchedInference:
+    """Transcribe several short clips with one batched encoder/decoder pass
+    
+    Each clip is split into windows of at most 30 s, cut at silences.
+    The windows of all clips are
+    sorted by length and decoded in batches of similar length, so a
+    batch is not held up by one long transcript, and the texts are then
+    joined back per clip. Unlike model.transcribe this does not retry
+    at higher temperatures, which suits short voice notes.
+    """
+    
+    def __init__(self, transcriptor, batch_size=BATCH_SIZE):
+        self.transcriptor = transcriptor
+        self.batch_size = max(1, batch_size)
+    
+    @timed_stage("inference")
+    def transcribe(self, clips):
+        """Return one transcript per 16 kHz float32 clip"""
+        import torch
+        whisper = load_whisper()
+        
+        METRICS.count("audio_seconds_total", sum(len(clip) for clip in clips) / WHISPER_SAMPLE_RATE)
+        
+        model = self.transcriptor.model
+        n_mels = getattr(getattr(model, "dims", None), "n_mels", 80)
+        
+        options = self.transcriptor._transcribe_options()
+        decode_options = whisper.DecodingOptions(
+            task=options.get("task", "transcribe"),
+            language=options.get("language"),
+            without_timestamps=True,
+            fp16=options.get("fp16", True) and model.device.type != "cpu",
+        )
+        
+        # Split every clip into windows: (clip index, window index, samples)
+        windows = []
+        for clip_index, clip in enumerate(clips):
+            for window_index, (start, end) in enumerate(plan_windows(clip, min_tail=0)):
+                windows.append((clip_index, window_index,
+                                clip[int(start * WHISPER_SAMPLE_RATE):int(end * WHISPER_SAMPLE_RATE)]))
+        
+        # Bucket windows of similar length together
+        order = sorted(range(len(windows)), key=lambda k: len(windows[k][2]))
+        texts = {}
+        for first in range(0, len(order), self.batch_size):
+            batch = order[first:first + self.batch_size]
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(torch.from_numpy(np.ascontiguousarray(windows[k][2], dtype=np.float32))),
+                    n_mels)
+                for k in batch
+            ]).to(model.device)
+            
+            with self.transcriptor.inference_lock:
+                results = whisper.decode(model, mel, decode_options)
+            for k, result in zip(batch, results):
+                silent = (result.no_speech_prob > NO_SPEECH_THRESHOLD and
+                          result.avg_logprob < LOGPROB_THRESHOLD)
+                texts[k] = "" if silent else result.text.strip()
+        
+        # Join the windows back into one transcript per clip
+        parts = [[] for _ in clips]
+        for k, (clip_index, window_index, _) in enumerate(windows):
+            parts[clip_index].append((window_index, texts[k]))
+        return [" " + " ".join(text for _, text in sorted(clip_parts) if text) for clip_parts in parts]
+
+class BatchPipeline:
+    """Transcribe many files with decoding overlapped with inference
+    
+    A thread pool probes, checks the result cache for and decodes the
+    next files while the inference workers (a TranscriptionPool, or a
+    single in-process thread) transcribe earlier ones. Short clips are
+    grouped and run through BatchedInference together. At most
+    BATCH_PREFETCH decoded files (or one full batch) wait for inference,
+    and results are reported in input order.
+    """
+    
+    def __init__(self, file_paths, transcriptor, pool=None, cancel_event=None,
+                 decode_threads=BATCH_DECODE_THREADS, prefetch=BATCH_PREFETCH, batch_size=BATCH_SIZE):
+        self.file_paths = list(file_paths)
+        self.transcriptor = transcriptor
+        self.pool = pool
+        self.cancel_event = cancel_event or threading.Event()
+        self.decode_threads = decode_threads
+        self.batch_size = max(1, batch_size)
+        self.prefetch = max(prefetch, self.batch_size)
+        self.workers = pool.workers if pool else 1
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    def _prepare(self, file_path):
+        """Return (cache keys, cached text, decoded audio) for a file
+        
+        The keys are (plain, batched): batched results skip the temperature
+        fallback, so they are cached apart from model.transcribe results.
+        """
+        check_media_file(file_path)
+        
+        cache_keys = (self.transcriptor.file_cache_key(file_path),
+                      self.transcriptor.file_cache_key(file_path, batched=True))
+        for cache_key in cache_keys:
+            cached = TRANSCRIPTION_CACHE.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cache_keys, cached, None
+        
+        # A long file for a worker process is decoded to a raw file the worker maps
+        to_file = False
+        if self.pool:
+            try:
+                to_file = probe_duration(file_path) > BATCH_CLIP_MAX_SECONDS
+            except Exception:
+                pass
+        return cache_keys, None, decode_audio(file_path, to_file=to_file)
+    
+    def _submit(self, clips, inference):
+        """Start inference on a single decoded file or a batch of short ones"""
+        if len(clips) > 1:
+            samples = [audio.samples for audio in clips]
+            if self.pool:
+                return self.pool.submit_batch(samples)
+            return inference.submit(BatchedInference(self.transcriptor, self.batch_size).transcribe, samples)
+        
+        if self.pool:
+            # Memory-mapped audio goes by file and offsets instead of being pickled
+            return self.pool.submit(clips[0].segment_job(0, clips[0].duration))
+        return inference.submit(self.transcriptor.transcribe_audio, clips[0].samples, False)
+    
+    def run(self, on_result, on_start=None):
+        """Process every file, calling on_result(index, path, text, error) in order
+        
+        on_start(index, path) is called as each file is handed to inference.
+        Returns the number of files reported before any cancellation.
+        """
+        total = len(self.file_paths)
+        decoder = ThreadPoolExecutor(max_workers=self.decode_threads)
+        inference = None if self.pool else ThreadPoolExecutor(max_workers=1)
+        
+        decoding = deque()  # (index, future) in input order
+        inflight = []       # (indices, cache keys, inference future, decoded audio)
+        finished = {}       # index -> (text, error)
+        next_decode = 0
+        next_report = 0
+        
+        def waiting_files():
+            return sum(len(indices) for indices, _, _, _ in inflight)
+        
+        try:
+            while next_report < total and not self.cancel_event.is_set():
+                # Keep decoding ahead, bounded so decoded audio can't pile up
+                while (next_decode < total and
+                       len(decoding) + waiting_files() < self.prefetch + self.workers):
+                    decoding.append((next_decode, decoder.submit(self._prepare, self.file_paths[next_decode])))
+                    next_decode += 1
+                
+                # Hand decoded files to free inference workers in order,
+                # grouping consecutive short clips into one batch
+                while decoding and decoding[0][1].done() and len(inflight) < self.workers:
+                    indices, cache_keys, clips = [], [], []
+                    while decoding and decoding[0][1].done() and len(clips) < self.batch_size:
+                        index, future = decoding[0]
+                        try:
+                            keys, cached, audio = future.result()
+                        except Exception as e:
+                            decoding.popleft()
+                            finished[index] = (f"[ERROR: {str(e)}]", str(e))
+                            continue
+                        
+                        if cached is not None:
+                            decoding.popleft()
+                            finished[index] = (cached, None)
+                            continue
+                        
+                        # A long file is transcribed on its own
+                        if audio.duration > BATCH_CLIP_MAX_SECONDS and clips:
+                            break
+                        
+                        decoding.popleft()
+                        long_file = audio.duration > BATCH_CLIP_MAX_SECONDS
+                        indices.append(index)
+                        cache_keys.append(keys)
+                        clips.append(audio)
+                        if long_file:
+                            break
+                    
+                    if not clips:
+                        continue
+                    
+                    if on_start:
+                        for index in indices:
+                            on_start(index, self.file_paths[index])
+                    inflight.append((indices, cache_keys, self._submit(clips, inference), clips))
+                
+                # Collect finished inference
+                for item in [item for item in inflight if item[2].done()]:
+                    inflight.remove(item)
+                    indices, cache_keys, job, clips = item
+                    for audio in clips:
+                        audio.close()
+                    try:
+                        texts = job.result()
+                        if isinstance(texts, str):
+                            texts = [texts]
+                    except Exception as e:
+                        texts = [f"[ERROR: {str(e)}]"] * len(indices)
+                    
+                    for index, (plain_key, batched_key), text in zip(indices, cache_keys, texts):
+                        if text.startswith("[ERROR:"):
+                            finished[index] = (text, text[len("[ERROR: "):-1])
+                        else:
+                            cache_key = batched_key if len(indices) > 1 else plain_key
+                            if cache_key:
+                                TRANSCRIPTION_CACHE.put(cache_key, text)
+                            finished[index] = (text, None)
+                
+                # Report results in input order
+                while next_report in finished:
+                    text, error = finished.pop(next_report)
+                    METRICS.count("files_total", path="batch")
+                    if error:
+                        METRICS.count("errors_total", stage="batch")
+                    on_result(next_report, self.file_paths[next_report], text, error)
+                    next_report += 1
+                
+                # Wait for the next decode or inference to complete
+                waiting = [job for _, _, job, _ in inflight]
+                if decoding and (not decoding[0][1].done() or len(inflight) < self.workers):
+                    # A finished decode waiting for a busy worker would wake us at once
+                    waiting.append(decoding[0][1])
+                if waiting and next_report not in finished:
+                    wait(waiting, timeout=0.2, return_when=FIRST_COMPLETED)
+        finally:
+            # Drop queued work on cancellation; running jobs finish in the background
+            for _, future in decoding:
+                if not future.cancel() and future.done() and future.exception() is None:
+                    audio = future.result()[2]
+                    if audio:
+                        audio.close()
+            for _, _, job, clips in inflight:
+                job.cancel()
+                for audio in clips:
+                    audio.close()
+            decoder.shutdown(wait=False, cancel_futures=True)
+            if inference:
+                inference.shutdown(wait=False, cancel_futures=True)
+        
+        return next_report
+
+class SegmentedTranscription:
+    """Transcribes one long file as silence-aligned segments, reporting each in order"""
+    
+    def __init__(self, file_path, transcriptor, get_pool=None, workers=None):
+        self.file_path = file_path
+        self.transcriptor = transcriptor
+        self.get_pool = get_pool  # Callable (model_size, workers) -> TranscriptionPool
+        self.workers = workers
+        self.duration = 0.0
+        self.plan = []
+        self.cached = False
+    
+    def run(self, on_status=None, on_plan=None, on_segment_start=None, on_segment=None):
+        """Transcribe the file and return the combined text"""
+        METRICS.count("files_total", path="segmented")
+        
+        # Reuse an earlier segmented transcription of the same content
+        cache_key = self.transcriptor.file_cache_key(self.file_path, segmented=True)
+        cached = TRANSCRIPTION_CACHE.get(cache_key) if cache_key else None
+        if cached is not None:
+            self.cached = True
+            if on_status:
+                on_status("Found cached transcription")
+            return cached
+        
+        # Get audio duration to choose workers and where to decode to
+        duration = probe_duration(self.file_path)
+        model_size = self.transcriptor.model_size
+        workers = self.workers or default_worker_count(model_size, math.ceil(duration / SEGMENT_MIN_LENGTH))
+        
+        # Decode once; worker processes share a memory-mapped file instead of copies
+        if on_status:
+            on_status("Decoding audio...")
+        audio = decode_audio(self.file_path, to_file=workers > 1 or duration > DECODE_MEMMAP_SECONDS)
+        results = []
+        try:
+            # Size segments for the available workers, cutting at silences
+            self.duration = audio.duration
+            self.plan = plan_segments(audio.samples, workers)
+            if not self.workers:
+                # Only a chosen worker count is trimmed to the segments; a caller's pool is always used
+                workers = min(workers, len(self.plan))
+            if on_plan:
+                on_plan(self.duration, self.plan, workers)
+            
+            # Dispatch the segments to worker processes that each hold a model
+            futures = None
+            if workers > 1 and self.get_pool:
+                pool = self.get_pool(model_size, workers)
+                futures = [pool.submit(audio.segment_job(start, end)) for start, end in self.plan]
+            
+            # Collect results in order, reporting each as soon as it is ready
+            for i, (start, end) in enumerate(self.plan):
+                if on_segment_start:
+                    on_segment_start(i, start, end)
+                
+                # Wait for the segment, transcribing here if the pool is unavailable
+                text = None
+                if futures is not None:
+                    try:
+                        text = futures[i].result()
+                    except Exception as e:
+                        print(f"Worker failed on segment {i + 1}, transcribing it here: {str(e)}")
+                if text is None:
+                    text = self.transcriptor.transcribe_audio(audio.slice(start, end), use_cache=False)
+                
+                results.append(text)
+                if on_segment:
+                    on_segment(i, start, end, text)
+        finally:
+            # Release the decoded audio
+            audio.close()
+        
+        # Combine all results
+        combined = " ".join(results)
+        if cache_key and not any(r.startswith("[ERROR:") for r in results):
+            TRANSCRIPTION_CACHE.put(cache_key, combined)
+        return combined
+
+def default_worker_count(model_size, jobs):
+    """Choose how many model-holding worker processes to run for a number of jobs"""
+    if SEGMENT_WORKERS:
+        workers = SEGMENT_WORKERS
+    else:
+        # Bounded by cores and by how many copies of the model fit the memory budget
+        model_memory = MODEL_MEMORY_ESTIMATES.get(model_size, MODEL_CACHE_BUDGET)
+        workers = min(os.cpu_count() or 1, max(1, MODEL_CACHE_BUDGET // model_memory))
+    return max(1, min(workers, jobs))
+
+# Model held by each TranscriptionPool worker process
+_pool_transcriptor = None
+
+def _init_pool_worker(model_size, threads, model_options):
+    """Load the model once per worker process"""
+    global _pool_transcriptor
+    try:
+        # Split the cores between workers instead of oversubscribing them
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _pool_transcriptor = AudioTranscriptor(model_size, **model_options)
+
+def _transcribe_batch_in_pool(clips):
+    return BatchedInference(_pool_transcriptor).transcribe(clips)
+
+def _transcribe_in_pool(job):
+    """Transcribe a file path, an audio array or a (raw PCM path, start, end) slice"""
+    if isinstance(job, str):
+        return _pool_transcriptor.transcribe_file(job)
+    
+    if isinstance(job, tuple):
+        raw_path, start, end = job
+        job = np.memmap(raw_path, dtype=np.float32, mode="c")[start:end]
+    
+    # Audio jobs are parts of a file whose result the caller caches
+    return _pool_transcriptor.transcribe_audio(job, use_cache=False)
+
+class TranscriptionPool:
+    """Pool of worker processes that each keep a loaded model"""
+    
+    def __init__(self, model_size, workers, **model_options):
+        self.model_size = model_size
+        self.workers = workers
+        self.model_options = model_options
+        self.broken = False  # Set once a worker dies; the pool then fails every job
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        
+        # Spawn rather than fork so workers don't inherit Tk or audio state
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_pool_worker,
+                                            initargs=(model_size, threads, model_options))
+    
+    def submit(self, job):
+        """Queue a file or audio job for transcription and return a future for its text"""
+        return self._submit(_transcribe_in_pool, job)
+    
+    def submit_batch(self, clips):
+        """Queue several short clips for batched transcription"""
+        return self._submit(_transcribe_batch_in_pool, clips)
+    
+    def _submit(self, function, *args):
+        # A broken pool fails the job through its future like any other error
+        try:
+            future = self.executor.submit(function, *args)
+        except BrokenProcessPool as e:
+            self.broken = True
+            future = Future()
+            future.set_exception(e)
+            return future
+        future.add_done_callback(self._check_broken)
+        return future
+    
+    def _check_broken(self, future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self.broken = True
+    
+    def shutdown(self, cancel=True):
+        """Stop the workers once their current jobs end, dropping queued jobs if cancel is set"""
+        self.executor.shutdown(wait=False, cancel_futures=cancel)
+
+def check_media_file(file_path):
+    """Raise unless a file exists and has a supported extension; return the extension"""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Audio file not found: {file_path}")
+    
+    _, ext = os.path.splitext(file_path)
+    ext = ext.lower()
+    supported_formats = AUDIO_FORMATS + VIDEO_FORMATS
+    if ext not in supported_formats:
+        raise ValueError(f"Unsupported audio format: {ext}. Supported formats: {', '.join(supported_formats)}")
+    return ext
+
+class MediaProbeCache:
+    """Media metadata remembered by path, size and mtime in an append-only log"""
+    
+    def __init__(self, path=PROBE_CACHE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = None  # Path -> record, loaded on first use
+    
+    def _load(self):
+        """Read the log, keeping the latest record per path; called with the lock held"""
+        if self.entries is not None:
+            return
+        self.entries = {}
+        lines = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.entries[record["path"]] = record
+                        lines += 1
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+        
+        # Rewrite the log once superseded records dominate it
+        if lines > 2 * len(self.entries) + 100:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for record in self.entries.values():
+                    f.write(json.dumps(record) + "\n")
+            os.replace(temp_path, self.path)
+    
+    def get(self, path, stat):
+        """Return the remembered info for a file if it hasn't changed since, else None"""
+        with self.lock:
+            self._load()
+            record = self.entries.get(path)
+        if record and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+            return record["info"]
+        return None
+    
+    def put(self, path, stat, info):
+        record = {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "info": info}
+        with self.lock:
+            self._load()
+            self.entries[path] = record
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Failed to save media info: {str(e)}")
+
+MEDIA_PROBE_CACHE = MediaProbeCache()
+
+# MP4 sample entry codes and the codec names ffprobe uses for them
+MP4_CODECS = {"mp4a": "aac", "alac": "alac", "Opus": "opus", "ac-3": "ac3", "ec-3": "eac3",
+              ".mp3": "mp3", "sowt": "pcm_s16le", "twos": "pcm_s16be", "lpcm": "pcm"}
+
+def probe_mp4(file_path):
+    """Read duration and audio track details from an MP4/MOV container's moov box"""
+    with open(file_path, "rb") as f:
+        def boxes(start, end):
+            """Yield (type, payload start, end) for the boxes in a byte range"""
+            offset = start
+            while offset + 8 <= end:
+                f.seek(offset)
+                header = f.read(16)
+                if len(header) < 8:
+                    return
+                size, box_type = struct.unpack(">I4s", header[:8])
+                header_size = 8
+                if size == 1 and len(header) == 16:
+                    size = struct.unpack(">Q", header[8:16])[0]
+                    header_size = 16
+                elif size == 0:
+                    size = end - offset
+                if size < header_size:
+                    return
+                yield box_type, offset + header_size, min(offset + size, end)
+                offset += size
+        
+        def child(parent, box_type):
+            return next(((start, end) for t, start, end in boxes(*parent) if t == box_type), None)
+        
+        def read(start, length):
+            f.seek(start)
+            return f.read(length)
+        
+        def header_duration(start):
+            """Return seconds from an mvhd or mdhd box"""
+            data = read(start, 32)
+            if data[0] == 1:
+                timescale, duration = struct.unpack(">IQ", data[20:32])
+            else:
+                timescale, duration = struct.unpack(">II", data[12:20])
+            return duration / timescale if timescale else None
+        
+        moov = child((0, os.fstat(f.fileno()).st_size), b"moov")
+        if moov is None:
+            return None
+        
+        info = {"duration": None, "sample_rate": None, "channels": None, "codec": None}
+        mvhd = child(moov, b"mvhd")
+        if mvhd:
+            info["duration"] = header_duration(mvhd[0])
+        
+        # The first sound track supplies the audio details
+        for box_type, start, end in boxes(*moov):
+            if box_type != b"trak":
+                continue
+            mdia = child((start, end), b"mdia")
+            hdlr = mdia and child(mdia, b"hdlr")
+            if not hdlr or read(hdlr[0] + 8, 4) != b"soun":
+                continue
+            
+            mdhd = child(mdia, b"mdhd")
+            if mdhd:
+                info["duration"] = header_duration(mdhd[0]) or info["duration"]
+            stbl = child(mdia, b"minf")
+            stbl = stbl and child(stbl, b"stbl")
+            stsd = stbl and child(stbl, b"stsd")
+            if stsd:
+                entry = read(stsd[0] + 8, 36)
+                if len(entry) == 36:
+                    fourcc = entry[4:8].decode("latin-1")
+                    info["codec"] = MP4_CODECS.get(fourcc, fourcc.strip())
+                    info["channels"] = struct.unpack(">H", entry[24:26])[0]
+                    info["sample_rate"] = struct.unpack(">I", entry[32:36])[0] >> 16
+            break
+    
+    # Fragmented files keep their length elsewhere
+    return info if info["duration"] else None
+
+# MPEG audio bitrates (kbps) by (MPEG-1, layer) and sample rates by version
+MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def probe_mp3(file_path):
+    """Read duration and stream details from an MP3's first frame and its Xing/VBRI header"""
+    with open(file_path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        
+        # Skip an ID3v2 tag
+        offset = 0
+        header = f.read(10)
+        if header[:3] == b"ID3" and len(header) == 10:
+            offset = 10 + ((header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9])
+            if header[5] & 0x10:
+                offset += 10
+        f.seek(offset)
+        data = f.read(64 * 1024)
+        
+        # Find the first valid frame header
+        for i in range(len(data) - 4):
+            if data[i] != 0xFF or data[i + 1] & 0xE0 != 0xE0:
+                continue
+            word = struct.unpack(">I", data[i:i + 4])[0]
+            version, layer = (word >> 19) & 3, 4 - ((word >> 17) & 3)
+            bitrate_index, rate_index = (word >> 12) & 15, (word >> 10) & 3
+            if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+                continue
+            break
+        else:
+            return None
+        
+        mpeg1 = version == 3
+        mono = (word >> 6) & 3 == 3
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples_per_frame = 384 if layer == 1 else 1152 if layer == 2 or mpeg1 else 576
+        
+        # VBR files carry a frame count; otherwise assume a constant bitrate
+        frames = None
+        xing = i + 4 + ((17 if mono else 32) if mpeg1 else (9 if mono else 17))
+        if data[xing:xing + 4] in (b"Xing", b"Info") and struct.unpack(">I", data[xing + 4:xing + 8])[0] & 1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+        elif data[i + 36:i + 40] == b"VBRI":
+            frames = struct.unpack(">I", data[i + 50:i + 54])[0]
+        
+        if frames:
+            duration = frames * samples_per_frame / sample_rate
+        else:
+            f.seek(max(file_size - 128, 0))
+            audio_bytes = file_size - offset - i - (128 if f.read(3) == b"TAG" else 0)
+            duration = audio_bytes * 8 / (MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000)
+    
+    return {"duration": duration, "sample_rate": sample_rate,
+            "channels": 1 if mono else 2, "codec": "mp3" if layer == 3 else f"mp{layer}"}
+
+def probe_ffprobe(file_path):
+    """Read media info with ffprobe"""
+    output = subprocess.run(["ffprobe", "-v", "error", "-print_format", "json",
+                             "-show_format", "-show_streams", "-select_streams", "a:0", file_path],
+                            check=True, capture_output=True).stdout
+    data = json.loads(output)
+    stream = (data.get("streams") or [{}])[0]
+    duration = stream.get("duration") or data.get("format", {}).get("duration")
+    if duration is None:
+        return None
+    return {"duration": float(duration),
+            "sample_rate": int(stream["sample_rate"]) if stream.get("sample_rate") else None,
+            "channels": stream.get("channels"),
+            "codec": stream.get("codec_name")}
+
+def read_media_info(file_path, ext):
+    """Probe a file in-process where the format allows, then with ffprobe, then moviepy"""
+    if ext == ".wav":
+        try:
+            with wave.open(file_path, "rb") as wf:
+                return {"duration": wf.getnframes() / float(wf.getframerate()),
+                        "sample_rate": wf.getframerate(),
+                        "channels": wf.getnchannels(),
+                        "codec": f"pcm_s{wf.getsampwidth() * 8}le"}
+        except (wave.Error, EOFError):
+            pass  # e.g. float or extensible WAV
+    
+    if SOUNDFILE_AVAILABLE and ext in (".wav", ".ogg", ".mp3"):
+        try:
+            info = load_soundfile().info(file_path)
+            if info.frames > 0:
+                return {"duration": info.frames / float(info.samplerate),
+                        "sample_rate": info.samplerate,
+                        "channels": info.channels,
+                        "codec": info.subtype.lower() if info.subtype else info.format.lower()}
+        except Exception:
+            pass
+    
+    container_probe = {".mp3": probe_mp3, ".mp4": probe_mp4, ".m4a": probe_mp4, ".mov": probe_mp4}.get(ext)
+    if container_probe:
+        try:
+            info = container_probe(file_path)
+            if info:
+                return info
+        except (OSError, struct.error, IndexError, KeyError):
+            pass
+    
+    try:
+        info = probe_ffprobe(file_path)
+        if info:
+            return info
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+        pass
+    
+    # Last resort: open the whole file with moviepy, which only gives the duration
+    moviepy = load_moviepy()
+    if moviepy is None:
+        raise ImportError("Could not read the duration: install ffmpeg (ffprobe) or moviepy.")
+    audio = moviepy.AudioFileClip(file_path)
+    try:
+        return {"duration": audio.duration, "sample_rate": audio.fps, "channels": audio.nchannels, "codec": None}
+    finally:
+        audio.close()
+
+@timed_stage("probe")
+def probe_media(file_path):
+    """Return duration, sample rate, channels and codec of a media file
+    
+    Results are remembered by path, size and mtime, so unchanged files
+    are only probed once.
+    """
+    ext = check_media_file(file_path)
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    info = MEDIA_PROBE_CACHE.get(path, stat)
+    if info is None:
+        info = read_media_info(path, ext)
+        MEDIA_PROBE_CACHE.put(path, stat, info)
+    return dict(info)
+
+def probe_duration(file_path):
+    """Return the duration of an audio or video file in seconds"""
+    return probe_media(file_path)["duration"]
+
+def format_duration(seconds):
+    """Format seconds as e.g. 1h 02m, 3m 05s or 42s"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class DecodedAudio:
+    """16 kHz mono float32 audio, held in memory or memory-mapped from a raw PCM file"""
+    
+    def __init__(self, samples, raw_path=None):
+        self.samples = samples
+        self.raw_path = raw_path
+    
+    @property
+    def duration(self):
+        return len(self.samples) / WHISPER_SAMPLE_RATE
+    
+    def _bounds(self, start_time, end_time):
+        start = max(0, int(start_time * WHISPER_SAMPLE_RATE))
+        end = min(len(self.samples), int(end_time * WHISPER_SAMPLE_RATE))
+        return start, end
+    
+    def slice(self, start_time, end_time):
+        """Return a view of the audio between two times without copying"""
+        start, end = self._bounds(start_time, end_time)
+        return self.samples[start:end]
+    
+    def segment_job(self, start_time, end_time):
+        """Describe a slice for a worker process
+        
+        Memory-mapped audio is passed by file and offsets so workers map
+        the same pages instead of receiving a pickled copy.
+        """
+        if self.raw_path:
+            start, end = self._bounds(start_time, end_time)
+            return (self.raw_path, start, end)
+        return self.slice(start_time, end_time)
+    
+    def close(self):
+        """Release the samples and delete the raw PCM file; slices must not be used afterwards"""
+        mapped = getattr(self.samples, "_mmap", None)
+        self.samples = np.zeros(0, dtype=np.float32)
+        if self.raw_path:
+            # Unmap before deleting; Windows can't remove a mapped file
+            if mapped is not None:
+                mapped.close()
+            try:
+                os.remove(self.raw_path)
+            except OSError:
+                pass
+            self.raw_path = None
+
+@timed_stage("decode")
+def decode_audio(file_path, to_file=False):
+    """Decode an audio or video file once to 16 kHz mono float32
+    
+    Every file path goes through here (single-file, streamed, segmented
+    and batch transcription) rather than through Whisper's own loader,
+    so decoding is timed and falls back to moviepy the same way
+    everywhere. Video files are demuxed and decoded in the same pass, so their
+    audio never goes through an intermediate file. With to_file the PCM
+    is written to a temporary raw file and memory-mapped, which keeps
+    very long inputs out of RAM and lets worker processes share it.
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel", "error",
+        "-i", file_path,
+        "-map", "0:a:0",
+        "-vn", "-sn", "-dn",
+        "-f", "f32le",
+        "-ac", "1",
+        "-ar", str(WHISPER_SAMPLE_RATE),
+    ]
+    
+    try:
+        if to_file:
+            raw = tempfile.NamedTemporaryFile(suffix='.f32', delete=False)
+            raw.close()
+            try:
+                subprocess.run(cmd + ["-y", raw.name], check=True, capture_output=True)
+            except Exception:
+                os.remove(raw.name)
+                raise
+            
+            # Copy-on-write so the model may modify its view without touching the file
+            if os.path.getsize(raw.name) == 0:
+                return DecodedAudio(np.zeros(0, dtype=np.float32), raw.name)
+            return DecodedAudio(np.memmap(raw.name, dtype=np.float32, mode="c"), raw.name)
+        
+        # Size the buffer from the probed duration so the pipe is read straight into it
+        try:
+            expected_seconds = probe_duration(file_path)
+        except Exception:
+            expected_seconds = None
+        return DecodedAudio(read_pcm_pipe(cmd + ["-"], expected_seconds))
+        
+    except Exception as e:
+        detail = getattr(e, "stderr", None)
+        detail = detail if isinstance(detail, str) and detail else str(e)
+        print(f"FFmpeg decoding failed: {detail}")
+        
+        # Last resort: decode with moviepy
+        moviepy = load_moviepy()
+        if moviepy is None:
+            raise ValueError(f"Failed to decode audio: {detail}")
+        
+        print("Falling back to moviepy...")
+        clip = moviepy.AudioFileClip(file_path)
+        try:
+            samples = clip.to_soundarray(fps=WHISPER_SAMPLE_RATE)
+        finally:
+            clip.close()
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        return DecodedAudio(samples.astype(np.float32))
+
+def read_pcm_pipe(cmd, expected_seconds=None, sample_rate=WHISPER_SAMPLE_RATE):
+    """Run a decoder writing f32le to stdout and read it into one float32 array"""
+    capacity = int((expected_seconds or 60.0) * sample_rate) + sample_rate
+    samples = np.empty(capacity, dtype=np.float32)
+    filled = 0  # Bytes read so far
+    
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            while True:
+                # Grow by doubling if the probe was short or missing
+                if filled == samples.nbytes:
+                    samples = np.concatenate([samples, np.empty(len(samples), dtype=np.float32)])
+                read = process.stdout.readinto(memoryview(samples.view(np.uint8))[filled:])
+                if not read:
+                    break
+                filled += read
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        
+        if returncode != 0:
+            errors.seek(0)
+            # The first line names the cause; the rest are consequences
+            message = errors.read().decode(errors="replace").strip().splitlines()
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=message[0] if message else "")
+    
+    samples = samples[:filled // 4]
+    # Don't pin a much larger buffer than the audio needs
+    return samples.copy() if len(samples) < capacity // 2 else samples
+
+def plan_segments(audio, workers, sample_rate=WHISPER_SAMPLE_RATE):
+    """Split audio into (start, end) times sized for the workers and cut at silences
+    
+    Segment lengths are whole multiples of Whisper's 30 s window so no
+    window is decoded half empty, and each cut is moved back to the
+    quietest frame shortly before it so words are not split.
+    """
+    duration = len(audio) / sample_rate
+    if duration <= SEGMENT_MIN_LENGTH:
+        return [(0.0, duration)]
+    
+    # Give every worker a share, rounded up to whole windows
+    share = duration / max(1, workers)
+    target = math.ceil(share / SEGMENT_WINDOW) * SEGMENT_WINDOW
+    target = min(max(target, SEGMENT_MIN_LENGTH), SEGMENT_MAX_LENGTH)
+    
+    segments = []
+    start = 0.0
+    while duration - start > target + SEGMENT_MIN_TAIL:
+        cut = find_silence(audio, start + target - SEGMENT_SNAP_RANGE, start + target, sample_rate)
+        segments.append((start, cut))
+        start = cut
+    segments.append((start, duration))
+    return segments
+
+def plan_windows(audio, sample_rate=WHISPER_SAMPLE_RATE, min_tail=SEGMENT_MIN_TAIL):
+    """Split audio into (start, end) times of about one Whisper window, cut at silences
+    
+    A final window shorter than min_tail is merged into the previous one;
+    with min_tail=0 no window is longer than SEGMENT_WINDOW.
+    """
+    duration = len(audio) / sample_rate
+    windows = []
+    start = 0.0
+    while duration - start > SEGMENT_WINDOW + min_tail:
+        cut = find_silence(audio, start + SEGMENT_WINDOW - SEGMENT_SNAP_RANGE, start + SEGMENT_WINDOW, sample_rate)
+        windows.append((start, cut))
+        start = cut
+    windows.append((start, duration))
+    return windows
+
+def find_silence(audio, range_start, range_end, sample_rate=WHISPER_SAMPLE_RATE):
+    """Return the time of the lowest-energy frame between two times"""
+    frame = max(1, int(SEGMENT_FRAME * sample_rate))
+    first = int(range_start * sample_rate)
+    window = audio[first:int(range_end * sample_rate)]
+    
+    count = len(window) // frame
+    if count == 0:
+        return range_end
+    
+    energy = np.square(window[:count * frame].reshape(count, frame), dtype=np.float32).mean(axis=1)
+    quietest = int(np.argmin(energy))
+    
+    # Cut in the middle of the quietest frame
+    return (first + quietest * frame + frame // 2) / sample_rate
+
+def pcm16_to_float32(data, rate):
+    """Convert raw mono int16 PCM bytes to a float32 array at Whisper's sample rate"""
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    return resample_audio(samples, rate)
+
+def resample_audio(samples, src_rate, dst_rate=WHISPER_SAMPLE_RATE):
+    """Resample a mono float32 array using linear interpolation"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    
+    out_length = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(out_length, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+class StreamResampler:
+    """Resample consecutive int16 chunks, carrying the interpolation phase across chunks"""
+    
+    def __init__(self, src_rate, dst_rate=WHISPER_SAMPLE_RATE):
+        self.step = src_rate / dst_rate
+        self.position = 0.0  # Next output position, relative to the carried sample
+        self.last = None     # Last input sample of the previous chunk
+    
+    def process(self, samples):
+        if self.step == 1 or len(samples) == 0:
+            return samples
+        
+        if self.last is None:
+            x = samples.astype(np.float32)
+        else:
+            x = np.concatenate(([self.last], samples.astype(np.float32)))
+        
+        end = len(x) - 1
+        count = int((end - self.position) // self.step) + 1 if end >= self.position else 0
+        positions = self.position + np.arange(count) * self.step
+        out = np.interp(positions, np.arange(len(x)), x)
+        
+        # The last sample becomes index 0 of the next chunk
+        next_position = positions[-1] + self.step if count else self.position
+        self.position = next_position - end
+        self.last = x[-1]
+        return np.round(out).astype(np.int16)
+
+class CaptureBuffer:
+    """Growable 16 kHz int16 recording buffer that spills to a WAV file past a memory budget"""
+    
+    def __init__(self, input_rate, memory_budget=CAPTURE_MEMORY_BUDGET):
+        self.resampler = StreamResampler(input_rate)
+        self.budget = max(memory_budget // 2, WHISPER_SAMPLE_RATE)  # In samples
+        self.buffer = np.empty(min(WHISPER_SAMPLE_RATE * CAPTURE_INITIAL_SECONDS, self.budget),
+                               dtype=np.int16)
+        self.length = 0
+        
+        # Spilling happens on a writer thread so the audio callback never blocks on disk
+        self.spill_path = None
+        self.spill_file = None
+        self.spill_queue = None
+        self.spill_thread = None
+        self.spilled = 0
+        self.mapped = None  # Memory map of the finished spill file
+    
+    def write(self, data):
+        """Append a raw int16 chunk from the audio callback and return it at 16 kHz"""
+        samples = self.resampler.process(np.frombuffer(data, dtype=np.int16))
+        
+        needed = self.length + len(samples)
+        if needed > len(self.buffer):
+            if needed <= self.budget:
+                # Grow geometrically up to the budget
+                grown = np.empty(min(max(needed, len(self.buffer) * 2), self.budget), dtype=np.int16)
+                grown[:self.length] = self.buffer[:self.length]
+                self.buffer = grown
+            else:
+                self._spill()
+        
+        self.buffer[self.length:self.length + len(samples)] = samples
+        self.length += len(samples)
+        return samples
+    
+    def _spill(self):
+        """Hand the filled buffer to the writer thread and start a fresh one"""
+        if self.spill_file is None:
+            temp = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+            temp.close()
+            self.spill_path = temp.name
+            self.spill_file = wave.open(self.spill_path, 'wb')
+            self.spill_file.setnchannels(1)
+            self.spill_file.setsampwidth(2)
+            self.spill_file.setframerate(WHISPER_SAMPLE_RATE)
+            self.spill_queue = queue.Queue()
+            self.spill_thread = threading.Thread(target=self._spill_writer, daemon=True)
+            self.spill_thread.start()
+        
+        self.spill_queue.put(self.buffer[:self.length])
+        self.spilled += self.length
+        self.buffer = np.empty(self.budget, dtype=np.int16)
+        self.length = 0
+    
+    def _spill_writer(self):
+        while True:
+            chunk = self.spill_queue.get()
+            if chunk is None:
+                return
+            self.spill_file.writeframes(chunk.tobytes())
+    
+    @timed_stage("capture")
+    def get_samples(self):
+        """Return the whole recording as 16 kHz int16 samples, valid until close()
+        
+        A spilled recording is finished on disk and memory-mapped, so the
+        caller converts it to float32 a window at a time instead of all at once.
+        """
+        if self.mapped is not None:
+            return self.mapped
+        if self.spill_file is None:
+            return self.buffer[:self.length]
+        
+        # Queue the in-memory tail behind the pending writes, then wait for them
+        self.spill_queue.put(self.buffer[:self.length])
+        self.spilled += self.length
+        self.spill_queue.put(None)
+        self.spill_thread.join()
+        self.spill_file.close()
+        self.spill_file = None
+        self.buffer = np.empty(0, dtype=np.int16)
+        self.length = 0
+        
+        # The sample data is the last chunk of the WAV file
+        data_offset = os.path.getsize(self.spill_path) - self.spilled * 2
+        self.mapped = np.memmap(self.spill_path, dtype=np.int16, mode="r",
+                                offset=data_offset, shape=(self.spilled,))
+        return self.mapped
+    
+    def close(self):
+        """Release the buffer and delete the spill file"""
+        if self.mapped is not None:
+            # Unmap before deleting; Windows can't remove a mapped file
+            self.mapped._mmap.close()
+            self.mapped = None
+        
+        if self.spill_file is not None:
+            self.spill_queue.put(None)
+            self.spill_thread.join()
+            self.spill_file.close()
+            self.spill_file = None
+        
+        if self.spill_path:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+        
+        self.buffer = np.empty(0, dtype=np.int16)
+        self.length = 0
+        self.spilled = 0
+
+class LiveTranscriber:
+    """Transcribe a recording in rolling windows while it is still being captured"""
+    
+    def __init__(self, transcriptor, sample_rate, on_update):
+        self.transcriptor = transcriptor
+        self.sample_rate = sample_rate
+        self.on_update = on_update  # Called with (newly committed text, tentative text)
+        
+        self.chunks = queue.Queue()
+        self.pending = bytearray()  # Raw int16 audio that has not been committed yet
+        self.committed = []
+        self.finished = threading.Event()
+        self.cancel = None  # Set by finish(); skips and discards the final pass
+        
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def feed(self, data):
+        """Queue a raw int16 chunk from the audio callback"""
+        self.chunks.put(data)
+    
+    def finish(self, cancel=None):
+        """Stop the worker, transcribe the remaining audio and return the full text
+        
+        If the cancel event gets set meanwhile, None is returned right away
+        and the result of a pass still running is dropped.
+        """
+        self.cancel = cancel
+        self.finished.set()
+        while self.thread.is_alive():
+            self.thread.join(0.1)
+            if cancel is not None and cancel.is_set():
+                self.on_update = lambda committed, tentative: None
+                return None
+        return " ".join(self.committed).strip()
+    
+    def _run(self):
+        while not self.finished.wait(LIVE_STEP):
+            self._drain()
+            
+            # Wait for at least a second of audio before the first pass
+            if len(self.pending) >= self.sample_rate * 2:
+                self._transcribe_pending(final=False)
+        
+        self._drain()
+        if not (self.cancel and self.cancel.is_set()):
+            self._transcribe_pending(final=True)
+    
+    def _drain(self):
+        """Move queued chunks into the pending buffer"""
+        while True:
+            try:
+                self.pending.extend(self.chunks.get_nowait())
+            except queue.Empty:
+                return
+    
+    def _transcribe_pending(self, final):
+        """Transcribe the pending audio and commit the segments that have firmed up"""
+        if not self.pending:
+            self.on_update("", "")
+            return
+        
+        audio = pcm16_to_float32(bytes(self.pending), self.sample_rate)
+        pending_duration = len(self.pending) / 2 / self.sample_rate
+        
+        # Condition on the tail of the committed text for continuity
+        prompt = " ".join(self.committed)[-LIVE_PROMPT_CHARS:] or None
+        
+        try:
+            result = self.transcriptor.transcribe_result(audio, initial_prompt=prompt)
+        except Exception as e:
+            METRICS.count("errors_total", stage="live")
+            print(f"Live transcription error: {str(e)}")
+            return
+        
+        segments = result.get("segments", [])
+        
+        # Everything is final once recording stops; otherwise keep the segments
+        # near the live edge tentative, as they may change with more audio
+        forced = not final and pending_duration >= LIVE_WINDOW
+        if final:
+            stable = segments
+        elif forced:
+            # Commit at least one segment so the pending audio always shrinks
+            stable = segments[:-1] or segments
+        else:
+            stable = [seg for seg in segments[:-1]
+                      if seg["end"] <= pending_duration - LIVE_MARGIN]
+        
+        new_text = ""
+        if stable:
+            new_text = "".join(seg["text"] for seg in stable).strip()
+            if new_text:
+                if self.committed:
+                    new_text = " " + new_text
+                self.committed.append(new_text.strip())
+            
+            # Drop the committed audio from the pending buffer
+            if final:
+                self.pending.clear()
+            else:
+                cut = int(stable[-1]["end"] * self.sample_rate) * 2
+                del self.pending[:min(cut, len(self.pending))]
+        elif forced:
+            # Nothing was said; keep only the audio near the live edge
+            keep = int(LIVE_MARGIN * self.sample_rate) * 2
+            del self.pending[:max(0, len(self.pending) - keep)]
+        
+        tentative = "".join(seg["text"] for seg in segments[len(stable):]).strip()
+        if tentative and self.committed:
+            tentative = " " + tentative
+        self.on_update(new_text, tentative)
+
+class ServiceJob:
+    """A queued transcription request and the results produced for it so far"""
+    
+    def __init__(self, file_path, name=None, temporary=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.file_path = file_path
+        self.name = name or os.path.basename(file_path)
+        self.temporary = temporary  # Uploaded copy removed once transcribed
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.duration = None
+        self.segments = []
+        self.text = None
+        self.error = None
+        self.cached = False
+        self.events = []
+        self.changed = threading.Condition()
+        self.add_event({"event": "queued"})
+    
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+    
+    def add_event(self, event, status=None):
+        """Record a progress event and wake any streaming readers"""
+        with self.changed:
+            if status:
+                self.status = status
+            self.events.append({"job": self.id, **event})
+            self.changed.notify_all()
+    
+    def wait_events(self, start, timeout=None):
+        """Return the events after index start, waiting until there are some or the job ends"""
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.events) > start or self.done, timeout)
+            return self.events[start:]
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": self.duration,
+            "segments": list(self.segments),
+            "text": self.text,
+            "error": self.error,
+            "cached": self.cached
+        }
+
+class TranscriptionService:
+    """Keeps a model loaded and transcribes queued jobs on a fixed number of threads"""
+    
+    def __init__(self, model_size="base", concurrency=1, history=False, **model_options):
+        self.model_size = model_size
+        self.concurrency = max(1, concurrency)
+        self.start_time = time.time()
+        
+        # With more concurrency every job's segments go to worker processes and the
+        # in-process model, whose inference is serialized, is only a fallback
+        self.model_options = model_options
+        self.transcriptor = AudioTranscriptor(model_size, lazy=self.concurrency > 1, **model_options)
+        self.pool = TranscriptionPool(model_size, self.concurrency, **model_options) if self.concurrency > 1 else None
+        
+        self.jobs = OrderedDict()
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.counters = dict.fromkeys(["jobs_submitted", "jobs_completed", "jobs_failed",
+                                       "audio_seconds", "processing_seconds"], 0)
+        
+        # Optional logging to the shared transcription history
+        self.session_id = new_session_id()
+        self.history_store = HistoryStore() if history else None
+        self.history_index = open_history_index(self.history_store) if history else None
+        
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in self.threads:
+            thread.start()
+    
+    def submit(self, file_path, name=None, temporary=False):
+        """Queue a file for transcription and return its job"""
+        job = ServiceJob(file_path, name, temporary)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.counters["jobs_submitted"] += 1
+            self._prune()
+        self.queue.put(job)
+        return job
+    
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet; returns False if it is already running or done"""
+        job = self.get(job_id)
+        with job.changed:
+            if job.status != "queued":
+                return False
+            job.status = "cancelled"
+        job.add_event({"event": "cancelled"})
+        return True
+    
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - SERVICE_JOB_LIMIT
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done][:max(0, excess)]:
+            del self.jobs[job_id]
+    
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            if job.status == "queued":
+                self._run(job)
+            if job.temporary:
+                try:
+                    os.remove(job.file_path)
+                except OSError:
+                    pass
+    
+    def _run(self, job):
+        """Transcribe one job, publishing each segment as it is ready"""
+        job.started = time.time()
+        job.add_event({"event": "started"}, status="running")
+        with self.lock:
+            self.running += 1
+        
+        def on_plan(duration, plan, workers):
+            job.duration = duration
+            job.add_event({"event": "plan", "duration": duration, "segments": len(plan)})
+        
+        def on_segment(i, start, end, text):
+            segment = {"index": i, "start": start, "end": end, "text": text.strip()}
+            job.segments.append(segment)
+            job.add_event({"event": "segment", **segment})
+        
+        try:
+            run = SegmentedTranscription(job.file_path, self.transcriptor,
+                                         get_pool=self.get_pool, workers=self.concurrency)
+            text = run.run(on_plan=on_plan, on_segment=on_segment).strip()
+            job.cached = run.cached
+            if text.startswith("[ERROR:"):
+                raise RuntimeError(text[len("[ERROR:"):].rstrip("]").strip())
+            job.text = text
+        except Exception as e:
+            job.error = str(e)
+        
+        job.finished = time.time()
+        with self.lock:
+            self.running -= 1
+            self.counters["jobs_failed" if job.error else "jobs_completed"] += 1
+            self.counters["audio_seconds"] += job.duration or 0
+            self.counters["processing_seconds"] += job.finished - job.started
+        
+        if job.error:
+            job.add_event({"event": "failed", "error": job.error}, status="failed")
+            return
+        
+        if self.history_store:
+            record_transcription(f"[FILE: {job.name}]\n{job.text}", self.session_id,
+                                 self.history_store, self.history_index)
+        job.add_event({"event": "done", "text": job.text, "duration": job.duration,
+                       "cached": job.cached}, status="done")
+    
+    def stats(self):
+        """Return queue, model and throughput figures for the health endpoint"""
+        with self.lock:
+            return {
+                "status": "ok",
+                "model": self.model_size,
+                "concurrency": self.concurrency,
+                "uptime": time.time() - self.start_time,
+                "queued": self.queue.qsize(),
+                "running": self.running,
+                **self.counters
+            }
+    
+    def metrics_text(self):
+        """Return the service counters in the Prometheus text format"""
+        stats = self.stats()
+        metrics = [
+            ("jobs_submitted_total", "counter", "Jobs accepted", stats["jobs_submitted"]),
+            ("jobs_completed_total", "counter", "Jobs transcribed successfully", stats["jobs_completed"]),
+            ("jobs_failed_total", "counter", "Jobs that ended with an error", stats["jobs_failed"]),
+            ("audio_seconds_total", "counter", "Seconds of audio transcribed", stats["audio_seconds"]),
+            ("processing_seconds_total", "counter", "Seconds spent transcribing", stats["processing_seconds"]),
+            ("jobs_queued", "gauge", "Jobs waiting for a worker", stats["queued"]),
+            ("jobs_running", "gauge", "Jobs being transcribed", stats["running"]),
+            ("uptime_seconds", "gauge", "Seconds since the service started", stats["uptime"]),
+        ]
+        lines = []
+        for name, kind, description, value in metrics:
+            lines.append(f"# HELP cyberscribe_{name} {description}")
+            lines.append(f"# TYPE cyberscribe_{name} {kind}")
+            lines.append(f"cyberscribe_{name} {value}")
+        lines.append(f'cyberscribe_model_info{{model="{self.model_size}"}} 1')
+        
+        # Followed by the stage timers and counters of this process
+        return "\n".join(lines) + "\n" + METRICS.prometheus_text()
+    
+    def get_pool(self, model_size, workers):
+        """Return the worker pool, starting a new one if a worker process died"""
+        with self.lock:
+            if self.pool and self.pool.broken:
+                print("Transcription worker pool failed (a worker process died); starting a new one")
+                self.pool.shutdown()
+                self.pool = TranscriptionPool(self.model_size, self.concurrency, **self.model_options)
+            return self.pool
+    
+    def shutdown(self):
+        """Stop the worker threads after their current jobs and release the model pool"""
+        for _ in self.threads:
+            self.queue.put(None)
+        if self.pool:
+            self.pool.shutdown()
+        if self.history_store:
+            self.history_store.close()
+        if self.history_index:
+            self.history_index.close()
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API of the transcription service
+    
+    POST /jobs                 submit {"path": ...} as JSON, or upload the file as the body (?filename=)
+    GET  /jobs/<id>            job status and results so far
+    GET  /jobs/<id>/events     newline-delimited JSON events, streamed until the job ends
+    DELETE /jobs/<id>          cancel a queued job
+    GET  /health, /metrics     service status as JSON, counters in the Prometheus text format
+    """
+    server_version = "CyberScribe/1.1"
+    
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+    
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_error_json(self, status, message):
+        self.send_json(status, {"error": message})
+    
+    def find_job(self, parts):
+        """Return the job named in a /jobs/<id> path, sending 404 if there is none"""
+        job = self.server.service.get(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+        if job is None:
+            self.send_error_json(404, "Unknown job")
+        return job
+    
+    def do_GET(self):
+        service = self.server.service
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        
+        if parts == ["health"]:
+            self.send_json(200, service.stats())
+        elif parts == ["metrics"]:
+            body = service.metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts)
+            if job:
+                self.send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self.find_job(parts)
+            if job:
+                self.stream_events(job)
+        else:
+            self.send_error_json(404, "Not found")
+    
+    def do_POST(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.rstrip("/") != "/jobs":
+            self.send_error_json(404, "Not found")
+            return
+        
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.send_error_json(411, "Content-Length required")
+            return
+        try:
+            length = int(length)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # The body can't be skipped without knowing its size
+            self.close_connection = True
+            self.send_error_json(400, "Invalid Content-Length")
+            return
+        
+        if self.headers.get_content_type() == "application/json":
+            # A file already on this machine
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+                file_path = request["path"]
+            except (ValueError, KeyError, TypeError):
+                self.send_error_json(400, 'Expected a JSON body like {"path": "/path/to/file"}')
+                return
+            if not os.path.isfile(file_path):
+                self.send_error_json(404, f"File not found: {file_path}")
+                return
+            job = service.submit(file_path, request.get("name"))
+        else:
+            # The file itself, kept in a temporary file until it is transcribed
+            name = query.get("filename", ["upload.wav"])[0]
+            suffix = os.path.splitext(name)[1].lower()
+            if suffix not in AUDIO_FORMATS + VIDEO_FORMATS:
+                self.send_error_json(415, f"Unsupported format: {suffix}")
+                return
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as upload:
+                remaining = length
+                while remaining > 0:
+                    chunk = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        break
+                    upload.write(chunk)
+                    remaining -= len(chunk)
+            if remaining > 0:
+                # The client disconnected part way; don't transcribe half a file
+                os.remove(upload.name)
+                self.close_connection = True
+                self.send_error_json(400, f"Upload truncated: expected {length} bytes, got {length - remaining}")
+                return
+            job = service.submit(upload.name, os.path.basename(name), temporary=True)
+        
+        # Optionally hold the request until the result is ready
+        if query.get("wait", ["0"])[0] not in ("0", "false", ""):
+            index = 0
+            while not job.done:
+                index += len(job.wait_events(index))
+            self.send_json(200, job.to_dict())
+        else:
+            self.send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+    
+    def do_DELETE(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        job = self.find_job(parts)
+        if job:
+            if self.server.service.cancel(job.id):
+                self.send_json(200, job.to_dict())
+            else:
+                self.send_error_json(409, f"Job is {job.status}")
+    
+    def stream_events(self, job):
+        """Write the job's events as JSON lines as they happen, ending with the job"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        
+        index = 0
+        try:
+            while True:
+                events = job.wait_events(index, SERVICE_EVENT_TIMEOUT)
+                if events:
+                    for event in events:
+                        self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                    index += len(events)
+                elif not job.done:
+                    # Keep idle connections from timing out
+                    self.wfile.write(b"\n")
+                self.wfile.flush()
+                if job.done and index >= len(job.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class ServiceUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket"""
+    
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class ServiceClient:
+    """Client for a running transcription service"""
+    
+    def __init__(self, url=None, socket_path=None, timeout=None):
+        self.url = urlparse(url or f"http://{SERVICE_HOST}:{SERVICE_PORT}")
+        self.socket_path = socket_path
+        self.timeout = timeout
+    
+    def _connection(self):
+        if self.socket_path:
+            return _UnixHTTPConnection(self.socket_path, self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+    
+    def _open(self, method, path, body=None, headers=None):
+        """Send a request and return the open response, raising on error statuses"""
+        connection = self._connection()
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        if response.status >= 400:
+            message = response.read().decode("utf-8", "replace")
+            connection.close()
+            try:
+                message = json.loads(message)["error"]
+            except (ValueError, KeyError, TypeError):
+                pass
+            raise RuntimeError(f"Service returned {response.status}: {message}")
+        return response
+    
+    def _request(self, method, path, body=None, headers=None):
+        response = self._open(method, path, body, headers)
+        data = response.read()
+        response.close()
+        if response.getheader("Content-Type", "").startswith("application/json"):
+            return json.loads(data)
+        return data.decode("utf-8")
+    
+    def health(self):
+        return self._request("GET", "/health")
+    
+    def metrics(self):
+        return self._request("GET", "/metrics")
+    
+    def submit(self, file_path, upload=False, wait=False):
+        """Submit a file by path, or upload its contents when the service can't read it"""
+        query = "?wait=1" if wait else ""
+        if not upload:
+            body = json.dumps({"path": os.path.abspath(file_path)})
+            return self._request("POST", f"/jobs{query}", body, {"Content-Type": "application/json"})
+        
+        name = quote(os.path.basename(file_path))
+        query = f"{query}&" if query else "?"
+        with open(file_path, "rb") as f:
+            headers = {"Content-Type": "application/octet-stream",
+                       "Content-Length": str(os.fstat(f.fileno()).st_size)}
+            return self._request("POST", f"/jobs{query}filename={name}", f, headers)
+    
+    def job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+    
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+    
+    def events(self, job_id):
+        """Yield a job's events as they arrive, ending when the job does"""
+        response = self._open("GET", f"/jobs/{job_id}/events")
+        try:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            response.close()
+
+class WatchLedger:
+    """Persistent record of the files and directories watch mode has already handled"""
+    
+    def __init__(self, path=WATCH_LEDGER):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS files ("
+                              "path TEXT PRIMARY KEY, directory TEXT, size INTEGER, mtime_ns INTEGER, "
+                              "status TEXT, error TEXT, processed_at TEXT)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS files_directory ON files(directory)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, mtime_ns INTEGER)")
+    
+    def get(self, path):
+        """Return the (size, mtime_ns) a file had when it was processed, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+        return tuple(row) if row else None
+    
+    def known_files(self, directory):
+        """Return {path: (size, mtime_ns)} for the processed files in a directory"""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, size, mtime_ns FROM files WHERE directory = ?",
+                                     (directory,)).fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+    
+    def files(self):
+        """Return {path: (size, mtime_ns)} for every processed file"""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, size, mtime_ns FROM files").fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+    
+    def record(self, path, size, mtime_ns, error=None):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (path, os.path.dirname(path), size, mtime_ns,
+                               "failed" if error else "done", error,
+                               datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    
+    def directories(self, root, recursive):
+        """Return {path: mtime_ns} for the known directories under a root"""
+        with self.lock:
+            rows = self.conn.execute("SELECT path, mtime_ns FROM directories").fetchall()
+        prefix = os.path.join(root, "")
+        return {path: mtime_ns for path, mtime_ns in rows
+                if path == root or (recursive and path.startswith(prefix))}
+    
+    def set_directory(self, path, mtime_ns):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO directories VALUES (?, ?)", (path, mtime_ns))
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class Inotify:
+    """Minimal ctypes binding to Linux inotify"""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+    
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}  # Watch descriptor -> directory
+    
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {path}")
+        self.paths[wd] = path
+    
+    def read(self, timeout):
+        """Wait up to timeout seconds and return (directory, name, mask) events"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        
+        events = []
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = os.fsdecode(data[offset + 16:offset + 16 + length].rstrip(b"\0"))
+            offset += 16 + length
+            directory = self.paths.pop(wd, None) if mask & self.IN_IGNORED else self.paths.get(wd)
+            events.append((directory, name, mask))
+        return events
+    
+    def close(self):
+        os.close(self.fd)
+
+class FolderWatcher:
+    """Finds new or changed media files under directories and reports each once it stops changing
+    
+    Directories are rescanned only when their mtime moves, so a sync costs a stat per
+    directory plus work proportional to the files that are new. Overwriting a file in
+    place leaves its directory's mtime alone, so processed files are also checked
+    against the ledger, but only on the first sync and every `recheck_interval` seconds
+    of polling (inotify reports such writes directly). Files are debounced until
+    their size and mtime hold still for `settle` seconds, then reported by poll() and
+    recorded in the ledger by mark() so they are never transcribed twice.
+    """
+    
+    def __init__(self, directories, ledger, recursive=False, settle=WATCH_SETTLE,
+                 interval=WATCH_INTERVAL, use_inotify=True, recheck_interval=WATCH_RECHECK_INTERVAL):
+        self.roots = [os.path.abspath(d) for d in directories]
+        self.ledger = ledger
+        self.recursive = recursive
+        self.settle = settle
+        self.interval = interval
+        self.dir_mtimes = {}  # Directory -> mtime_ns when it was last scanned
+        self.pending = {}     # File -> [size, mtime_ns, time it last changed]
+        self.in_flight = {}   # File -> (size, mtime_ns) reported by poll() but not yet marked
+        self.next_poll = 0.0
+        self.recheck_interval = recheck_interval
+        self.next_recheck = 0.0
+        
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable, polling every {interval:.0f}s: {str(e)}")
+        
+        # Start from the directories seen in earlier runs
+        for root in self.roots:
+            known = ledger.directories(root, recursive)
+            known.setdefault(root, None)
+            for directory, mtime_ns in known.items():
+                self._add_directory(directory, mtime_ns)
+    
+    def _add_directory(self, directory, mtime_ns=None):
+        self.dir_mtimes[directory] = mtime_ns
+        if self.inotify:
+            try:
+                self.inotify.add(directory)
+            except OSError as e:
+                # Out of watches or similar: fall back to polling everything
+                print(f"inotify watch failed, polling instead: {str(e)}")
+                self.inotify.close()
+                self.inotify = None
+    
+    def sync(self):
+        """Scan every directory whose mtime changed, rechecking processed files when due"""
+        for directory, mtime_ns in list(self.dir_mtimes.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                # Removed; forget it until its parent is rescanned
+                del self.dir_mtimes[directory]
+                continue
+            if current != mtime_ns:
+                self._scan(directory)
+        
+        # Files overwritten in place don't change their directory's mtime; checking
+        # them costs a stat per processed file, so it only runs now and then
+        if time.time() < self.next_recheck:
+            return
+        self.next_recheck = time.time() + self.recheck_interval
+        for path, state in self.ledger.files().items():
+            if os.path.dirname(path) not in self.dir_mtimes:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if state != (stat.st_size, stat.st_mtime_ns):
+                self._consider(path, stat)
+    
+    def _scan(self, directory):
+        """List a directory, queueing files the ledger hasn't seen in their current state"""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            self.dir_mtimes.pop(directory, None)
+            return
+        self.dir_mtimes[directory] = mtime_ns
+        
+        known = self.ledger.known_files(directory)
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.recursive and entry.path not in self.dir_mtimes:
+                        self._add_directory(entry.path)
+                        self._scan(entry.path)
+                elif self._wanted(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    if known.get(entry.path) != (stat.st_size, stat.st_mtime_ns):
+                        self._consider(entry.path, stat)
+            except OSError:
+                continue
+        self._save_directory(directory)
+    
+    def _wanted(self, name):
+        # Skip hidden and partial download files
+        return (not name.startswith(".")
+                and os.path.splitext(name)[1].lower() in AUDIO_FORMATS + VIDEO_FORMATS)
+    
+    def _consider(self, path, stat):
+        if path in self.in_flight:
+            return
+        state = self.pending.get(path)
+        if state is None or state[:2] != [stat.st_size, stat.st_mtime_ns]:
+            self.pending[path] = [stat.st_size, stat.st_mtime_ns, time.time()]
+    
+    def _save_directory(self, directory):
+        """Persist a directory's scan once none of its files are still waiting"""
+        waiting = itertools.chain(self.pending, self.in_flight)
+        if directory in self.dir_mtimes and not any(os.path.dirname(p) == directory for p in waiting):
+            self.ledger.set_directory(directory, self.dir_mtimes[directory])
+    
+    def _handle_events(self, events):
+        for directory, name, mask in events:
+            if mask & Inotify.IN_Q_OVERFLOW:
+                # Events were dropped; rescan everything
+                for known in list(self.dir_mtimes):
+                    self._scan(known)
+                continue
+            if directory is None:
+                continue
+            
+            path = os.path.join(directory, name)
+            if mask & (Inotify.IN_DELETE_SELF | Inotify.IN_MOVE_SELF):
+                self.dir_mtimes.pop(directory, None)
+            elif mask & Inotify.IN_ISDIR:
+                if self.recursive and mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO) \
+                        and path not in self.dir_mtimes:
+                    self._add_directory(path)
+                    self._scan(path)
+            elif name and self._wanted(name):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.ledger.get(path) != (stat.st_size, stat.st_mtime_ns):
+                    self._consider(path, stat)
+    
+    def poll(self, timeout=None):
+        """Wait for changes and return [(path, size, mtime_ns)] for files that have settled"""
+        timeout = self.interval if timeout is None else timeout
+        if self.pending:
+            # Wake when the oldest pending file could have settled
+            settle_at = min(changed for _, _, changed in self.pending.values()) + self.settle
+            timeout = max(0.0, min(timeout, settle_at - time.time()))
+        
+        if self.inotify:
+            self._handle_events(self.inotify.read(timeout))
+        else:
+            time.sleep(timeout)
+            if time.time() >= self.next_poll:
+                self.next_poll = time.time() + self.interval
+                self.sync()
+        
+        # Report files whose size and mtime held still through the settle time
+        ready = []
+        now = time.time()
+        for path, state in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                self._save_directory(os.path.dirname(path))
+                continue
+            if state[:2] != [stat.st_size, stat.st_mtime_ns]:
+                self.pending[path] = [stat.st_size, stat.st_mtime_ns, now]
+            elif now - state[2] >= self.settle:
+                del self.pending[path]
+                self.in_flight[path] = (stat.st_size, stat.st_mtime_ns)
+                ready.append((path, stat.st_size, stat.st_mtime_ns))
+        return ready
+    
+    def mark(self, path, error=None):
+        """Record a file returned by poll() as processed"""
+        size, mtime_ns = self.in_flight.pop(path)
+        self.ledger.record(path, size, mtime_ns, error)
+        self._save_directory(os.path.dirname(path))
+    
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+
+def expand_inputs(patterns, recursive=False):
+    """Resolve files, directories and glob patterns to a list of media files"""
+    supported_formats = AUDIO_FORMATS + VIDEO_FORMATS
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            entries = Path(pattern).rglob("*") if recursive else Path(pattern).iterdir()
+            matches = sorted(str(p) for p in entries
+                             if p.is_file() and p.suffix.lower() in supported_formats)
+        elif os.path.isfile(pattern):
+            # Named files are kept even if unsupported so the error is reported for them
+            matches = [pattern]
+        else:
+            matches = sorted(p for p in glob.glob(pattern, recursive=True)
+                             if os.path.isfile(p) and os.path.splitext(p)[1].lower() in supported_formats)
+            if not matches:
+                print(f"No files match: {pattern}")
+        
+        for match in matches:
+            if match not in seen:
+                seen.add(match)
+                files.append(match)
+    return files
+
+def build_cli_parser():
+    """Build the argument parser for the headless commands"""
+    parser = argparse.ArgumentParser(
+        prog="transcriptor.py",
+        description="Transcribe audio and video files without the GUI. "
+                    "Results are written as JSON lines. Run without arguments to start the GUI.")
+    
+    # Options for commands that load a model
+    model_options = argparse.ArgumentParser(add_help=False)
+    model_options.add_argument("-m", "--model", default="base",
+                               choices=list(MODEL_MEMORY_ESTIMATES), help="Whisper model size (default: base)")
+    model_options.add_argument("--device", help="torch device for the model, e.g. cpu or cuda")
+    model_options.add_argument("--no-cache", action="store_true", help="ignore and don't update the result cache")
+    model_options.add_argument("--history", action="store_true", help="also record results in the transcription history")
+    model_options.add_argument("--metrics-file", default=METRICS_FILE,
+                               help="write stage timings and counters here, as JSON if it ends in .json "
+                                    "and Prometheus text otherwise")
+    
+    # Options for commands that take input files
+    inputs = argparse.ArgumentParser(add_help=False)
+    inputs.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    inputs.add_argument("-o", "--output", help="JSONL file to append results to (default: stdout)")
+    inputs.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    
+    # Options for reaching a running service
+    service_address = argparse.ArgumentParser(add_help=False)
+    service_address.add_argument("--socket", help="Unix socket path instead of TCP")
+    
+    common = argparse.ArgumentParser(add_help=False, parents=[inputs, model_options])
+    common.add_argument("-w", "--workers", type=int, default=0,
+                        help="worker processes, each holding a model (default: from cores and memory)")
+    
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("transcribe", parents=[common],
+                        help="transcribe files one at a time in this process")
+    batch = commands.add_parser("batch", parents=[common],
+                                help="transcribe many files, decoding ahead and batching short clips")
+    batch.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                       help=f"short clips decoded together (default: {BATCH_SIZE})")
+    batch.add_argument("--decode-threads", type=int, default=BATCH_DECODE_THREADS,
+                       help=f"files decoded in parallel (default: {BATCH_DECODE_THREADS})")
+    commands.add_parser("segment", parents=[common],
+                        help="transcribe long files as silence-aligned segments, emitting each segment")
+    
+    serve = commands.add_parser("serve", parents=[model_options, service_address],
+                                help="keep a model loaded and transcribe jobs sent over HTTP")
+    serve.add_argument("--host", default=SERVICE_HOST, help=f"address to listen on (default: {SERVICE_HOST})")
+    serve.add_argument("--port", type=int, default=SERVICE_PORT, help=f"port to listen on (default: {SERVICE_PORT})")
+    serve.add_argument("-c", "--concurrency", type=int, default=1,
+                       help="jobs transcribed at once; above 1 every job is sent to a pool of that many "
+                            "worker processes, each holding a model (default: 1)")
+    serve.add_argument("--no-warm-up", action="store_true", help="skip the warm-up inference at start")
+    
+    watch = commands.add_parser("watch", parents=[model_options],
+                                help="transcribe new and changed files in folders into the history")
+    watch.add_argument("directories", nargs="+", help="folders to watch")
+    watch.add_argument("-o", "--output", help="JSONL file to append results to (default: stdout)")
+    watch.add_argument("-r", "--recursive", action="store_true", help="watch subfolders too")
+    watch.add_argument("-w", "--workers", type=int, default=0,
+                       help="worker processes, each holding a model (default: from cores and memory)")
+    watch.add_argument("--settle", type=float, default=WATCH_SETTLE,
+                       help=f"seconds a file must stop changing before it is transcribed (default: {WATCH_SETTLE:g})")
+    watch.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                       help=f"seconds between folder checks when polling (default: {WATCH_INTERVAL:g})")
+    watch.add_argument("--poll", action="store_true", help="poll folders instead of using inotify")
+    watch.add_argument("--once", action="store_true",
+                       help="transcribe what is new, wait for it to settle, then exit (for cron)")
+    watch.add_argument("--ledger", default=WATCH_LEDGER, help=f"processed-files database (default: {WATCH_LEDGER})")
+    
+    client = commands.add_parser("client", parents=[service_address],
+                                 help="send files to a running service and print the results")
+    client.add_argument("inputs", nargs="*", help="files, directories or glob patterns")
+    client.add_argument("--url", help=f"service address (default: http://{SERVICE_HOST}:{SERVICE_PORT})")
+    client.add_argument("-o", "--output", help="JSONL file to append results to (default: stdout)")
+    client.add_argument("-r", "--recursive", action="store_true", help="search directories recursively")
+    client.add_argument("--upload", action="store_true",
+                        help="send file contents instead of paths, for services that can't read them")
+    client.add_argument("--events", action="store_true", help="print every progress event, not just results")
+    client.add_argument("--no-wait", action="store_true", help="print the queued jobs and return")
+    client.add_argument("--health", action="store_true", help="print the service status")
+    client.add_argument("--metrics", action="store_true", help="print the service counters")
+    return parser
+
+def open_cli_output(path=None):
+    """Open the JSONL results file, or take over stdout and send log messages to stderr"""
+    if path:
+        return open(path, "a", encoding="utf-8")
+    
+    # Worker processes inherit the redirected descriptor too
+    sys.stdout.flush()
+    output = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    return output
+
+def run_cli(argv):
+    """Run a headless command and return the process exit code"""
+    global TRANSCRIPTION_CACHE
+    args = build_cli_parser().parse_args(argv)
+    if args.command == "serve":
+        return run_service(args)
+    if args.command == "client":
+        return run_client(args)
+    if args.command == "watch":
+        return run_watch(args)
+    
+    files = expand_inputs(args.inputs, args.recursive)
+    if not files:
+        print("No input files found")
+        return 2
+    
+    output = open_cli_output(args.output)
+    if args.metrics_file:
+        METRICS.start_export(args.metrics_file)
+    
+    if args.no_cache:
+        TRANSCRIPTION_CACHE = None
+        os.environ["CYBERSCRIBE_CACHE"] = "0"  # Inherited by worker processes
+    
+    history_store = history_index = None
+    session_id = new_session_id()
+    if args.history:
+        history_store = HistoryStore()
+        history_index = open_history_index(history_store)
+    
+    failures = 0
+    pool = None
+    
+    def emit(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+    
+    def report(file_path, text, error=None, label="FILE", **extra):
+        nonlocal failures
+        if error is None and text.startswith("[ERROR:"):
+            error = text[len("[ERROR:"):].rstrip("]").strip()
+        if error:
+            failures += 1
+        elif history_store:
+            record_transcription(f"[{label}: {os.path.basename(file_path)}]\n{text}",
+                                 session_id, history_store, history_index)
+        emit({"file": file_path, "model": args.model,
+              "text": None if error else text.strip(), "error": error, **extra})
+    
+    model_options = {"device": args.device} if args.device else {}
+    
+    def get_pool(model_size, workers):
+        """Return a worker pool for the model, replacing the running one when it doesn't match"""
+        nonlocal pool
+        if pool and pool.broken:
+            print("Transcription worker pool failed (a worker process died); starting a new one")
+            pool.shutdown()
+            pool = None
+        if pool and (pool.model_size != model_size or pool.workers != workers):
+            pool.shutdown(cancel=False)
+            pool = None
+        if pool is None:
+            pool = TranscriptionPool(model_size, workers, **model_options)
+        return pool
+    
+    try:
+        # Loaded on first use, so runs that only use worker processes don't load it here
+        transcriptor = AudioTranscriptor(args.model, lazy=True, **model_options)
+        
+        if args.command == "transcribe":
+            # Files go to worker processes only when asked for; results are reported in order
+            workers = min(args.workers, len(files))
+            futures = [get_pool(args.model, workers).submit(f) for f in files] if workers > 1 else None
+            for i, file_path in enumerate(files):
+                start_time = time.time()
+                text = futures[i].result() if futures else transcriptor.transcribe_file(file_path)
+                report(file_path, text, seconds=round(time.time() - start_time, 3))
+        
+        elif args.command == "batch":
+            workers = args.workers or default_worker_count(args.model, len(files))
+            total_duration = 0.0
+            for file_path in files:
+                try:
+                    total_duration += probe_duration(file_path)
+                except Exception:
+                    pass  # Reported when the file is transcribed
+            print(f"Batch: {len(files)} files, {format_duration(total_duration)} of audio")
+            pipeline = BatchPipeline(files, transcriptor,
+                                     pool=get_pool(args.model, workers) if workers > 1 else None,
+                                     decode_threads=args.decode_threads, batch_size=args.batch_size)
+            pipeline.run(lambda i, file_path, text, error: report(file_path, text, error, label="BATCH FILE"))
+        
+        elif args.command == "segment":
+            for file_path in files:
+                def on_segment(i, start, end, text):
+                    emit({"file": file_path, "segment": i, "start": round(start, 3),
+                          "end": round(end, 3), "text": text.strip()})
+                
+                start_time = time.time()
+                job = SegmentedTranscription(file_path, transcriptor, get_pool=get_pool, workers=args.workers)
+                try:
+                    text = job.run(on_segment=on_segment)
+                    report(file_path, text, segments=len(job.plan), cached=job.cached,
+                           seconds=round(time.time() - start_time, 3))
+                except Exception as e:
+                    report(file_path, "", error=str(e))
+    except KeyboardInterrupt:
+        print("Interrupted")
+        return 130
+    finally:
+        if pool:
+            pool.shutdown()
+        if history_store:
+            history_store.close()
+        if history_index:
+            history_index.close()
+        METRICS.stop_export()
+        output.close()
+    
+    return 1 if failures else 0
+
+def run_service(args):
+    """Serve transcription jobs until interrupted"""
+    global TRANSCRIPTION_CACHE
+    if args.no_cache:
+        TRANSCRIPTION_CACHE = None
+        os.environ["CYBERSCRIBE_CACHE"] = "0"
+    
+    if args.metrics_file:
+        METRICS.start_export(args.metrics_file)
+    
+    model_options = {"device": args.device} if args.device else {}
+    service = TranscriptionService(args.model, args.concurrency, history=args.history, **model_options)
+    if not args.no_warm_up and service.concurrency == 1:
+        service.transcriptor.warm_up()
+    
+    if args.socket:
+        if not hasattr(socketserver, "UnixStreamServer"):
+            print("Unix sockets are not supported on this platform")
+            return 2
+        if os.path.exists(args.socket):
+            os.remove(args.socket)  # Left over from a previous run
+        server = ServiceUnixServer(args.socket, ServiceRequestHandler)
+        address = args.socket
+    else:
+        server = ServiceHTTPServer((args.host, args.port), ServiceRequestHandler)
+        address = f"http://{args.host}:{server.server_address[1]}"
+    server.service = service
+    
+    # Stop cleanly when the service manager asks
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    print(f"Serving {args.model} model on {address} with concurrency {service.concurrency}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        METRICS.stop_export()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+    return 0
+
+def run_watch(args):
+    """Transcribe files as they appear in the watched folders, each exactly once"""
+    global TRANSCRIPTION_CACHE
+    directories = [d for d in args.directories if os.path.isdir(d)]
+    for missing in set(args.directories) - set(directories):
+        print(f"Not a directory: {missing}", file=sys.stderr)
+    if not directories:
+        return 2
+    
+    output = open_cli_output(args.output)
+    if args.metrics_file:
+        METRICS.start_export(args.metrics_file)
+    if args.no_cache:
+        TRANSCRIPTION_CACHE = None
+        os.environ["CYBERSCRIBE_CACHE"] = "0"
+    
+    def emit(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+    
+    # Results always go to the history; --history is implied
+    session_id = new_session_id()
+    history_store = HistoryStore()
+    history_index = open_history_index(history_store)
+    ledger = WatchLedger(args.ledger)
+    watcher = FolderWatcher(directories, ledger, recursive=args.recursive, settle=args.settle,
+                            interval=args.interval, use_inotify=not args.poll)
+    pool = None
+    failures = 0
+    
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        model_options = {"device": args.device} if args.device else {}
+        transcriptor = AudioTranscriptor(args.model, lazy=True, **model_options)
+        
+        def on_result(i, file_path, text, error):
+            nonlocal failures
+            if error is None and text.startswith("[ERROR:"):
+                error = text[len("[ERROR:"):].rstrip("]").strip()
+            if error:
+                failures += 1
+            else:
+                record_transcription(f"[WATCH FILE: {os.path.basename(file_path)}]\n{text}",
+                                     session_id, history_store, history_index)
+            watcher.mark(file_path, error)
+            emit({"file": file_path, "model": args.model,
+                  "text": None if error else text.strip(), "error": error})
+        
+        print(f"Watching {', '.join(directories)}")
+        watcher.sync()
+        while True:
+            ready = watcher.poll()
+            if ready:
+                # Files that settle together go through the batch pipeline together
+                paths = [path for path, _, _ in ready]
+                workers = args.workers or default_worker_count(args.model, len(paths))
+                if pool and pool.broken:
+                    print("Transcription worker pool failed (a worker process died); starting a new one")
+                    pool.shutdown()
+                    pool = None
+                if workers > 1 and pool is None:
+                    pool = TranscriptionPool(args.model, workers, **model_options)
+                BatchPipeline(paths, transcriptor, pool=pool if workers > 1 else None).run(on_result)
+            elif args.once and not watcher.pending:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        ledger.close()
+        if pool:
+            pool.shutdown()
+        history_store.close()
+        if history_index:
+            history_index.close()
+        METRICS.stop_export()
+        output.close()
+    
+    return 1 if failures else 0
+
+def run_client(args):
+    """Submit files to a running service and write the results as JSON lines"""
+    if not args.inputs and not (args.health or args.metrics):
+        print("Nothing to do: give input files, --health or --metrics", file=sys.stderr)
+        return 2
+    
+    client = ServiceClient(args.url, args.socket)
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    
+    def emit(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+    
+    failures = 0
+    try:
+        if args.health:
+            emit(client.health())
+        if args.metrics:
+            output.write(client.metrics())
+        
+        # Queue every file first so the service can work on them concurrently
+        files = expand_inputs(args.inputs, args.recursive)
+        jobs = [(file_path, client.submit(file_path, upload=args.upload)) for file_path in files]
+        
+        for file_path, job in jobs:
+            if args.no_wait:
+                emit({"file": file_path, **job})
+                continue
+            
+            for event in client.events(job["id"]):
+                if args.events:
+                    emit({"file": file_path, **event})
+            
+            # Report the final state in the same shape as the other commands
+            job = client.job(job["id"])
+            if job["status"] != "done":
+                failures += 1
+            if not args.events:
+                emit({"file": file_path, "job": job["id"], "text": job["text"],
+                      "error": job["error"] or (None if job["status"] == "done" else job["status"]),
+                      "duration": job["duration"]})
+    except (OSError, RuntimeError, http.client.HTTPException) as e:
+        print(f"Service request failed: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            output.close()
+    return 1 if failures else 0
+
+def report_startup():
+    """Print how long startup took, once the window has been drawn"""
+    STARTUP_TIMES["first paint"] = time.perf_counter() - STARTUP_BEGIN
+    print("Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in STARTUP_TIMES.items()))
+
+def main(argv=None):
+    STARTUP_TIMES["module load"] = time.perf_counter() - STARTUP_BEGIN
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        sys.exit(run_cli(argv))
+    
+    import_gui_modules()
+    window_start = time.perf_counter()
     root = tk.Tk()
     app = TranscriptorGUI(root)
+    STARTUP_TIMES["window"] = time.perf_counter() - window_start
+    root.after_idle(report_startup)
     root.mainloop()
 
 if __name__ == "__main__":